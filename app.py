@@ -1,33 +1,142 @@
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, render_template
-import requests
-from bs4 import BeautifulSoup
+from flask import Flask, g, request, jsonify, render_template, Response, stream_with_context
+import asyncio
+import contextvars
+import hmac
 import os
 import re
 import json
+import threading
+import time
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from urllib.parse import urlparse
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-import subprocess
-import uuid
-from openai import OpenAI
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Any, Tuple
+from artifact_store import ArtifactStore
+from project_export import COMPONENT_REQUIRE_PREFIX, project_entries, project_layout, stream_zip
+from sharding import MANIFEST_ARTIFACT, TimingModel, analyze_specs, build_manifest, match_observations, parse_timing_report
+from components import component_members, find_shared_components, page_components
+from page_fingerprint import INTERACTIVE_SELECTOR, fingerprint_page, fingerprint_soup
+from browser_pool import BrowserPool
+from viewports import VISIBILITY_SCRIPT, merge_viewports, resolve_viewports, responsive_context, validate_viewports
+from crawl_policy import CrawlPolicy, phase as crawl_phase
+from frontier import HostLimiter
+from html_snapshots import SnapshotReplay, find_snapshot_files, load_snapshot_file, page_label, read_snapshot, within
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Metrics
+from profiler import SamplingProfiler
+from network_recorder import HAR_ARTIFACT, NetworkRecorder, fixture_name, stub_entries, to_har
+from eslint_worker import ESLintWorker
+from auth_session import AuthSessions, validate_flow
+from verify_runner import SelectorFeedback, VerificationRunner, default_concurrency, failing_selectors
+from js_postprocess import postprocess as postprocess_js
+from spec_templates import PROFILES, TEMPLATES_DIGEST, TEST_TYPES, css_string, page_class_name, select_test_types
+from spec_templates import test_type_keys
+from spec_templates import render as render_template_js, render_spec
+from dom_snapshot import (SNAPSHOT_ARTIFACT, SelectorResolver, assign_keys, build_snapshot, diff_elements,
+                          element_fingerprint, load_snapshot, public_data, reusable_selectors, subtree_hashes)
+
+# Playwright, OpenAI and BeautifulSoup are imported where first used: together they
+# take most of the app's import time and many requests never need them.
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 
 app = Flask(__name__, template_folder='template')
 app.config['UPLOAD_FOLDER'] = 'generated_scripts'
 app.config['OPENAI_API_KEY'] = os.getenv('OPENAI_API_KEY')
+# OpenAI-compatible endpoint, e.g. a proxy or the load-test mock; unset uses api.openai.com
+app.config['OPENAI_BASE_URL'] = os.getenv('OPENAI_BASE_URL')
+app.config['ARTIFACT_MAX_AGE_DAYS'] = float(os.getenv('ARTIFACT_MAX_AGE_DAYS', '30'))
+app.config['ARTIFACT_MAX_BYTES'] = int(os.getenv('ARTIFACT_MAX_BYTES', str(512 * 1024 * 1024)))
+# Seconds between retention passes of a process; generations in between skip them
+app.config['ARTIFACT_EVICT_INTERVAL'] = float(os.getenv('ARTIFACT_EVICT_INTERVAL', '60'))
+app.config['CRAWL_WAIT'] = os.getenv('CRAWL_WAIT', 'dom-stable')
+app.config['CRAWL_WAIT_SELECTOR'] = os.getenv('CRAWL_WAIT_SELECTOR')
+app.config['CRAWL_DOM_QUIET_MS'] = int(os.getenv('CRAWL_DOM_QUIET_MS', '500'))
+app.config['CRAWL_MAX_WAIT_MS'] = int(os.getenv('CRAWL_MAX_WAIT_MS', '10000'))
+app.config['CRAWL_MAX_IDLE_MS'] = int(os.getenv('CRAWL_MAX_IDLE_MS', '3000'))
+# Comma-separated; unset keeps the defaults, an empty value blocks nothing
+app.config['CRAWL_BLOCK_RESOURCE_TYPES'] = os.getenv('CRAWL_BLOCK_RESOURCE_TYPES')
+app.config['CRAWL_BLOCK_DOMAINS'] = os.getenv('CRAWL_BLOCK_DOMAINS')
+app.config['BROWSER_MAX_CONTEXTS'] = int(os.getenv('BROWSER_MAX_CONTEXTS', '8'))
+app.config['AUTH_FLOWS_FILE'] = os.getenv('AUTH_FLOWS_FILE', 'auth_flows.json')
+app.config['AUTH_STATE_TTL'] = float(os.getenv('AUTH_STATE_TTL', '3600'))
+app.config['VERIFY_WORKSPACE'] = os.getenv('VERIFY_WORKSPACE', os.path.join(app.config['UPLOAD_FOLDER'], 'verify'))
+app.config['VERIFY_CONCURRENCY'] = int(os.getenv('VERIFY_CONCURRENCY', '0')) or default_concurrency()
+# Admin-only features (request profiling) are disabled unless a token is configured
+app.config['ADMIN_TOKEN'] = os.getenv('ADMIN_TOKEN')
+app.config['PROFILE_INTERVAL_MS'] = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+# Directory whose saved pages /api/generate may read by path; unset allows uploads only
+app.config['SNAPSHOT_DIR'] = os.getenv('SNAPSHOT_DIR')
+# Largest request body accepted, e.g. uploaded snapshots; bigger ones get a 413
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_BYTES', str(64 * 1024 * 1024)))
 
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-def get_ai_suggestions(element_data: Dict[str, Any], page_context: str) -> Dict[str, Any]:
-    """Get AI-powered suggestions for test strategies and assertions."""
+artifact_store = ArtifactStore(
+    app.config['UPLOAD_FOLDER'],
+    max_age_seconds=app.config['ARTIFACT_MAX_AGE_DAYS'] * 86400,
+    max_total_bytes=app.config['ARTIFACT_MAX_BYTES'],
+    evict_interval=app.config['ARTIFACT_EVICT_INTERVAL']
+)
+eslint_worker = ESLintWorker()
+browser_pool = BrowserPool(app.config['BROWSER_MAX_CONTEXTS'])
+crawl_policy = CrawlPolicy(
+    wait=app.config['CRAWL_WAIT'],
+    wait_selector=app.config['CRAWL_WAIT_SELECTOR'],
+    dom_quiet_ms=app.config['CRAWL_DOM_QUIET_MS'],
+    max_wait_ms=app.config['CRAWL_MAX_WAIT_MS'],
+    max_idle_ms=app.config['CRAWL_MAX_IDLE_MS'],
+    block_resource_types=None if app.config['CRAWL_BLOCK_RESOURCE_TYPES'] is None
+    else [t.strip() for t in app.config['CRAWL_BLOCK_RESOURCE_TYPES'].split(',') if t.strip()],
+    block_domains=None if app.config['CRAWL_BLOCK_DOMAINS'] is None
+    else [d.strip() for d in app.config['CRAWL_BLOCK_DOMAINS'].split(',') if d.strip()]
+)
+timing_model = TimingModel(os.path.join(app.config['UPLOAD_FOLDER'], 'timing_model.json'))
+selector_feedback = SelectorFeedback(os.path.join(app.config['UPLOAD_FOLDER'], 'selector_feedback.json'))
+verification_runner = VerificationRunner(app.config['VERIFY_WORKSPACE'], app.config['VERIFY_CONCURRENCY'])
+auth_sessions = AuthSessions(
+    os.path.join(app.config['UPLOAD_FOLDER'], 'auth'),
+    flows_path=app.config['AUTH_FLOWS_FILE'],
+    default_credentials=lambda: generate_fixture_data()['users'][0],
+    ttl=app.config['AUTH_STATE_TTL']
+)
+metrics = Metrics()
+metrics.gauge('browser_contexts_active', 'Browser contexts open in the pool.', lambda: browser_pool.active_contexts)
+metrics.gauge('browser_contexts_max', 'Browser contexts the pool allows at once.', lambda: browser_pool.max_contexts)
+metrics.gauge('browser_connected', 'Whether the pooled browser is running.', browser_pool.connected)
+metrics.gauge('eslint_worker_running', 'Whether the ESLint worker process is running.', eslint_worker.running)
+metrics.gauge('artifact_store_bytes', 'Bytes stored in the artifact store.', artifact_store.total_bytes)
+
+_openai_client: Optional['OpenAI'] = None
+_openai_client_lock = threading.Lock()
+
+def openai_client() -> 'OpenAI':
+    """The process's OpenAI client, created on first use.
+
+    Reusing one client keeps its HTTP connections alive between AI calls; server workers
+    each create their own after the fork.
+    """
+    global _openai_client
+    with _openai_client_lock:
+        if _openai_client is None:
+            from openai import OpenAI
+            _openai_client = OpenAI(api_key=app.config['OPENAI_API_KEY'], base_url=app.config['OPENAI_BASE_URL'])
+        return _openai_client
+
+def get_ai_suggestions(element_data: Dict[str, Any], page_context: str) -> Tuple[Dict[str, Any], bool]:
+    """Get AI-powered suggestions for test strategies and assertions.
+
+    Returns the suggestions and whether a request was sent to the API; without an API
+    key none is and the suggestions are empty.
+    """
+    requested = False
     try:
         if not app.config['OPENAI_API_KEY']:
-            return {}
+            return {}, requested
             
-        client = OpenAI(api_key=app.config['OPENAI_API_KEY'])
+        client = openai_client()
         prompt = f"""Given this web element data and page context, suggest optimal Cypress test strategies:
         Element: {json.dumps(element_data)}
         Page Context: {page_context}
@@ -45,6 +154,7 @@ def get_ai_suggestions(element_data: Dict[str, Any], page_context: str) -> Dict[
         - performance: array of performance considerations
         """
         
+        requested = True
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
             messages=[{"role": "user", "content": prompt}],
@@ -53,81 +163,205 @@ def get_ai_suggestions(element_data: Dict[str, Any], page_context: str) -> Dict[
         )
         
         if not response.choices or not response.choices[0].message:
-            return {}
+            metrics.ai_usage('empty', response.usage)
+            return {}, requested
             
         try:
             suggestions = response.choices[0].message.content
-            return json.loads(suggestions) if suggestions else {}
+            metrics.ai_usage('ok', response.usage)
+            return (json.loads(suggestions) if suggestions else {}), requested
         except json.JSONDecodeError:
             print("Failed to parse AI response as JSON")
-            return {}
+            return {}, requested
             
     except Exception as e:
+        metrics.ai_usage('error')
         print(f"AI suggestion error: {str(e)}")
-        return {}
+        return {}, requested
+
+def enrich_elements(url_data: Dict[str, Any], previous: Optional[Dict[str, Any]] = None,
+                    shared: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """Attach AI suggestions to each element, reusing them from ``previous`` for unchanged elements.
+
+    ``shared`` holds suggestions already computed for shared-component elements in the
+    same batch, keyed by ``_component_key``; it is filled in as elements are enriched.
+    Returns how many elements reused earlier suggestions and how many were sent to the
+    API; elements that were neither (no API key) count as neither.
+    """
+    page_context = f"Page: {url_data['page_title']}, Description: {url_data['description']}"
+    old = (previous or {}).get('elements', {})
+    reused = requested = 0
+    for elem_data in url_data['elements']:
+        entry = old.get(elem_data['_key'])
+        component_key = elem_data.get('_component_key')
+        if entry is not None and entry['fingerprint'] == element_fingerprint(elem_data):
+            elem_data['ai_suggestions'] = entry['ai_suggestions']
+            reused += 1
+        elif shared is not None and component_key in shared:
+            elem_data['ai_suggestions'] = shared[component_key]
+            reused += 1
+        else:
+            elem_data['ai_suggestions'], sent = get_ai_suggestions(public_data(elem_data), page_context)
+            if not sent:
+                continue
+            requested += 1
+        if shared is not None and component_key:
+            shared.setdefault(component_key, elem_data['ai_suggestions'])
+    return reused, requested
+
+def parse_page(html: str, url: str) -> Dict[str, Any]:
+    """Parse rendered HTML and extract its testable elements.
+
+    Elements are keyed and subtree-hashed for diffing against earlier snapshots; AI
+    suggestions are attached later by ``enrich_elements``.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Get page metadata
+    page_title = soup.title.string if soup.title and soup.title.string else "Unknown Page"
+    meta_description = soup.find('meta', {'name': 'description'})
+    description = meta_description.get('content', '') if meta_description else ""
+
+    elements = []
+    interactive_selectors = ['input', 'button', 'a', 'form', 'select', 'textarea']
+    attr_selectors = [
+        '[role="button"]', '[role="checkbox"]', '[role="radio"]', '[role="tab"]',
+        '[role="menuitem"]', '[role="switch"]', '[data-testid]', '[data-cy]',
+        '[data-test]', '[data-automation-id]', '[aria-label]'
+    ]
+    hashes = subtree_hashes(soup)
+
+    # Extract elements with enhanced data
+    for selector in interactive_selectors:
+        for element in soup.find_all(selector):
+            elem_data = extract_element_data(element, soup)
+            elem_data['_subtree_hash'] = hashes[id(element)]
+            elements.append(elem_data)
+
+    for selector in attr_selectors:
+        for element in soup.select(selector):
+            if element.name not in interactive_selectors:
+                elem_data = extract_element_data(element, soup)
+                elem_data['_subtree_hash'] = hashes[id(element)]
+                elements.append(elem_data)
+    assign_keys(elements)
+
+    return {
+        'elements': elements,
+        'page_title': page_title,
+        'description': description,
+        'url': url,
+        'soup': soup,
+        'subtree_hashes': hashes
+    }
 
-def crawl_website(url: str) -> Dict[str, Any]:
-    """Crawl website using Playwright with enhanced error handling and retries."""
+async def crawl_viewport(browser, url: str, viewport: Dict[str, Any], policy: CrawlPolicy,
+                         flow: Optional[Dict[str, Any]] = None, recorder: Optional[NetworkRecorder] = None,
+                         fingerprint: bool = False) -> Dict[str, Any]:
+    """Load ``url`` in a new context of the pooled browser sized to ``viewport``.
+
+    ``policy`` decides which requests are blocked and when the page counts as loaded.
+    Returns the rendered HTML, the visibility of its interactive elements, the time
+    spent in each phase and, when ``fingerprint`` is set, the page fingerprint. A
+    redirect to the login page drops the stored session and loads the page again after
+    a fresh login.
+    """
+    timings: Dict[str, Any] = {}
+    for attempt in range(2):
+        with crawl_phase(timings, 'auth_ms'):
+            state = await auth_sessions.storage_state(browser, url, flow) if flow else None
+        acquire_started = time.perf_counter()
+        async with browser_pool.context(browser, storage_state=state, **viewport['options']) as context:
+            page = await context.new_page()
+            timings['context_ms'] = round(timings.get('context_ms', 0) + (time.perf_counter() - acquire_started) * 1000, 1)
+            if recorder:
+                await recorder.attach(page)
+            await policy.attach(page, url, timings)
+
+            await policy.load(page, url, timings)
+            if flow and not attempt and auth_sessions.is_login_redirect(flow, url, page.url):
+                auth_sessions.invalidate(url, flow)
+                continue
+
+            with crawl_phase(timings, 'fingerprint_ms'):
+                page_fingerprint = await fingerprint_page(page) if fingerprint else None
+            with crawl_phase(timings, 'extract_ms'):
+                visibility = await page.evaluate(VISIBILITY_SCRIPT, INTERACTIVE_SELECTOR)
+                html = await page.content()
+            return {'fingerprint': page_fingerprint, 'visibility': visibility, 'html': html, 'timings': timings}
+
+async def crawl_viewports(browser, playwright, url: str, viewports: Optional[List[Any]] = None,
+                          known_fingerprint: Optional[str] = None, record_network: bool = False,
+                          flow: Optional[Dict[str, Any]] = None, policy: Optional[CrawlPolicy] = None) -> Dict[str, Any]:
+    """Crawl ``url`` at every viewport concurrently and merge the results.
+
+    The first viewport is the primary one: it is fingerprinted, its traffic is recorded
+    and the other crawls are cancelled if its fingerprint matches ``known_fingerprint``.
+    ``crawl_timings`` holds the primary crawl's phases, parsing and the total, plus the
+    phases of each viewport when there are several.
+    """
+    started = time.perf_counter()
+    policy = policy or crawl_policy
+    matrix = resolve_viewports(viewports, playwright.devices)
+    recorder = NetworkRecorder() if record_network else None
+    tasks = [asyncio.ensure_future(crawl_viewport(browser, url, matrix[0], policy, flow, recorder, fingerprint=True))]
+    tasks += [asyncio.ensure_future(crawl_viewport(browser, url, viewport, policy, flow)) for viewport in matrix[1:]]
+    try:
+        primary = await tasks[0]
+        if known_fingerprint and primary['fingerprint'] == known_fingerprint:
+            return {'url': url, 'fingerprint': primary['fingerprint'], 'unchanged': True, 'elements': [],
+                    'crawl_timings': dict(primary['timings'], total_ms=round((time.perf_counter() - started) * 1000, 1))}
+        crawls = [primary] + list(await asyncio.gather(*tasks[1:]))
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    timings = dict(primary['timings'])
+    with crawl_phase(timings, 'parse_ms'):
+        url_data = parse_page(primary['html'], url)
+        if len(matrix) > 1:
+            merge_viewports(url_data, matrix, [c['visibility'] for c in crawls],
+                            [None] + [parse_page(c['html'], url) for c in crawls[1:]])
+    url_data['fingerprint'] = primary['fingerprint']
+    url_data['viewport_spec'] = viewports
+    if recorder:
+        url_data['network'] = recorder.entries
+    timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    if len(matrix) > 1:
+        timings['viewports'] = {viewport['name']: c['timings'] for viewport, c in zip(matrix, crawls)}
+    url_data['crawl_timings'] = timings
+    return url_data
+
+def crawl_website(url: str, known_fingerprint: Optional[str] = None, record_network: bool = False,
+                  auth: Optional[Dict[str, Any]] = None, viewports: Optional[List[Any]] = None,
+                  policy: Optional[CrawlPolicy] = None) -> Dict[str, Any]:
+    """Crawl website using Playwright with enhanced error handling and retries.
+
+    The page is loaded on the pooled browser at each of ``viewports`` (desktop only by
+    default) in concurrent contexts; see ``crawl_viewports``. The rendered page is
+    fingerprinted before any extraction. If it matches ``known_fingerprint`` the crawl
+    stops there and returns ``{'unchanged': True, ...}``. With ``record_network`` the
+    page's requests and responses are returned as ``network``. Pages are crawled logged
+    in when there is a login flow, ``auth`` or the one configured for the origin; its
+    storage state is reused until it expires or the site redirects to the login page,
+    then the flow runs again. ``policy`` overrides the configured request blocking and
+    wait strategy.
+    """
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+    flow = auth or auth_sessions.flow_for(url)
     max_retries = 3
     retry_count = 0
     
     while retry_count < max_retries:
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    viewport={'width': 1920, 'height': 1080},
-                    user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                )
-                page = context.new_page()
-
-                # Set timeout and wait for network idle
-                page.set_default_timeout(30000)
-                page.goto(url, wait_until='networkidle')
-
-                # Wait for dynamic content
-                page.wait_for_load_state('domcontentloaded')
-                page.wait_for_load_state('networkidle')
-
-                html = page.content()
-                soup = BeautifulSoup(html, 'html.parser')
-
-                # Get page metadata
-                page_title = soup.title.string if soup.title else "Unknown Page"
-                meta_description = soup.find('meta', {'name': 'description'})
-                description = meta_description['content'] if meta_description else ""
-
-                elements = []
-                interactive_selectors = ['input', 'button', 'a', 'form', 'select', 'textarea']
-                attr_selectors = [
-                    '[role="button"]', '[role="checkbox"]', '[role="radio"]', '[role="tab"]',
-                    '[role="menuitem"]', '[role="switch"]', '[data-testid]', '[data-cy]',
-                    '[data-test]', '[data-automation-id]', '[aria-label]'
-                ]
-
-                # Extract elements with enhanced data
-                for selector in interactive_selectors:
-                    for element in soup.find_all(selector):
-                        elem_data = extract_element_data(element, soup)
-                        ai_suggestions = get_ai_suggestions(elem_data, f"Page: {page_title}, Description: {description}")
-                        elem_data['ai_suggestions'] = ai_suggestions
-                        elements.append(elem_data)
-
-                for selector in attr_selectors:
-                    for element in soup.select(selector):
-                        if element.name not in interactive_selectors:
-                            elem_data = extract_element_data(element, soup)
-                            ai_suggestions = get_ai_suggestions(elem_data, f"Page: {page_title}, Description: {description}")
-                            elem_data['ai_suggestions'] = ai_suggestions
-                            elements.append(elem_data)
-
-                browser.close()
-                return {
-                    'elements': elements,
-                    'page_title': page_title,
-                    'description': description,
-                    'url': url
-                }
+            url_data = browser_pool.run(lambda browser, playwright: crawl_viewports(
+                browser, playwright, url, viewports, known_fingerprint, record_network, flow, policy))
+            metrics.observe_crawl(url_data.get('crawl_timings'))
+            return url_data
 
         except PlaywrightTimeoutError:
             retry_count += 1
@@ -139,6 +373,39 @@ def crawl_website(url: str) -> Dict[str, Any]:
     
     return {'error': 'Failed to crawl website after retries', 'elements': []}
 
+def load_page_snapshot(snapshot: Dict[str, Any], known_fingerprint: Optional[str] = None, render: bool = False,
+                       viewports: Optional[List[Any]] = None, policy: Optional[CrawlPolicy] = None) -> Dict[str, Any]:
+    """Parse a saved page (see ``html_snapshots``) as ``crawl_website`` parses a crawled one.
+
+    Without ``render`` the saved HTML is parsed as it is and fingerprinted from the
+    parsed document. With ``render`` it is loaded at each of ``viewports`` in the pooled
+    browser, which runs its scripts and answers every request from the snapshot; nothing
+    is fetched from the network. ``policy`` decides how long the page is waited for.
+    """
+    if render:
+        replay = SnapshotReplay(snapshot, policy or crawl_policy)
+        try:
+            url_data = browser_pool.run(lambda browser, playwright: crawl_viewports(
+                browser, playwright, replay.render_url(), viewports, known_fingerprint, policy=replay))
+        except Exception as e:
+            return {'error': str(e), 'elements': []}
+        url_data['url'] = snapshot['url']
+    else:
+        started = time.perf_counter()
+        timings: Dict[str, Any] = {}
+        with crawl_phase(timings, 'parse_ms'):
+            url_data = parse_page(snapshot['html'], snapshot['url'])
+        with crawl_phase(timings, 'fingerprint_ms'):
+            url_data['fingerprint'] = fingerprint_soup(url_data['soup'])
+        if known_fingerprint and url_data['fingerprint'] == known_fingerprint:
+            url_data = {'url': snapshot['url'], 'fingerprint': known_fingerprint, 'unchanged': True, 'elements': []}
+        url_data['viewport_spec'] = None
+        timings['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        url_data['crawl_timings'] = timings
+    metrics.observe_crawl(url_data.get('crawl_timings'))
+    url_data['snapshot'] = snapshot['name']
+    return url_data
+
 def extract_element_data(element, soup):
     """Extract relevant data from an HTML element, including labels and Livewire attributes."""
     class_list = element.get('class', [])
@@ -206,7 +473,8 @@ def get_xpath(element):
             break
         siblings = parent.find_all(child.name, recursive=False)
         if len(siblings) > 1:
-            index = siblings.index(child) + 1
+            # By identity: list.index compares Tags structurally, i.e. whole subtrees
+            index = next(i for i, sibling in enumerate(siblings) if sibling is child) + 1
             components.append(f"{child.name}[{index}]")
         else:
             components.append(child.name)
@@ -227,42 +495,52 @@ def validate_selector(selector, soup):
         # Fallback to original selector if parsing fails
         return selector
 
-def get_best_selector(element, soup):
-    """Generate a robust selector with uniqueness validation, prioritizing stable attributes."""
+def get_best_selector(element, soup, avoid=None):
+    """Generate a robust selector with uniqueness validation, prioritizing stable attributes.
+
+    Selectors in ``avoid`` (ones that failed when specs for the page were verified) are
+    skipped in favour of the next candidate, down to the element's XPath.
+    """
     selectors = []
     is_interactive = element['tag'] in ['input', 'button', 'form', 'select', 'textarea'] or element.get('role') in ['button', 'checkbox', 'radio']
     
     if element.get('data-testid'):
-        selectors.append(f"[data-testid='{element['data-testid']}']")
+        selectors.append(f"[data-testid={css_string(element['data-testid'])}]")
     if element.get('data-cy'):
-        selectors.append(f"[data-cy='{element['data-cy']}']")
+        selectors.append(f"[data-cy={css_string(element['data-cy'])}]")
     if element.get('data-test'):
-        selectors.append(f"[data-test='{element['data-test']}']")
+        selectors.append(f"[data-test={css_string(element['data-test'])}]")
     if element.get('data-automation-id'):
-        selectors.append(f"[data-automation-id='{element['data-automation-id']}']")
+        selectors.append(f"[data-automation-id={css_string(element['data-automation-id'])}]")
     if element.get('wire:model'):
-        selectors.append(f"[wire\\\\:model='{element['wire:model']}']")
+        selectors.append(wire_model_selector(element['wire:model']))
     if element.get('id'):
         selectors.append(f"#{element['id']}")
     if element.get('name'):
-        selectors.append(f"[name='{element['name']}']")
+        selectors.append(f"[name={css_string(element['name'])}]")
     if element.get('aria-label'):
-        selectors.append(f"[aria-label='{element['aria-label']}']")
+        selectors.append(f"[aria-label={css_string(element['aria-label'])}]")
     
+    # The compound of the two most stable attributes comes first; single attributes are
+    # only reached when it is avoided
+    candidates = []
     if selectors:
-        compound = f"{element['tag']}{''.join(selectors[:2])}"
-        if is_interactive:
-            compound += ':visible'
-        return validate_selector(compound, soup)
-    
+        candidates.append(f"{element['tag']}{''.join(selectors[:2])}")
+        candidates += [f"{element['tag']}{selector}" for selector in selectors]
     if element.get('placeholder'):
-        placeholder_escaped = element['placeholder'].replace("'", "\\'")
-        selector = f"[placeholder='{placeholder_escaped}']"
+        candidates.append(f"[placeholder={css_string(element['placeholder'])}]")
+    for candidate in candidates:
         if is_interactive:
-            selector += ':visible'
-        return validate_selector(selector, soup)
+            candidate += ':visible'
+        selector = validate_selector(candidate, soup)
+        if not avoid or selector not in avoid:
+            return selector
     return element['xpath']
 
+def wire_model_selector(model: str) -> str:
+    """CSS selector for a Livewire ``wire:model`` binding (the colon must be escaped)."""
+    return f"[wire\\:model={css_string(model)}]"
+
 def generate_realistic_input_value(element):
     """Generate realistic test data based on input type."""
     input_type = element.get('type', '').lower()
@@ -286,49 +564,35 @@ def generate_realistic_input_value(element):
     else:
         return 'Test Input Value'
 
-def generate_page_object(url_data):
-    """Generate a page object class for Cypress tests with practical helpers."""
-    page_name = url_data['page_title'].replace(' ', '')
-    script = f"""// Page Object for {url_data['page_title']}
-// Encapsulates selectors and actions for maintainability
-
-class {page_name}Page {{
-  visit() {{
-    cy.visit('{url_data['url']}');
-  }}
-
-  get(selector) {{
-    return cy.get(selector);
-  }}
-
-  type(selector, value) {{
-    this.get(selector).clear().type(value);
-  }}
-
-  select(selector, valueOrText) {{
-    this.get(selector).select(valueOrText);
-  }}
-
-  check(selector) {{
-    this.get(selector).check({{ force: true }});
-  }}
-
-  click(selector) {{
-    this.get(selector).click();
-  }}
-
-  login(email, password) {{
-    this.get('form').within(() => {{
-      this.type('[type="email"]', email);
-      this.type('[type="password"]', password);
-      this.click('[type="submit"]');
-    }});
-  }}
-}}
-
-module.exports = {page_name}Page;
-"""
-    return script
+def generate_page_object(url_data, components=None, network_module=None):
+    """Generate a page object class for Cypress tests with practical helpers.
+
+    ``components`` (from ``page_components``) are shared component objects the page composes.
+    ``network_module`` names the stubs module ``visit()`` registers before loading the page.
+    """
+    return render_template_js('page_object.js.j2', {
+        'page_title': url_data['page_title'],
+        'page_class': page_class_name(url_data['page_title']),
+        'url': url_data['url'],
+        'components': components or [],
+        'network_module': network_module
+    })
+
+def generate_network_stubs(url_data):
+    """Generate a module of cy.intercept stubs replaying the traffic recorded during the crawl."""
+    return render_template_js('network_stubs.js.j2', {
+        'url': url_data['url'],
+        'stubs': stub_entries(url_data['network'])
+    })
+
+def generate_component_object(component):
+    """Generate the component object class for a component shared by several pages."""
+    return render_template_js('component.js.j2', {
+        'class_name': component['class_name'],
+        'page_count': len(component['pages']),
+        'root': component['root'],
+        'members': component_members(component, get_best_selector)
+    })
 
 def generate_fixture_data():
     """Generate a JSON fixture file for test data."""
@@ -339,272 +603,819 @@ def generate_fixture_data():
         ]
     }
 
-def generate_cypress_script(url_data, soup):
-    """Generate a Cypress test script with enhanced tests and structure following docs."""
+def build_spec_context(url_data, soup, test_types=None, resolve=None, profiles=None):
+    """Collect the selectors and test values the spec templates need.
+
+    ``resolve(element)`` returns the selector for an element; it defaults to
+    ``get_best_selector`` against ``soup``. ``profiles`` maps test type ids to the
+    generation profile (``standard`` or ``fast``) to render them with.
+    """
+    resolve = resolve or (lambda element: get_best_selector(element, soup))
     url = url_data['url']
     elements = url_data['elements']
     page_title = url_data['page_title'].strip()
-    domain = urlparse(url).netloc
-    page_name = page_title.replace(' ', '')
-
-    script = f"""// {page_title} Test Suite for {domain}
-// Generated on: {url}
-// Purpose: Smoke, E2E, authentication, and Livewire tests
-// Note: Uses page object model and fixtures for maintainability
-// Requires: npm install cypress mochawesome cypress-wait-until
-
-const {page_name}Page = require('./{page_name}Page');
-
-Cypress.config('defaultCommandTimeout', 10000);
-Cypress.config('pageLoadTimeout', 30000);
-
-describe('{page_title} - Automated Test Suite', () => {{
-  const page = new {page_name}Page();
-
-  before(() => {{
-    // Load test data from fixtures
-    cy.fixture('test_data.json').as('testData');
-  }});
-
-  beforeEach(() => {{
-    // Visit page and wait for Livewire to load
-    page.visit();
-    cy.window().should('have.property', 'document.readyState', 'complete');
-    cy.get('body').should('be.visible');
-    cy.intercept('POST', '**/_livewire**').as('livewireUpdate');
-  }});
-
-  describe('Smoke Tests', () => {{
-    it('loads the page successfully', () => {{
-      // Verifies page loads and is interactable
-      cy.url().should('eq', '{url}');
-      cy.title().should('not.be.empty');
-      page.getElement('body').should('be.visible');
-      cy.on('uncaught:exception', (err) => {{
-        cy.log(`Unhandled exception: ${{err.message}}`);
-        return false;
-      }});
-    }});
-  }});
-
-  describe('End-to-End Tests', () => {{
-"""
-    # Form submission test
+
     forms = [e for e in elements if e['tag'] == 'form']
     inputs = [e for e in elements if e['tag'] == 'input']
     buttons = [e for e in elements if e['tag'] == 'button' or e['role'] == 'button']
 
+    # Form submission test
+    form_context = None
     if forms:
         form = forms[0]
-        form_selector = get_best_selector(form, soup)
         form_fields = [e for e in inputs if e.get('form') == form.get('id') or not e.get('form')]
         submit_button = next((b for b in buttons if 'submit' in b.get('type', '').lower()), None)
-
-        script += f"""
-    it('completes a Livewire form submission', () => {{
-      // Fills and submits a form, verifying Livewire update
-      // Assumes success message or redirect on submission
-      page.getElement('{form_selector}').should('exist').within(() => {{
-"""
+        fields = []
         for field in form_fields:
+            if field['type'] in ['submit', 'button', 'hidden'] or field['name'].startswith('_'):
+                continue
             wire_model = field.get('wire:model', '')
-            field_selector = f"[wire\\\\:model='{wire_model}']" if wire_model else get_best_selector(field, soup)
-            test_value = generate_realistic_input_value(field)
-            if field['type'] not in ['submit', 'button', 'hidden'] and not field['name'].startswith('_'):
-                script += f"""        page.getElement('{field_selector}')
-          .type('{test_value}', {{ delay: 50 }})
-          .should('have.value', '{test_value}');
-"""
-        if submit_button:
-            submit_selector = get_best_selector(submit_button, soup)
-            script += f"""        page.getElement('{submit_selector}').click();
-      }});
-      cy.wait('@livewireUpdate').its('response.statusCode').should('eq', 200);
-      cy.get('body').should('contain', 'success'); // Adjust based on response
-    }});
-"""
+            fields.append({
+                'selector': wire_model_selector(wire_model) if wire_model else resolve(field),
+                'value': generate_realistic_input_value(field),
+                'direct': bool(wire_model)
+            })
+        form_context = {
+            'selector': resolve(form),
+            'fields': fields,
+            'submit_selector': resolve(submit_button) if submit_button else None
+        }
 
     # Authentication tests
     login_form = next((f for f in forms if any('email' in i.get('name', '').lower() or i['type'] == 'email' for i in inputs)), None)
-    if login_form:
-        script += f"""
-    it('tests login with valid credentials', function() {{
-      // Tests successful login using fixture data
-      // Assumes redirect to dashboard on success
-      page.login(this.testData.users[0].email, this.testData.users[0].password);
-      cy.wait('@livewireUpdate');
-      cy.url().should('include', '/dashboard'); // Adjust based on redirect
-      cy.contains(this.testData.users[0].email); // Verify user data
-    }});
-
-    it('tests login with invalid credentials', function() {{
-      // Tests login failure with invalid credentials
-      // Assumes error message is displayed
-      page.login(this.testData.users[1].email, this.testData.users[1].password);
-      cy.wait('@livewireUpdate');
-      cy.contains('Invalid credentials'); // Adjust based on error message
-    }});
-"""
 
     # Error handling test
     required_fields = [e for e in elements if e.get('required')]
-    if required_fields:
-        field = required_fields[0]
-        field_selector = get_best_selector(field, soup)
-        script += f"""
-    it('validates required field', () => {{
-      // Tests form validation for required field
-      // Assumes error class or message on validation failure
-      page.getElement('{field_selector}').clear();
-      page.getElement('form').submit();
-      page.getElement('{field_selector}').should('have.class', 'error'); // Adjust based on validation
-    }});
-"""
+    required_context = {'selector': resolve(required_fields[0])} if required_fields else None
 
     # Livewire state test
     livewire_elements = [e for e in elements if e.get('wire:model')]
+    livewire_context = None
     if livewire_elements:
-        element = livewire_elements[0]
-        selector = f"[wire\\\\:model='{element['wire:model']}']"
-        test_value = generate_realistic_input_value(element)
-        script += f"""
-    it('verifies Livewire state update', () => {{
-      // Tests Livewire component state update
-      // Verifies input value persists after Livewire update
-      page.getElement('{selector}').type('{test_value}', {{ delay: 50 }});
-      cy.wait('@livewireUpdate');
-      page.getElement('{selector}').should('have.value', '{test_value}');
-    }});
-"""
+        livewire_context = {
+            'selector': wire_model_selector(livewire_elements[0]['wire:model']),
+            'value': generate_realistic_input_value(livewire_elements[0])
+        }
 
-    script += """
-  });
-}});
-"""
+    return {
+        'url': url,
+        'domain': urlparse(url).netloc,
+        'page_title': page_title,
+        'page_class': page_class_name(page_title),
+        'test_types': select_test_types(test_types, profiles),
+        'form': form_context,
+        'login_form': login_form is not None,
+        'required_field': required_context,
+        'livewire': livewire_context,
+        'responsive': responsive_context(url_data, resolve)
+    }
+
+def generate_cypress_script(url_data, soup, test_types=None, out=None, profiles=None):
+    """Generate a Cypress test script with enhanced tests and structure following docs.
+
+    Only the fragments for ``test_types`` (ids from /api/test_types; all by default) are
+    rendered, each with its profile from ``profiles``. Pass a writer as ``out`` to stream
+    the script instead of returning it.
+    """
+    script, _ = render_spec(build_spec_context(url_data, soup, test_types, profiles=profiles), out=out)
     return script
 
+def load_previous_snapshot(url: str) -> Optional[Dict[str, Any]]:
+    """Load the snapshot of the most recent completed job for ``url``, if there is one."""
+    for job in artifact_store.find_jobs(url=url, status='complete', limit=1):
+        snapshot = load_snapshot(artifact_store.read_artifact(job['job_id'], SNAPSHOT_ARTIFACT))
+        if snapshot is not None:
+            snapshot['job_id'] = job['job_id']
+            return snapshot
+    return None
+
+def find_cacheable_job(url: str, test_types: List[str], record_network: bool = False,
+                       viewports: Optional[List[Any]] = None) -> Optional[Dict[str, Any]]:
+    """Most recent completed job for ``url`` whose output can be reused for the same test types.
+
+    ``test_types`` are ``test_type_keys``, so a change of profile is a cache miss. Jobs
+    quarantined by verification are never reused, so their selectors get re-resolved.
+    """
+    for job in artifact_store.find_jobs(url=url, status='complete', limit=1):
+        metadata = job['metadata']
+        if metadata.get('fingerprint') and metadata.get('test_types') == test_types \
+                and not metadata.get('quarantined') \
+                and metadata.get('templates_digest') == TEMPLATES_DIGEST \
+                and bool(metadata.get('record_network')) == record_network \
+                and metadata.get('viewports') == viewports:
+            return job
+    return None
+
+def cached_generation_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the /api/generate response from a stored job's artifacts."""
+    listing = artifact_store.get_job(job['job_id'])['artifacts']
+    artifacts = {a['kind']: a['name'] for a in listing}
+    read = lambda kind: artifact_store.read_artifact(job['job_id'], artifacts[kind]).decode('utf-8')
+    return {
+        'job_id': job['job_id'],
+        'script': read('spec'),
+        'page_object': read('page_object'),
+        'fixture': json.loads(read('fixture')),
+        'filename': artifacts['spec'],
+        'page_filename': artifacts['page_object'],
+        'fixture_filename': artifacts['fixture'],
+        'component_filenames': sorted(a['name'] for a in listing if a['kind'] == 'component'),
+        'network_filename': artifacts.get('stubs'),
+        'element_count': job['metadata'].get('element_count', 0),
+        'page_title': job['metadata'].get('page_title', job['page_title']),
+        'ai_enhanced': True,
+        'cache_hit': True
+    }
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_token = metrics.begin_request()
+
+@app.after_request
+def record_request_metrics(response):
+    metrics.end_request(g.pop('metrics_token', None), request.endpoint or 'unmatched', request.method,
+                        response.status_code)
+    return response
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/api/generate', methods=['POST'])
-def generate_script():
-    try:
-        if not request.is_json:
-            return jsonify({'error': 'Request must be JSON'}), 400
-            
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Invalid JSON data'}), 400
-            
-        url = data.get('url')
-        if not url:
-            return jsonify({'error': 'URL is required'}), 400
-            
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
-            
-        url_data = crawl_website(url)
-        if 'error' in url_data:
-            return jsonify({
-                'error': 'Failed to crawl website',
-                'details': url_data['error']
-            }), 400
-            
-        if not url_data['elements']:
-            return jsonify({
-                'error': 'No testable elements found',
-                'details': 'The page might be using client-side rendering or blocking crawlers'
-            }), 400
-        
-        # Generate page object with AI-enhanced selectors
-        page_script = generate_page_object(url_data)
-        page_filename = secure_filename(f"{url_data['page_title'].replace(' ', '')}Page.js")
-        page_filepath = os.path.join(app.config['UPLOAD_FOLDER'], page_filename)
-        
-        with open(page_filepath, 'w') as f:
-            f.write(page_script)
-        
-        # Generate fixture with AI-suggested test data
-        fixture_data = generate_fixture_data()
-        fixture_filename = 'test_data.json'
-        fixture_filepath = os.path.join(app.config['UPLOAD_FOLDER'], fixture_filename)
-        
-        with open(fixture_filepath, 'w') as f:
-            json.dump(fixture_data, f, indent=2)
-        
-        # Generate Cypress script with AI-enhanced tests
-        soup = BeautifulSoup(requests.get(url, timeout=30).text, 'html.parser')
-        script = generate_cypress_script(url_data, soup)
-        
-        # Lint the script with ESLint
-        temp_filename = f"temp_{uuid.uuid4()}.js"
-        temp_filepath = os.path.join(app.config['UPLOAD_FOLDER'], temp_filename)
-        
-        with open(temp_filepath, 'w') as f:
-            f.write(script)
-            
-        result = subprocess.run(
-            ['eslint', '--fix', temp_filepath],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            print(f"Linting errors: {result.stderr}")
-            # Try to fix common linting issues
-            script = fix_common_linting_issues(script)
-        
-        os.remove(temp_filepath)
-        
-        # Save the final script
-        domain = urlparse(url).netloc.replace('.', '_')
-        filename = secure_filename(f"cypress_test_{domain}.js")
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        with open(filepath, 'w') as f:
-            f.write(script)
-        
-        return jsonify({
-            'script': script,
-            'page_object': page_script,
-            'fixture': fixture_data,
-            'filename': filename,
-            'page_filename': page_filename,
-            'fixture_filename': fixture_filename,
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    """Ready once this process's browser is running; server workers launch it before serving."""
+    ready = browser_pool.connected()
+    return jsonify({'status': 'ready' if ready else 'starting', 'pid': os.getpid()}), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage latency histograms, request and cache counters and pool gauges for Prometheus."""
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+def crawl_for_generation(url: str, test_types: List[str], force: bool = False,
+                         record_network: bool = False, auth: Optional[Dict[str, Any]] = None,
+                         viewports: Optional[List[Any]] = None, policy: Optional[CrawlPolicy] = None) -> Dict[str, Any]:
+    """Crawl ``url`` for generation, logged in with ``auth`` if given, at each of ``viewports``.
+
+    Returns the parsed page, an ``{'error': ...}`` dict, or, when the page is unchanged
+    since the last generation with the same test types and templates (and ``force`` is
+    not set), the stored response with ``cache_hit`` set.
+    """
+    cached_job = None if force else find_cacheable_job(url, test_types, record_network, viewports)
+    url_data = crawl_website(url, cached_job['metadata']['fingerprint'] if cached_job else None, record_network, auth,
+                             viewports, policy)
+    return generation_input(url_data, cached_job, force)
+
+def snapshot_for_generation(snapshot: Dict[str, Any], test_types: List[str], force: bool = False,
+                            render: bool = False, viewports: Optional[List[Any]] = None,
+                            policy: Optional[CrawlPolicy] = None) -> Dict[str, Any]:
+    """``crawl_for_generation`` for a saved page, loaded by ``load_page_snapshot``."""
+    viewports = viewports if render else None
+    cached_job = None if force else find_cacheable_job(snapshot['url'], test_types, False, viewports)
+    url_data = load_page_snapshot(snapshot, cached_job['metadata']['fingerprint'] if cached_job else None, render,
+                                  viewports, policy)
+    return generation_input(url_data, cached_job, force)
+
+def generation_input(url_data: Dict[str, Any], cached_job: Optional[Dict[str, Any]], force: bool) -> Dict[str, Any]:
+    """The parsed page, the error, or the stored response of ``cached_job`` if the page is unchanged."""
+    if url_data.get('unchanged'):
+        metrics.cache_lookup('generation', hits=1)
+        return cached_generation_response(cached_job)
+    if not force:
+        metrics.cache_lookup('generation', hits=0, misses=1)
+
+    if 'error' in url_data:
+        return {
+            'error': 'Failed to crawl website',
+            'details': url_data['error']
+        }
+
+    if not url_data['elements']:
+        return {
+            'error': 'No testable elements found',
+            'details': 'The page might be using client-side rendering or blocking crawlers'
+        }
+    return url_data
+
+def generate_page(url_data: Dict[str, Any], test_types: Optional[List[str]] = None, incremental: bool = True,
+                  components: Optional[List[Dict[str, Any]]] = None,
+                  component_sources: Optional[Dict[str, str]] = None,
+                  shared_ai: Optional[Dict[str, Any]] = None,
+                  profiles: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Generate, lint and store the spec, page object and fixture for a crawled page.
+
+    ``components`` are the shared components the page object composes and
+    ``component_sources`` their rendered sources, stored with the job. Network traffic
+    recorded by the crawl (``url_data['network']``) is stored as a HAR log plus fixtures
+    and replayed by a stubs module the page object loads. Returns the /api/generate
+    response for the page.
+    """
+    url = url_data['url']
+
+    # Diff against the last successful generation of this URL so that AI enrichment,
+    # selector resolution and spec fragments are only recomputed for what changed
+    previous = load_previous_snapshot(url) if incremental else None
+    diff = diff_elements(url_data['elements'], previous)
+    with metrics.stage('ai_enrichment'):
+        ai_reused, ai_calls = enrich_elements(url_data, previous, shared_ai)
+    metrics.cache_lookup('ai_suggestions', ai_reused, ai_calls)
+
+    job_id = artifact_store.create_job(url, url_data['page_title'])
+
+    # Generate page object with AI-enhanced selectors
+    network = url_data.get('network')
+    network_module = f"{page_class_name(url_data['page_title'])}Network" if network else None
+    with metrics.stage('generation'):
+        page_script = generate_page_object(url_data, components, network_module)
+    page_filename = f"{page_class_name(url_data['page_title'])}.js"
+
+    # Generate fixture with AI-suggested test data
+    fixture_data = generate_fixture_data()
+    fixture_filename = 'test_data.json'
+    with metrics.stage('write'):
+        artifact_store.write_artifact(job_id, fixture_filename, json.dumps(fixture_data, indent=2), kind='fixture')
+
+    # Generate Cypress script with AI-enhanced tests
+    # Selectors that failed verification of earlier specs for this page are not reused
+    # and resolution moves on to the next candidate
+    soup = url_data['soup']
+    avoid = selector_feedback.avoid(url)
+    reusable = {key: selector for key, selector in reusable_selectors(url_data['elements'], previous, diff).items()
+                if selector not in avoid}
+    resolver = SelectorResolver(soup, lambda element, scope: get_best_selector(element, scope, avoid), reusable)
+    with metrics.stage('selector_resolution'):
+        context = build_spec_context(url_data, soup, test_types, resolver, profiles)
+    metrics.cache_lookup('selectors', resolver.hits, len(resolver.resolved) - resolver.hits)
+    with metrics.stage('generation'):
+        script, fragments = render_spec(context, (previous or {}).get('fragments'))
+    label = page_label(url, url_data.get('snapshot')).replace('.', '_')
+    filename = secure_filename(f"cypress_test_{label}.js")
+
+    sources = {filename: script, page_filename: page_script}
+    network_filename = f"{network_module}.js" if network else None
+    if network:
+        with metrics.stage('generation'):
+            sources[network_filename] = generate_network_stubs(url_data)
+
+    with metrics.stage('lint'):
+        sources = lint_sources(sources)
+    script = sources[filename]
+    page_script = sources[page_filename]
+
+    # Save the final files; component sources are content-addressed, so every job that
+    # uses a component references the same stored blob
+    with metrics.stage('write'):
+        artifact_store.write_artifact(job_id, page_filename, page_script, kind='page_object')
+        artifact_store.write_artifact(job_id, filename, script, kind='spec')
+        for component_filename, source in (component_sources or {}).items():
+            artifact_store.write_artifact(job_id, component_filename, source, kind='component')
+        if network:
+            artifact_store.write_artifact(job_id, network_filename, sources[network_filename], kind='stubs')
+            for entry in network:
+                name = fixture_name(entry)
+                if name:
+                    artifact_store.write_artifact(job_id, name, entry['body'], kind='fixture')
+            artifact_store.write_artifact(job_id, HAR_ARTIFACT, json.dumps(to_har(network, url)), kind='har')
+        snapshot = build_snapshot(url, url_data['elements'], {**resolver.reused, **resolver.resolved}, fragments)
+        artifact_store.write_artifact(job_id, SNAPSHOT_ARTIFACT, json.dumps(snapshot), kind='snapshot')
+        artifact_store.finish_job(job_id, metadata={
             'element_count': len(url_data['elements']),
+            'fingerprint': url_data['fingerprint'],
+            'test_types': test_type_keys(context['test_types']),
+            'templates_digest': TEMPLATES_DIGEST,
             'page_title': url_data['page_title'],
-            'ai_enhanced': True
+            'record_network': network is not None,
+            'network_requests': len(network or []),
+            'viewports': url_data.get('viewport_spec'),
+            'snapshot': url_data.get('snapshot'),
+            'crawl_timings': url_data.get('crawl_timings')
         })
+        artifact_store.maybe_evict()
+
+    return {
+        'job_id': job_id,
+        'script': script,
+        'page_object': page_script,
+        'fixture': fixture_data,
+        'filename': filename,
+        'page_filename': page_filename,
+        'fixture_filename': fixture_filename,
+        'component_filenames': sorted(component_sources or {}),
+        'network_filename': network_filename,
+        'network_requests': len(network or []),
+        'crawl_timings': url_data.get('crawl_timings'),
+        'element_count': len(url_data['elements']),
+        'page_title': url_data['page_title'],
+        'ai_enhanced': True,
+        'cache_hit': False,
+        'incremental': {
+            'previous_job_id': previous['job_id'] if previous else None,
+            'added': len(diff['added']),
+            'changed': len(diff['changed']),
+            'removed': len(diff['removed']),
+            'unchanged': len(diff['unchanged']),
+            'ai_calls': ai_calls,
+            'selectors_reused': resolver.hits
+        }
+    }
+
+def run_completed(calls: Dict[Any, Tuple], workers: int = 1) -> Iterator[Tuple[Any, Any]]:
+    """Run ``calls`` (``{key: (fn, *args)}``) and yield ``(key, result)`` as each finishes.
+
+    With one worker the calls run in order on this thread. Otherwise up to ``workers``
+    run at a time, each in a copy of this thread's context so that their stage timings
+    still reach the current request's breakdown.
+    """
+    if workers <= 1:
+        for key, (fn, *args) in calls.items():
+            yield key, fn(*args)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, fn, *args): key
+                   for key, (fn, *args) in calls.items()}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+def generate_batch(urls: List[str], test_types: Optional[List[str]] = None, incremental: bool = True,
+                   force: bool = False, profiles: Optional[Dict[str, str]] = None,
+                   record_network: bool = False, auth: Optional[Dict[str, Any]] = None,
+                   viewports: Optional[List[Any]] = None, policy: Optional[CrawlPolicy] = None,
+                   workers: int = 1, progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                   limiter: Optional[HostLimiter] = None, snapshots: Optional[List[Dict[str, Any]]] = None,
+                   render: bool = False) -> Dict[str, Any]:
+    """Generate several pages, emitting components they share once.
+
+    Pages that fail to crawl are reported in place. Unchanged pages are answered from
+    their stored jobs only if no page of the batch changed; otherwise their stored page
+    objects would compose other components than the new ones, so they are crawled
+    again for component detection and generated with the rest. Up to ``workers`` pages
+    are crawled, and then generated, at a time; ``limiter`` further limits how many
+    crawls of one host run at once and how closely they follow each other.
+    ``progress(url, result)`` is called as each page is finished. With ``snapshots``,
+    the saved copies of ``urls`` in order, pages are loaded from them (rendered if
+    ``render`` is set) instead of being crawled.
+    """
+    selected_types = test_type_keys(select_test_types(test_types, profiles))
+    results: List[Optional[Dict[str, Any]]] = [None] * len(urls)
+    pages = []
+
+    def finish(index: int, result: Dict[str, Any]) -> None:
+        results[index] = result
+        if progress:
+            progress(urls[index], result)
+
+    def crawl(index: int, url: str, force: bool = force) -> Dict[str, Any]:
+        if snapshots is not None:
+            return snapshot_for_generation(snapshots[index], selected_types, force, render, viewports, policy)
+        if limiter is None:
+            return crawl_for_generation(url, selected_types, force, record_network, auth, viewports, policy)
+        with limiter.slot(url):
+            return crawl_for_generation(url, selected_types, force, record_network, auth, viewports, policy)
+
+    cache_hits = {}
+    crawls = {index: (crawl, index, url) for index, url in enumerate(urls)}
+    for index, result in run_completed(crawls, workers):
+        if 'elements' in result:
+            pages.append((index, result))
+        elif result.get('cache_hit'):
+            cache_hits[index] = result
+        else:
+            finish(index, {'url': urls[index], **result})
+    if pages and cache_hits:
+        # The stored jobs' DOM is not kept, so unchanged pages are parsed again
+        recrawls = {index: (crawl, index, urls[index], True) for index in cache_hits}
+        for index, result in run_completed(recrawls, workers):
+            if 'elements' in result:
+                pages.append((index, result))
+            else:
+                finish(index, {'url': urls[index], **result})
+    else:
+        for index, result in cache_hits.items():
+            finish(index, {'url': urls[index], **result})
+    # Component detection and naming depend on page order, not on which crawl finished first
+    pages.sort(key=lambda page: page[0])
+
+    components = find_shared_components([url_data for _, url_data in pages], get_xpath)
+    with metrics.stage('generation'):
+        sources = {c['filename']: generate_component_object(c) for c in components}
+    with metrics.stage('lint'):
+        sources = lint_sources(sources)
+
+    shared_ai: Dict[str, Any] = {}
+
+    def generate(page_index: int, url_data: Dict[str, Any]) -> Dict[str, Any]:
+        used = page_components(components, page_index, COMPONENT_REQUIRE_PREFIX)
+        return generate_page(url_data, test_types, incremental, used,
+                             {c['filename']: sources[c['filename']] for c in used}, shared_ai, profiles)
+
+    # Pages generated at the same time may both ask for a shared component's suggestions
+    generations = {index: (generate, page_index, url_data) for page_index, (index, url_data) in enumerate(pages)}
+    for index, result in run_completed(generations, workers):
+        finish(index, result)
+
+    return {
+        'jobs': results,
+        'components': [
+            {
+                'class_name': c['class_name'],
+                'filename': c['filename'],
+                'element_count': len(c['elements']),
+                'urls': [urls[pages[i][0]] for i in c['pages']]
+            } for c in components
+        ],
+        'ai_calls': sum(r['incremental']['ai_calls'] for r in results if r.get('incremental'))
+    }
+
+def is_admin() -> bool:
+    """Whether the request carries the configured ``X-Admin-Token``."""
+    token = app.config['ADMIN_TOKEN']
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8'))
+
+def profiling_requested() -> bool:
+    flag = request.headers.get('X-Profile') or request.args.get('profile') or ''
+    return flag.lower() in ('1', 'true', 'yes')
+
+def save_profile(profiler: SamplingProfiler, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Store a request profile with each job the request generated or reused.
+
+    The collapsed stacks and the top-functions summary become ``profile`` artifacts,
+    named by time so that profiles of several requests for a job are all kept.
+    """
+    summary = profiler.summary()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.gmtime())
+    collapsed_name, summary_name = f"profile-{stamp}.collapsed", f"profile-{stamp}.json"
+    for job in jobs:
+        artifact_store.write_artifact(job['job_id'], collapsed_name, profiler.collapsed(), kind='profile')
+        artifact_store.write_artifact(job['job_id'], summary_name, json.dumps(summary, indent=2), kind='profile')
+    return {
+        'job_ids': [job['job_id'] for job in jobs],
+        'collapsed_filename': collapsed_name if jobs else None,
+        'summary_filename': summary_name if jobs else None,
+        **summary
+    }
+
+def request_snapshots(uploads, data: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """The saved pages a generate request names, or None if it names URLs to crawl.
+
+    They are the uploaded files or the files at ``snapshot_path``, a file or directory
+    inside ``SNAPSHOT_DIR``. ``url`` sets the URL of a single snapshot. Raises
+    ``ValueError`` (or ``OSError``) with a message for the client.
+    """
+    url = data.get('url')
+    if url is not None and not isinstance(url, str):
+        raise ValueError('url must be a string')
+    if uploads:
+        return [read_snapshot(upload.read(), os.path.basename(upload.filename or 'snapshot.html'),
+                              url if len(uploads) == 1 else None) for upload in uploads]
+
+    path = data.get('snapshot_path')
+    if path is None:
+        return None
+    root = app.config['SNAPSHOT_DIR']
+    if not root:
+        raise ValueError('snapshot_path is disabled; set SNAPSHOT_DIR or upload the snapshots')
+    if not isinstance(path, str) or not path:
+        raise ValueError('snapshot_path must be a file or directory in SNAPSHOT_DIR')
+    full_path = os.path.join(root, path)
+    if not within(root, full_path) or not os.path.exists(full_path):
+        raise ValueError(f'No snapshot file or directory {path} in SNAPSHOT_DIR')
+    # Symlinks may lead out of SNAPSHOT_DIR
+    files = [f for f in find_snapshot_files([full_path]) if within(root, f)]
+    if not files:
+        raise ValueError(f'No HTML or MHTML files in {path}')
+    return [load_snapshot_file(f, url if len(files) == 1 else None) for f in files]
+
+@app.route('/api/generate', methods=['POST'])
+def generate_script():
+    profiler = None
+    try:
+        if profiling_requested():
+            if not is_admin():
+                return jsonify({'error': 'Profiling is restricted to admins'}), 403
+            # Sample this request's thread and the browser pool's loop, where pages are parsed
+            profiler = SamplingProfiler({'request': threading.get_ident(), 'browser-pool': browser_pool.loop_thread_id()},
+                                        app.config['PROFILE_INTERVAL_MS'] / 1000).start()
+
+        # Saved pages may be uploaded as multipart form data, with the other options as JSON
+        try:
+            uploads = request.files.getlist('snapshot')
+        except RequestEntityTooLarge:
+            return jsonify({'error': f"Upload larger than {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+        if uploads:
+            try:
+                data = json.loads(request.form.get('options') or '{}')
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                return jsonify({'error': 'options must be a JSON object'}), 400
+        else:
+            if not request.is_json:
+                return jsonify({'error': 'Request must be JSON'}), 400
+
+            data = request.get_json()
+            if not data:
+                return jsonify({'error': 'Invalid JSON data'}), 400
+
+        try:
+            snapshots = request_snapshots(uploads, data)
+        except (OSError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        render = bool(data.get('render'))
+
+        if snapshots is not None:
+            if data.get('record_network') or data.get('auth'):
+                return jsonify({'error': 'record_network and auth need a live crawl, not a snapshot'}), 400
+            urls = [snapshot['url'] for snapshot in snapshots]
+        else:
+            urls = data.get('urls')
+            if urls is not None and (not isinstance(urls, list) or not urls or not all(isinstance(u, str) and u for u in urls)):
+                return jsonify({'error': 'urls must be a non-empty list of URLs'}), 400
+
+            url = data.get('url')
+            if not url and not urls:
+                return jsonify({'error': 'URL is required'}), 400
+
+            urls = [u if u.startswith(('http://', 'https://')) else 'https://' + u for u in (urls or [url])]
+
+        test_types = data.get('test_types')
+        if test_types is not None and not isinstance(test_types, list):
+            return jsonify({'error': 'test_types must be a list of test type ids'}), 400
+        profiles = data.get('profiles')
+        if profiles is not None and not isinstance(profiles, dict):
+            return jsonify({'error': 'profiles must map test type ids to profile names'}), 400
+        try:
+            selected_types = test_type_keys(select_test_types(test_types, profiles))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        incremental = data.get('incremental', True)
+        force = bool(data.get('force'))
+        record_network = bool(data.get('record_network'))
+        auth = data.get('auth')
+        if auth is not None:
+            try:
+                validate_flow(auth)
+            except ValueError as e:
+                return jsonify({'error': f'Invalid auth flow: {e}'}), 400
+        viewports = data.get('viewports')
+        if viewports is not None:
+            try:
+                validate_viewports(viewports)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        crawl_options = data.get('crawl')
+        if crawl_options is not None and not isinstance(crawl_options, dict):
+            return jsonify({'error': 'crawl must be an object of crawl options'}), 400
+        try:
+            policy = crawl_policy.with_overrides(crawl_options)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if 'urls' in data or len(urls) > 1:
+            response = generate_batch(urls, test_types, incremental, force, profiles, record_network, auth, viewports,
+                                      policy, snapshots=snapshots, render=render)
+            generated = [job for job in response['jobs'] if job.get('job_id')]
+        else:
+            # Unless forced, a page whose fingerprint matches the last generation made with the
+            # same test types and templates is answered from the stored artifacts
+            if snapshots is not None:
+                response = snapshot_for_generation(snapshots[0], selected_types, force, render, viewports, policy)
+            else:
+                response = crawl_for_generation(urls[0], selected_types, force, record_network, auth, viewports,
+                                                policy)
+            if 'error' in response:
+                return jsonify(response), 400
+            if not response.get('cache_hit'):
+                response = generate_page(response, test_types, incremental, profiles=profiles)
+            generated = [response]
+
+        # Optionally run the generated specs before returning them
+        if data.get('verify') and generated:
+            with metrics.stage('verify'):
+                response['verification'] = verify_jobs([artifact_store.get_job(job['job_id']) for job in generated],
+                                                       bool(data.get('verify_live')))
+        response['timings'] = metrics.request_timings()
+        if profiler:
+            response['profile'] = save_profile(profiler.stop(), generated)
+        return jsonify(response)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    finally:
+        if profiler:
+            profiler.stop()
 
 def fix_common_linting_issues(script: str) -> str:
-    """Fix common ESLint issues in the generated script."""
-    fixes = {
-        'no-unused-vars': lambda s: re.sub(r'const\s+(\w+)\s*=\s*[^;]+;\s*(?!.*\1)', '', s),
-        'no-console': lambda s: re.sub(r'console\.log\([^)]+\);', '', s),
-        'semi': lambda s: re.sub(r'([^;])\n', r'\1;\n', s)
-    }
-    
-    for fix in fixes.values():
-        script = fix(script)
-    
-    return script
+    """Fix common ESLint issues (semicolons, unused declarations, quotes, indentation) in one linear pass."""
+    return postprocess_js(script)
+
+def lint_sources(sources: Dict[str, str]) -> Dict[str, str]:
+    """Clean up generated JavaScript files, then lint and fix them with ESLint if it is installed.
+
+    The post-processor runs on every file, so output is tidy without Node; ESLint's fixes
+    come on top, for all files in one round trip to the worker.
+    """
+    sources = {name: fix_common_linting_issues(source) for name, source in sources.items()}
+    lint_results = eslint_worker.lint(sources)
+    if not lint_results:
+        return sources
+    for name, result in lint_results.items():
+        if result['errorCount']:
+            print(f"Linting errors in {name}: {result['messages']}")
+    return {name: result['output'] for name, result in lint_results.items()}
 
 @app.route('/api/test_types', methods=['GET'])
 def get_test_types():
     """Return the types of tests that can be generated."""
     return jsonify({
         'test_types': [
-            {'id': 'basic', 'name': 'Basic Page Tests', 'description': 'Tests that the page loads and basic elements are visible'},
-            {'id': 'interactive', 'name': 'Interactive Element Tests', 'description': 'Tests for forms, buttons, and inputs'},
-            {'id': 'auth', 'name': 'Authentication Tests', 'description': 'Tests for login flows'},
-            {'id': 'validation', 'name': 'Validation Tests', 'description': 'Tests for form validation'}
-        ]
+            {'id': t['id'], 'name': t['name'], 'description': t['description'], 'profiles': t['profiles']}
+            for t in TEST_TYPES
+        ],
+        'profiles': [{'id': profile, 'description': description} for profile, description in PROFILES.items()]
     })
 
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """List stored generation jobs, filtered by domain and creation time (unix seconds)."""
+    try:
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        limit = min(request.args.get('limit', 50, type=int), 500)
+        jobs = artifact_store.find_jobs(domain=request.args.get('domain'), since=since,
+                                        until=until, status=request.args.get('status'), limit=limit)
+        return jsonify({'jobs': jobs})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Return a stored job and its artifact listing."""
+    job = artifact_store.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/download', methods=['GET'])
+def download_job(job_id):
+    """Stream a single job as a ready-to-run Cypress project ZIP."""
+    return download_project(job_ids=[job_id])
+
+def load_jobs(job_ids: List[str]):
+    """Fetch jobs by id; returns ``(jobs, None)`` or ``(None, error response)``."""
+    if not job_ids:
+        return None, (jsonify({'error': 'At least one job id is required'}), 400)
+    jobs = []
+    for job_id in job_ids:
+        job = artifact_store.get_job(job_id)
+        if job is None:
+            return None, (jsonify({'error': f'Job not found: {job_id}'}), 404)
+        jobs.append(job)
+    return jobs, None
+
+def project_specs(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Tests and runtime features of every spec in the project exported from ``jobs``."""
+    layout = project_layout(jobs)
+    page_objects = {job['job_id']: artifact for _, job, artifact in layout if artifact['kind'] == 'page_object'}
+    files = []
+    for path, job, artifact in layout:
+        if artifact['kind'] != 'spec':
+            continue
+        page_object = page_objects.get(job['job_id'])
+        files.append({
+            'path': path,
+            'source': artifact_store.read_artifact(job['job_id'], artifact['name']).decode('utf-8'),
+            'page_object': artifact_store.read_artifact(job['job_id'], page_object['name']).decode('utf-8')
+            if page_object else ''
+        })
+    return analyze_specs(files)
+
+def quarantined_specs(jobs: List[Dict[str, Any]]) -> List[str]:
+    """Project paths of the specs of ``jobs`` that failed their last verification."""
+    return [path for path, job, artifact in project_layout(jobs)
+            if artifact['kind'] == 'spec' and job['metadata'].get('quarantined')]
+
+def verify_jobs(jobs: List[Dict[str, Any]], live: bool = False,
+                concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """Run the specs of ``jobs`` in parallel headless Cypress and record the outcome.
+
+    Jobs whose spec fails are quarantined (and passing ones released), timings of passed
+    tests refine the runtime model, and selectors named by failures are avoided the next
+    time the page is generated. Returns an ``{'error': ...}`` dict if Cypress cannot run.
+    """
+    if not verification_runner.available():
+        return {'error': 'Verification requires Node.js and npm'}
+    specs = project_specs(jobs)
+    spec_jobs = {path: job for path, job, artifact in project_layout(jobs) if artifact['kind'] == 'spec'}
+    try:
+        results = verification_runner.run(project_entries(artifact_store, jobs), [s['path'] for s in specs],
+                                           live, concurrency)
+    except RuntimeError as e:
+        return {'error': 'Verification failed to start', 'details': str(e)}
+
+    for result in results:
+        job = spec_jobs[result['spec']]
+        result['job_id'] = job['job_id']
+        result['replayed'] = bool(job['metadata'].get('record_network')) and not live
+        if result['status'] == 'error':
+            continue
+        selectors = failing_selectors(result['tests'])
+        selector_feedback.record(job['url'], selectors)
+        result['failing_selectors'] = sorted(selectors)
+        artifact_store.update_metadata(job['job_id'], {
+            'quarantined': result['status'] == 'failed',
+            'verification': {
+                'status': result['status'],
+                'live': live,
+                'verified_at': time.time(),
+                'passed': sum(1 for t in result['tests'] if t['passed']),
+                'failed': [t['full_title'] for t in result['tests'] if not t['passed']],
+                'failing_selectors': sorted(selectors)
+            }
+        })
+
+    report = [test for result in results for test in result['tests']]
+    matched = timing_model.refine(match_observations(specs, report))
+    return {
+        'specs': results,
+        'passed': sum(1 for r in results if r['status'] == 'passed'),
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'errors': sum(1 for r in results if r['status'] == 'error'),
+        'quarantined': [r['job_id'] for r in results if r['status'] == 'failed'],
+        'timings_matched': matched,
+        'concurrency': max(1, min(concurrency or verification_runner.concurrency, len(results)))
+    }
+
+@app.route('/api/download', methods=['GET'])
+def download_project(job_ids=None):
+    """Stream several jobs (``?job=<id>&job=<id>``) as one Cypress project ZIP.
+
+    With ``?shards=N`` the project includes a runtime-balanced sharding manifest.
+    """
+    jobs, error = load_jobs(job_ids or request.args.getlist('job'))
+    if error:
+        return error
+
+    extra = {}
+    shards = request.args.get('shards', type=int)
+    if shards:
+        extra[MANIFEST_ARTIFACT] = json.dumps(
+            build_manifest(project_specs(jobs), shards, timing_model, quarantined_specs(jobs)), indent=2)
+
+    filename = f"cypress_project_{jobs[0]['job_id']}.zip" if len(jobs) == 1 else 'cypress_project.zip'
+    return Response(
+        stream_with_context(stream_zip(project_entries(artifact_store, jobs, extra))),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@app.route('/api/shards', methods=['GET'])
+def shard_manifest():
+    """Split the specs of ``?job=<id>&job=<id>`` into ``?shards=N`` runtime-balanced shards."""
+    jobs, error = load_jobs(request.args.getlist('job'))
+    if error:
+        return error
+    shards = request.args.get('shards', 2, type=int)
+    if shards < 1:
+        return jsonify({'error': 'shards must be at least 1'}), 400
+    return jsonify(build_manifest(project_specs(jobs), shards, timing_model, quarantined_specs(jobs)))
+
+@app.route('/api/timings', methods=['POST'])
+def submit_timings():
+    """Refine the runtime model from a Cypress JUnit XML or mochawesome JSON report.
+
+    The report must come from running the project exported from ``?job=<id>&job=<id>``,
+    so reported tests can be matched to the generated ones.
+    """
+    jobs, error = load_jobs(request.args.getlist('job'))
+    if error:
+        return error
+    try:
+        report = parse_timing_report(request.get_data(as_text=True))
+    except Exception as e:
+        return jsonify({'error': f'Unreadable timing report: {e}'}), 400
+    matched = timing_model.refine(match_observations(project_specs(jobs), report))
+    return jsonify({'reported': len(report), 'matched': matched, 'model': timing_model.to_dict()})
+
+@app.route('/api/verify', methods=['POST'])
+def verify():
+    """Run the specs of ``?job=<id>&job=<id>`` in headless Cypress and quarantine failing ones.
+
+    ``?live=1`` runs jobs recorded with ``record_network`` against the live site instead
+    of the recorded replay; ``?concurrency=N`` overrides the worker count.
+    """
+    jobs, error = load_jobs(request.args.getlist('job'))
+    if error:
+        return error
+    result = verify_jobs(jobs, request.args.get('live', type=int) == 1, request.args.get('concurrency', type=int))
+    if 'error' in result:
+        return jsonify(result), 503
+    return jsonify(result)
+
 @app.route('/api/ask-ai', methods=['POST'])
 def ask_ai():
     """Handle AI questions about Thirlo's CV."""
@@ -673,7 +1484,7 @@ Achievements/Projects:
 [Any other sections, like Volunteer Work, Publications, or References]
 """
         
-        client = OpenAI(api_key=app.config['OPENAI_API_KEY'])
+        client = openai_client()
         
         prompt = f"""You are Thirlo's AI assistant, specialized in answering questions about Thirlo's professional background, experience, skills, education, certifications, and achievements based solely on his CV. 
         Always keep responses relevant to Thirlo's CV—do not speculate, add external information, or answer unrelated questions. If the question is off-topic, politely redirect the user to ask about Thirlo's QA experience, skills, projects, or similar.
@@ -714,4 +1525,5 @@ Achievements/Projects:
 if __name__ == '__main__':
     import sys
     port = 5001 if len(sys.argv) > 1 and sys.argv[1] == '--port' else 5000
-    app.run(debug=True, port=port)
\ No newline at end of file
+    # Debug mode (reloader and in-browser debugger) only with FLASK_DEBUG=1
+    app.run(port=port)
\ No newline at end of file
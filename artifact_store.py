@@ -0,0 +1,307 @@
+"""Per-job, content-addressed storage for generated Cypress artifacts."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+DEFAULT_EVICT_INTERVAL = 60
+# Jobs still pending this long after creation were abandoned by a failed generation
+DEFAULT_PENDING_TIMEOUT = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    page_title TEXT,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_domain_created ON jobs (domain, created_at);
+CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at);
+CREATE INDEX IF NOT EXISTS jobs_url_created ON jobs (url, created_at);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    job_id TEXT NOT NULL REFERENCES jobs (job_id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES blobs (digest),
+    size INTEGER NOT NULL,
+    PRIMARY KEY (job_id, name)
+);
+CREATE INDEX IF NOT EXISTS artifacts_digest ON artifacts (digest);
+"""
+
+
+class ArtifactStore:
+    """Stores each generation job under its own namespace, backed by deduplicated blobs.
+
+    Blob files live under ``<root>/blobs/<aa>/<sha256>`` and are written atomically
+    (temp file + ``os.replace``). A SQLite index maps jobs to their named artifacts and
+    supports lookup by domain and creation time. ``evict()`` applies the retention policy;
+    ``maybe_evict()`` does so at most every ``evict_interval`` seconds per process.
+    """
+
+    def __init__(self, root: str, max_age_seconds: Optional[float] = None,
+                 max_total_bytes: Optional[int] = None, evict_interval: float = DEFAULT_EVICT_INTERVAL,
+                 pending_timeout: float = DEFAULT_PENDING_TIMEOUT):
+        self.root = root
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.index_path = os.path.join(root, 'index.sqlite3')
+        self.max_age_seconds = max_age_seconds
+        self.max_total_bytes = max_total_bytes
+        self.evict_interval = evict_interval
+        self.pending_timeout = pending_timeout
+        self._last_evict: Optional[float] = None
+        self._evict_lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a write transaction that holds the database lock for its whole duration."""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def create_job(self, url: str, page_title: str = '', metadata: Optional[Dict[str, Any]] = None) -> str:
+        """Register a new job namespace and return its id."""
+        job_id = uuid.uuid4().hex
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO jobs (job_id, url, domain, page_title, status, created_at, metadata) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, url, urlparse(url).netloc, page_title, 'pending', time.time(),
+                 json.dumps(metadata or {}))
+            )
+        return job_id
+
+    def write_artifact(self, job_id: str, name: str, content: Union[str, bytes], kind: str = 'file') -> str:
+        """Store ``content`` as artifact ``name`` of ``job_id`` and return its blob digest."""
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(digest)
+        # Identical content is only written once; the existence check is repeated under
+        # the lock in case eviction removed the blob in between.
+        if not os.path.exists(path):
+            self._write_atomic(path, data)
+        with self._transaction() as conn:
+            if not os.path.exists(path):
+                self._write_atomic(path, data)
+            conn.execute('INSERT OR IGNORE INTO blobs (digest, size, created_at) VALUES (?, ?, ?)',
+                         (digest, len(data), time.time()))
+            conn.execute('INSERT OR REPLACE INTO artifacts (job_id, name, kind, digest, size) '
+                         'VALUES (?, ?, ?, ?, ?)', (job_id, name, kind, digest, len(data)))
+        return digest
+
+    def finish_job(self, job_id: str, status: str = 'complete', metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Mark a job as finished, merging ``metadata`` into what was stored at creation."""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT metadata FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            merged = json.loads(row['metadata'] or '{}')
+            merged.update(metadata or {})
+            conn.execute('UPDATE jobs SET status = ?, metadata = ? WHERE job_id = ?',
+                         (status, json.dumps(merged), job_id))
+
+    def update_metadata(self, job_id: str, metadata: Dict[str, Any]) -> None:
+        """Merge ``metadata`` into a job's metadata without changing its status."""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT metadata FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            merged = json.loads(row['metadata'] or '{}')
+            merged.update(metadata)
+            conn.execute('UPDATE jobs SET metadata = ? WHERE job_id = ?', (json.dumps(merged), job_id))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job with its artifact listing, or None if it does not exist."""
+        conn = self._connection()
+        row = conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = self._job_from_row(row)
+        job['artifacts'] = [
+            dict(a) for a in conn.execute(
+                'SELECT name, kind, digest, size FROM artifacts WHERE job_id = ? ORDER BY name', (job_id,))
+        ]
+        return job
+
+    def find_jobs(self, domain: Optional[str] = None, since: Optional[float] = None,
+                  until: Optional[float] = None, status: Optional[str] = None,
+                  url: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Look up jobs by domain (or exact URL) and creation time, newest first."""
+        clauses, params = [], []
+        if url:
+            clauses.append('url = ?')
+            params.append(url)
+        if domain:
+            clauses.append('domain = ?')
+            params.append(domain)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('created_at < ?')
+            params.append(until)
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        params.append(limit)
+        rows = self._connection().execute(
+            f'SELECT * FROM jobs {where} ORDER BY created_at DESC LIMIT ?', params)
+        return [self._job_from_row(row) for row in rows]
+
+    def artifact_location(self, job_id: str, name: str) -> Optional[Tuple[str, int]]:
+        """Return the blob path and size backing an artifact, or None if it is unknown."""
+        row = self._connection().execute(
+            'SELECT digest, size FROM artifacts WHERE job_id = ? AND name = ?', (job_id, name)).fetchone()
+        if row is None:
+            return None
+        return self.blob_path(row['digest']), row['size']
+
+    def read_artifact(self, job_id: str, name: str) -> Optional[bytes]:
+        location = self.artifact_location(job_id, name)
+        if location is None:
+            return None
+        with open(location[0], 'rb') as f:
+            return f.read()
+
+    def total_bytes(self) -> int:
+        """Disk usage of all stored blobs (each unique blob counted once)."""
+        row = self._connection().execute('SELECT COALESCE(SUM(size), 0) AS total FROM blobs').fetchone()
+        return row['total']
+
+    def maybe_evict(self, now: Optional[float] = None) -> Optional[Dict[str, int]]:
+        """Run ``evict()`` if it has not run in this process for ``evict_interval`` seconds."""
+        with self._evict_lock:
+            clock = time.monotonic()
+            if self._last_evict is not None and clock - self._last_evict < self.evict_interval:
+                return None
+            self._last_evict = clock
+        return self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> Dict[str, int]:
+        """Drop expired and abandoned jobs, then oldest jobs until under the size limit, then orphaned blobs.
+
+        Jobs past the age limit and jobs still pending after ``pending_timeout`` go first.
+        The jobs to drop for size are chosen in one pass over the artifact index, counting
+        a blob as freed once no remaining job references it. All of them are deleted in
+        one statement, and orphaned blob files are unlinked after the deletion commits.
+        """
+        now = time.time() if now is None else now
+        removed = {'jobs': 0, 'blobs': 0, 'bytes': 0}
+        with self._transaction() as conn:
+            if self.max_age_seconds is not None:
+                removed['jobs'] += conn.execute('DELETE FROM jobs WHERE created_at < ?',
+                                                (now - self.max_age_seconds,)).rowcount
+            removed['jobs'] += conn.execute("DELETE FROM jobs WHERE status = 'pending' AND created_at < ?",
+                                            (now - self.pending_timeout,)).rowcount
+            if self.max_total_bytes is not None:
+                doomed = self._jobs_over_size(conn)
+                if doomed:
+                    removed['jobs'] += conn.execute('DELETE FROM jobs WHERE job_id IN (SELECT value FROM json_each(?))',
+                                                    (json.dumps(doomed),)).rowcount
+            orphans = conn.execute(
+                'SELECT digest, size FROM blobs WHERE NOT EXISTS '
+                '(SELECT 1 FROM artifacts WHERE artifacts.digest = blobs.digest)').fetchall()
+            conn.execute('DELETE FROM blobs WHERE digest IN (SELECT value FROM json_each(?))',
+                         (json.dumps([row['digest'] for row in orphans]),))
+        removed['blobs'] = len(orphans)
+        removed['bytes'] = sum(row['size'] for row in orphans)
+        if orphans:
+            self._unlink_blobs([row['digest'] for row in orphans])
+        return removed
+
+    def _jobs_over_size(self, conn: sqlite3.Connection) -> List[str]:
+        """The oldest finished jobs whose removal brings the blobs under ``max_total_bytes``."""
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        if total <= self.max_total_bytes:
+            return []
+        references = {row[0]: row[1] for row in conn.execute('SELECT digest, COUNT(*) FROM artifacts GROUP BY digest')}
+        sizes = {row[0]: row[1] for row in conn.execute('SELECT digest, size FROM blobs')}
+        # Jobs still being written are never evicted for size.
+        rows = conn.execute(
+            "SELECT jobs.job_id, artifacts.digest FROM jobs LEFT JOIN artifacts ON artifacts.job_id = jobs.job_id "
+            "WHERE jobs.status != 'pending' ORDER BY jobs.created_at, jobs.job_id")
+        doomed: List[str] = []
+        for job_id, digest in rows:
+            if not doomed or doomed[-1] != job_id:
+                if total <= self.max_total_bytes:
+                    break
+                doomed.append(job_id)
+            if digest is not None:
+                references[digest] -= 1
+                if references[digest] == 0:
+                    total -= sizes.get(digest, 0)
+        return doomed
+
+    def _unlink_blobs(self, digests: List[str]) -> None:
+        """Remove the files of deleted blobs, unless a writer has stored the same content again since."""
+        with self._transaction() as conn:
+            stored = {row[0] for row in conn.execute('SELECT digest FROM blobs WHERE digest IN '
+                                                     '(SELECT value FROM json_each(?))', (json.dumps(digests),))}
+            for digest in digests:
+                if digest in stored:
+                    continue
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    @staticmethod
+    def _job_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['metadata'] = json.loads(job['metadata'] or '{}')
+        return job
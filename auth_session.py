@@ -0,0 +1,227 @@
+"""Logged-in crawling with one login per origin.
+
+A login flow is defined once per origin, in the flows file or inline with a request.
+It is either credentials (from the flow or the test data fixture) filled into the login
+form, or a scripted list of steps. Flows in the flows file may reference environment
+variables (``${APP_PASSWORD}``) instead of holding secrets; inline flows come from
+clients and are used verbatim, so they cannot read the server's environment. The flow runs in its own browser context and the
+resulting Playwright ``storageState`` (cookies and local storage) is persisted. Every
+crawl context for that origin starts from the stored state until it expires or the
+site redirects back to the login page, at which point the flow runs again.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+DEFAULT_TTL = 3600
+# Refresh a little before the earliest session cookie expires, not after.
+EXPIRY_MARGIN = 60
+USERNAME_SELECTOR = ('input[type="email"], input[name*="email" i], input[name="username"], '
+                     'input[name="login"], input[autocomplete="username"]')
+PASSWORD_SELECTOR = 'input[type="password"]'
+SUBMIT_SELECTOR = 'button[type="submit"], input[type="submit"], form button'
+STEP_ACTIONS = {'goto', 'fill', 'click', 'press', 'wait_for', 'wait_for_url'}
+# Without a success_selector, how long the login page has to navigate away after submitting
+LOGIN_NAVIGATION_TIMEOUT = 10
+
+
+class AuthError(RuntimeError):
+    """The login flow could not be run or did not log in."""
+
+
+def origin_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def validate_flow(flow: Dict[str, Any]) -> None:
+    """Raise ValueError if ``flow`` is not a usable login flow definition."""
+    if not isinstance(flow, dict) or not flow.get('login_url'):
+        raise ValueError('A login flow needs a login_url')
+    steps = flow.get('steps')
+    if steps is not None:
+        if not isinstance(steps, list) or not steps:
+            raise ValueError('steps must be a non-empty list')
+        for step in steps:
+            actions = STEP_ACTIONS & set(step) if isinstance(step, dict) else set()
+            if len(actions) != 1:
+                raise ValueError(f"Each step needs exactly one of: {', '.join(sorted(STEP_ACTIONS))}")
+
+
+def expand_flow(value: Any) -> Any:
+    """``value`` with environment variables expanded in every string; only for server-side flows."""
+    if isinstance(value, dict):
+        return {key: expand_flow(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand_flow(item) for item in value]
+    return os.path.expandvars(value) if isinstance(value, str) else value
+
+
+def same_path(url: str, other: str) -> bool:
+    return urlparse(url).path.rstrip('/') == urlparse(other).path.rstrip('/')
+
+
+def state_expiry(state: Dict[str, Any], origin: str, created_at: float, ttl: float) -> float:
+    """When a stored state stops being usable: the TTL, or the earliest expiring cookie of the origin."""
+    host = urlparse(origin).hostname or ''
+    expiry = created_at + ttl
+    for cookie in state.get('cookies', []):
+        domain = cookie.get('domain', '').lstrip('.')
+        if cookie.get('expires', -1) > 0 and (host == domain or host.endswith('.' + domain)):
+            expiry = min(expiry, cookie['expires'] - EXPIRY_MARGIN)
+    return expiry
+
+
+class AuthSessions:
+    """Login flows per origin and the storage states they produced.
+
+    States are kept in memory and in ``state_dir`` (one JSON file per origin and flow),
+    so they survive restarts. Logins run on the crawl event loop with the async
+    Playwright API; a per-origin lock makes concurrent crawls of one origin share a
+    single login. ``default_credentials()`` returns the ``email``/``password``
+    used by flows that define neither credentials nor steps.
+    """
+
+    def __init__(self, state_dir: str, flows_path: Optional[str] = None,
+                 default_credentials: Optional[Callable[[], Dict[str, str]]] = None, ttl: float = DEFAULT_TTL):
+        self.state_dir = state_dir
+        self.default_credentials = default_credentials or dict
+        self.ttl = ttl
+        self.flows: Dict[str, Dict[str, Any]] = {}
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        if flows_path and os.path.exists(flows_path):
+            with open(flows_path, encoding='utf-8') as f:
+                for origin, flow in json.load(f).items():
+                    validate_flow(flow)
+                    self.flows[origin_of(origin)] = expand_flow(flow)
+
+    def flow_for(self, url: str) -> Optional[Dict[str, Any]]:
+        """The configured login flow for ``url``'s origin, if any."""
+        return self.flows.get(origin_of(url))
+
+    @staticmethod
+    def _key(origin: str, flow: Dict[str, Any]) -> str:
+        payload = json.dumps({'origin': origin, 'flow': flow}, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.state_dir, f"{key}.json")
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        return self._locks.setdefault(key, asyncio.Lock())
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._states.get(key)
+        if entry is None and os.path.exists(self._path(key)):
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+            self._states[key] = entry
+        return entry
+
+    def _save(self, key: str, entry: Dict[str, Any]) -> None:
+        self._states[key] = entry
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, prefix='.state-')
+        # Session cookies are credentials; keep them readable by the owner only
+        os.chmod(tmp_path, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    async def storage_state(self, browser, url: str, flow: Dict[str, Any]) -> Dict[str, Any]:
+        """A fresh storage state for ``url``'s origin, logging in with ``flow`` only when needed."""
+        origin = origin_of(url)
+        key = self._key(origin, flow)
+        async with self._lock(key):
+            entry = self._load(key)
+            if entry and entry['expires_at'] > time.time():
+                return entry['state']
+            started = time.time()
+            state = await self._login(browser, flow)
+            ttl = float(flow.get('ttl', self.ttl))
+            self._save(key, {
+                'origin': origin,
+                'state': state,
+                'created_at': started,
+                'expires_at': state_expiry(state, origin, started, ttl),
+                'login_ms': round((time.time() - started) * 1000)
+            })
+            print(f"Logged in to {origin} in {(time.time() - started):.1f}s")
+            return state
+
+    def invalidate(self, url: str, flow: Dict[str, Any]) -> None:
+        """Drop the stored state so the next crawl of the origin logs in again."""
+        key = self._key(origin_of(url), flow)
+        self._states.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    @staticmethod
+    def is_login_redirect(flow: Dict[str, Any], requested_url: str, landed_url: str) -> bool:
+        """Whether a crawl of ``requested_url`` was sent to the login page, i.e. the session expired."""
+        return same_path(landed_url, flow['login_url']) and not same_path(requested_url, flow['login_url'])
+
+    async def _login(self, browser, flow: Dict[str, Any]) -> Dict[str, Any]:
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        login_url = str(flow['login_url'])
+        context = await browser.new_context()
+        try:
+            page = await context.new_page()
+            page.set_default_timeout(float(flow.get('timeout', 30)) * 1000)
+            await page.goto(login_url, wait_until='domcontentloaded')
+            await self._run_steps(page, flow.get('steps') or self._credential_steps(flow), login_url)
+            if flow.get('success_selector'):
+                await page.wait_for_selector(str(flow['success_selector']))
+            else:
+                # Not networkidle: pages that poll or stream never reach it. A login that stays
+                # on the same URL (single-page apps) counts once the password field is gone.
+                try:
+                    await page.wait_for_url(lambda url: not same_path(url, login_url), wait_until='domcontentloaded',
+                                            timeout=LOGIN_NAVIGATION_TIMEOUT * 1000)
+                except PlaywrightTimeoutError:
+                    if await page.locator(PASSWORD_SELECTOR).count():
+                        raise AuthError(f"Still on the login page after logging in to {origin_of(login_url)}")
+            return await context.storage_state()
+        except AuthError:
+            raise
+        except Exception as e:
+            raise AuthError(f"Login flow for {origin_of(login_url)} failed: {e}")
+        finally:
+            await context.close()
+
+    def _credential_steps(self, flow: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Steps that fill the login form with the flow's credentials, or the fixture's."""
+        defaults = self.default_credentials()
+        username = flow.get('username') or flow.get('email') or defaults.get('email')
+        password = flow.get('password') or defaults.get('password')
+        if not username or not password:
+            raise AuthError('The login flow has no credentials')
+        return [
+            {'fill': flow.get('username_selector', USERNAME_SELECTOR), 'value': username},
+            {'fill': flow.get('password_selector', PASSWORD_SELECTOR), 'value': password},
+            {'click': flow.get('submit_selector', SUBMIT_SELECTOR)},
+        ]
+
+    @staticmethod
+    async def _run_steps(page, steps: List[Dict[str, Any]], base_url: str) -> None:
+        for step in steps:
+            if 'goto' in step:
+                await page.goto(urljoin(base_url, str(step['goto'])), wait_until='domcontentloaded')
+            elif 'fill' in step:
+                await page.locator(str(step['fill'])).first.fill(str(step.get('value', '')))
+            elif 'click' in step:
+                await page.locator(str(step['click'])).first.click()
+            elif 'press' in step:
+                await page.locator(str(step['press'])).first.press(step.get('key', 'Enter'))
+            elif 'wait_for' in step:
+                await page.wait_for_selector(str(step['wait_for']))
+            elif 'wait_for_url' in step:
+                await page.wait_for_url(str(step['wait_for_url']))
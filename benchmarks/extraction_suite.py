@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Offline micro-benchmarks for element extraction, selectors and spec generation.
+
+Usage: python benchmarks/extraction_suite.py [--sizes 100,1000,10000,50000]
+       [--fixtures DIR] [--output results.json] [--baseline old.json] [--threshold 0.25]
+
+Each fixture (synthetic shapes at each size, plus any captured ``*.html`` in
+``--fixtures``) is parsed once; ``extract_element_data``, ``get_xpath``,
+``get_best_selector``, ``validate_selector``, ``generate_cypress_script`` and
+``fix_common_linting_issues`` are then timed separately. Per-element functions are
+timed over a sample of the fixture's elements, cut short after ``--budget`` seconds,
+so their cost per call is comparable across sizes. With ``--baseline`` (an earlier
+``--output``), exits non-zero when a benchmark's time per call grew by more than
+``--threshold``. Needs no network or API key.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# AI suggestions are never requested; make sure nothing could reach the API
+os.environ.pop('OPENAI_API_KEY', None)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import app  # noqa: E402
+from dom_snapshot import assign_keys  # noqa: E402
+
+INTERACTIVE_TAGS = ['input', 'button', 'a', 'form', 'select', 'textarea']
+FIXTURE_URL = 'https://bench.example.test/page'
+
+
+def page(title: str, body: str) -> str:
+    return f'<!DOCTYPE html><html><head><title>{title}</title></head><body>{body}</body></html>'
+
+
+def deep_nesting(count: int, depth: int = 40) -> str:
+    """Interactive elements at the bottom of ``depth``-deep chains of divs."""
+    chains = []
+    for n in range(0, count, 2):
+        inner = (f'<button type="button" class="btn btn-{n % 7}">Action {n}</button>'
+                 f'<a href="/item/{n}">Item {n}</a>')
+        chains.append('<div class="level">' * depth + inner + '</div>' * depth)
+    return page('Deep nesting', '<main>' + ''.join(chains) + '</main>')
+
+
+def wide_table(count: int, columns: int = 4) -> str:
+    """A table with an input per cell, plus an edit link per row."""
+    rows = []
+    for r in range(max(1, count // (columns + 1))):
+        cells = ''.join(f'<td><input name="row{r}_col{c}" value="{r * c}"></td>' for c in range(columns))
+        rows.append(f'<tr>{cells}<td><a href="/rows/{r}/edit" class="edit">Edit</a></td></tr>')
+    header = ''.join(f'<th>Column {c}</th>' for c in range(columns))
+    return page('Wide table', f'<table><thead><tr>{header}<th></th></tr></thead>'
+                              f'<tbody>{"".join(rows)}</tbody></table>')
+
+
+def huge_form(count: int) -> str:
+    """One form with labelled inputs, selects and textareas, many of them required."""
+    fields = []
+    for n in range(count - 2):
+        kind = n % 5
+        if kind == 3:
+            field = (f'<select id="f{n}" name="choice_{n}">'
+                     + ''.join(f'<option value="{o}">Option {o}</option>' for o in range(4)) + '</select>')
+        elif kind == 4:
+            field = f'<textarea id="f{n}" name="notes_{n}" placeholder="Notes {n}"></textarea>'
+        else:
+            input_type = ['text', 'email', 'password'][kind]
+            required = ' required' if n % 3 == 0 else ''
+            field = f'<input id="f{n}" name="field_{n}" type="{input_type}" placeholder="Field {n}"{required}>'
+        fields.append(f'<div class="row"><label for="f{n}">Field {n}</label>{field}</div>')
+    return page('Huge form', f'<form id="signup" action="/submit">{"".join(fields)}'
+                             '<button type="submit">Submit</button></form>')
+
+
+def livewire_heavy(count: int) -> str:
+    """Livewire components with wire:model inputs, wire:click buttons and test ids."""
+    blocks = []
+    # Three of each block's elements are interactive tags; the role="button" div is found by attribute
+    for n in range(0, count, 3):
+        blocks.append(
+            f'<div wire:id="c{n}" class="card">'
+            f'<input wire:model.live="items.{n}.name" type="text">'
+            f'<input wire:model="items.{n}.qty" type="number" aria-label="Quantity {n}">'
+            f'<button wire:click="save({n})" data-testid="save-{n}">Save</button>'
+            f'<div role="button" data-cy="remove-{n}" wire:click="remove({n})">Remove</div>'
+            '</div>')
+    return page('Livewire dashboard', '<form wire:submit="saveAll">' + ''.join(blocks) + '</form>')
+
+
+SHAPES = {
+    'deep_nesting': deep_nesting,
+    'wide_table': wide_table,
+    'huge_form': huge_form,
+    'livewire': livewire_heavy,
+}
+
+
+def timed(fn, items, repeat: int, budget: float):
+    """Best seconds per call over ``repeat`` passes of ``fn`` over ``items``.
+
+    A pass stops once it has run for ``budget`` seconds, so calls that are slow on large
+    fixtures are timed over fewer items. Returns the time per call, the calls it was
+    measured over and the results of the first pass.
+    """
+    best, calls, outputs = float('inf'), 0, []
+    for attempt in range(repeat):
+        started = time.perf_counter()
+        count = 0
+        for item in items:
+            result = fn(item)
+            if not attempt:
+                outputs.append(result)
+            count += 1
+            if time.perf_counter() - started > budget:
+                break
+        per_call = (time.perf_counter() - started) / max(count, 1)
+        if per_call < best:
+            best, calls = per_call, count
+    return best, calls, outputs
+
+
+def sample(items, size: int):
+    """An evenly spread sample, so deep and late elements are represented."""
+    if len(items) <= size:
+        return list(items)
+    step = len(items) / size
+    return [items[int(i * step)] for i in range(size)]
+
+
+def bench_fixture(name: str, html: str, sample_size: int, repeat: int, budget: float):
+    soup = BeautifulSoup(html, 'html.parser')
+    all_tags = soup.find_all(INTERACTIVE_TAGS)
+    tags = sample(all_tags, sample_size)
+    results = {}
+
+    results['extract_element_data'] = timed(lambda tag: app.extract_element_data(tag, soup), tags, repeat, budget)
+    elements = results['extract_element_data'][2]
+    results['get_xpath'] = timed(app.get_xpath, tags, repeat, budget)
+    results['get_best_selector'] = timed(lambda element: app.get_best_selector(element, soup), elements,
+                                         repeat, budget)
+    candidates = results['get_best_selector'][2]
+    results['validate_selector'] = timed(lambda selector: app.validate_selector(selector, soup), candidates,
+                                         repeat, budget)
+
+    # Generation runs against the whole document, with the sampled elements standing in
+    # for parse_page's element list (parsing every element of the largest fixtures would
+    # dominate the run)
+    assign_keys(elements)
+    title = soup.title.string if soup.title and soup.title.string else name
+    url_data = {'url': FIXTURE_URL, 'page_title': title, 'description': '', 'elements': elements,
+                'soup': soup, 'fingerprint': None}
+    results['generate_cypress_script'] = timed(lambda _: app.generate_cypress_script(url_data, soup), [None],
+                                               repeat, budget)
+    script = results['generate_cypress_script'][2][0]
+    results['fix_common_linting_issues'] = timed(app.fix_common_linting_issues, [script], repeat, budget)
+
+    return [
+        {
+            'fixture': name,
+            'elements': len(all_tags),
+            'benchmark': benchmark,
+            'calls': calls,
+            'us_per_call': round(seconds * 1e6, 2)
+        } for benchmark, (seconds, calls, _) in results.items()
+    ]
+
+
+def fixtures(sizes, fixture_dir):
+    for shape, build in SHAPES.items():
+        for size in sizes:
+            yield f'{shape}-{size}', build(size)
+    if fixture_dir:
+        for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+            with open(path, encoding='utf-8', errors='replace') as f:
+                yield os.path.splitext(os.path.basename(path))[0], f.read()
+
+
+def compare(results, baseline, threshold: float):
+    """Benchmarks whose time per call grew by more than ``threshold`` over ``baseline``."""
+    previous = {(r['fixture'], r['benchmark']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['fixture'], result['benchmark']))
+        if old and old['us_per_call'] > 0:
+            ratio = result['us_per_call'] / old['us_per_call']
+            if ratio > 1 + threshold:
+                regressions.append({
+                    'fixture': result['fixture'],
+                    'benchmark': result['benchmark'],
+                    'baseline_us': old['us_per_call'],
+                    'us_per_call': result['us_per_call'],
+                    'ratio': round(ratio, 3)
+                })
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,50000',
+                        help='comma-separated element counts of the synthetic fixtures')
+    parser.add_argument('--fixtures', help='directory of captured *.html pages to benchmark as well')
+    parser.add_argument('--sample', type=int, default=200, help='elements timed per per-element benchmark')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget', type=float, default=2.0,
+                        help='seconds a benchmark may run per pass before it stops early')
+    parser.add_argument('--output', help='write the JSON results here as well as to stdout')
+    parser.add_argument('--baseline', help='earlier --output to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed growth in time per call over the baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    results = []
+    for name, html in fixtures(sizes, args.fixtures):
+        started = time.perf_counter()
+        results.extend(bench_fixture(name, html, args.sample, args.repeat, args.budget))
+        print(f'{name}: {time.perf_counter() - started:.1f}s', file=sys.stderr)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'sample': args.sample,
+        'repeat': args.repeat,
+        'budget': args.budget,
+        'results': results
+    }
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            report['threshold'] = args.threshold
+            report['regressions'] = compare(results, json.load(f), args.threshold)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
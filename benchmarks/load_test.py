@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""End-to-end load test of /api/generate against a local site and a mock LLM.
+
+Usage: python benchmarks/load_test.py [--concurrency 1,2,4,8] [--duration 30]
+       [--llm-latency-ms 400] [--llm-429-rate 0.05] [--site-latency-ms 1500]
+       [--target http://host:port] [--output report.json]
+
+Starts a local test site (static, client-rendered, slow, never network-idle and
+Livewire-style pages), a mock OpenAI-compatible server with configurable latency and
+429 rate, and, unless ``--target`` is given, the Flask app in a subprocess pointed at
+both. Each concurrency level runs for ``--duration`` seconds and reports throughput,
+latency percentiles, errors, mock LLM traffic, the app's pipeline stage times (from
+/metrics) and the CPU and memory of the app and its browser processes (Linux only).
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SITE_PAGES = ['/static', '/dynamic', '/slow', '/never-idle', '/livewire']
+STAGE_SUM = re.compile(r'^cypress_generator_stage_seconds_sum\{stage="([^"]+)"\} (\S+)$', re.M)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def layout(title: str, body: str, script: str = '') -> str:
+    return (f'<!DOCTYPE html><html><head><title>{title}</title>'
+            f'<meta name="description" content="Load test page: {title}"></head>'
+            f'<body>{body}<script>{script}</script></body></html>')
+
+
+LOGIN_FORM = ('<form id="login" action="/session" method="post">'
+              '<label for="email">Email</label><input id="email" name="email" type="email" required>'
+              '<label for="password">Password</label><input id="password" name="password" type="password" required>'
+              '<button type="submit" data-testid="sign-in">Sign in</button></form>')
+NAVIGATION = ''.join(f'<a href="{path}">{path[1:]}</a>' for path in SITE_PAGES)
+
+
+def site_page(path: str) -> Optional[str]:
+    if path in ('/static', '/slow'):
+        return layout(path[1:].title(), f'<nav>{NAVIGATION}</nav><main>{LOGIN_FORM}</main>')
+    if path == '/dynamic':
+        # Rendered client-side after a delay, like a SPA waiting on its API
+        return layout('Dynamic', '<div id="app">Loading...</div>', """
+            setTimeout(() => {
+                document.getElementById('app').innerHTML = %s;
+            }, 300);""" % json.dumps(f'<nav>{NAVIGATION}</nav>{LOGIN_FORM}'))
+    if path == '/never-idle':
+        # Polls forever, so the network never goes idle
+        return layout('Never idle', f'<nav>{NAVIGATION}</nav>{LOGIN_FORM}<ul id="feed"></ul>', """
+            setInterval(() => fetch('/poll').then((r) => r.json()).then((d) => {
+                document.getElementById('feed').insertAdjacentHTML('afterbegin', `<li>${d.at}</li>`);
+            }), 250);""")
+    if path == '/livewire':
+        rows = ''.join(
+            f'<div wire:id="row{n}"><input wire:model.live="items.{n}.name" type="text" placeholder="Item {n}">'
+            f'<button wire:click="save({n})" data-testid="save-{n}">Save</button></div>' for n in range(12))
+        return layout('Livewire', f'<nav>{NAVIGATION}</nav><form wire:submit="saveAll">{rows}'
+                                  '<button type="submit">Save all</button></form>', """
+            document.addEventListener('input', (e) => fetch('/livewire/update', {
+                method: 'POST', headers: {'Content-Type': 'application/json'},
+                body: JSON.stringify({model: e.target.getAttribute('wire:model.live'), value: e.target.value})
+            }));""")
+    return None
+
+
+class SiteHandler(BaseHTTPRequestHandler):
+    """The stand-in website. ``server.latency`` delays the /slow page."""
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = 'text/html; charset=utf-8') -> None:
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        path = urlparse(self.path).path
+        if path == '/poll':
+            return self._send(200, json.dumps({'at': time.time()}), 'application/json')
+        if path == '/slow':
+            time.sleep(self.server.latency)
+        html = site_page(path)
+        if html is None:
+            return self._send(404, layout('Not found', '<p>Not found</p>'))
+        self._send(200, html)
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self._send(200, json.dumps({'effects': {}, 'serverMemo': {}}), 'application/json')
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible ``/v1/chat/completions`` with latency and rate limiting.
+
+    ``server.latency``/``server.jitter`` are seconds; ``server.rate_429`` is the share of
+    requests answered with 429 Too Many Requests. ``server.stats`` counts the traffic.
+    """
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        server = self.server
+        with server.lock:
+            server.stats['requests'] += 1
+        if random.random() < server.rate_429:
+            with server.lock:
+                server.stats['rate_limited'] += 1
+            return self._json(429, {'error': {'message': 'Rate limit reached', 'type': 'rate_limit_error'}},
+                              {'retry-after': '1'})
+        time.sleep(max(0.0, random.gauss(server.latency, server.jitter)))
+        content = json.dumps({
+            'selectors': ['[data-testid]'],
+            'assertions': ['should be visible'],
+            'edge_cases': ['empty value'],
+            'performance': ['avoid fixed waits']
+        })
+        prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+        completion_tokens = len(content) // 4
+        with server.lock:
+            server.stats['prompt_tokens'] += prompt_tokens
+            server.stats['completion_tokens'] += completion_tokens
+        self._json(200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'mock'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        })
+
+    def _json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def serve(handler, **attributes) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', free_port()), handler)
+    server.daemon_threads = True
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def process_tree(root: int) -> List[int]:
+    """``root`` and its descendants, from /proc."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+
+def tree_usage(root: int) -> Dict[str, float]:
+    """CPU seconds and resident memory of ``root``'s process tree."""
+    ticks = os.sysconf('SC_CLK_TCK')
+    page = os.sysconf('SC_PAGE_SIZE')
+    cpu = rss = 0.0
+    processes = 0
+    for pid in process_tree(root):
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            cpu += (int(fields[11]) + int(fields[12])) / ticks
+            rss += int(fields[21]) * page
+            processes += 1
+        except (OSError, IndexError, ValueError):
+            continue
+    return {'cpu_seconds': cpu, 'rss_bytes': rss, 'processes': processes}
+
+
+class ResourceSampler:
+    """Samples the app's process tree while a level runs."""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.enabled = pid is not None and os.path.isdir('/proc')
+        self.peak_rss = 0.0
+        self.peak_processes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_cpu = 0.0
+
+    def __enter__(self) -> 'ResourceSampler':
+        if self.enabled:
+            self._start_cpu = tree_usage(self.pid)['cpu_seconds']
+            self._started = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            usage = tree_usage(self.pid)
+            self.peak_rss = max(self.peak_rss, usage['rss_bytes'])
+            self.peak_processes = max(self.peak_processes, usage['processes'])
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc) -> None:
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self.cpu_seconds = tree_usage(self.pid)['cpu_seconds'] - self._start_cpu
+            self.elapsed = time.perf_counter() - self._started
+
+    def report(self) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        return {
+            'cpu_seconds': round(self.cpu_seconds, 2),
+            'cpu_utilization': round(self.cpu_seconds / self.elapsed, 2),
+            'peak_rss_mb': round(self.peak_rss / 2 ** 20, 1),
+            'peak_processes': self.peak_processes
+        }
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    # Nearest rank
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return round(ordered[index], 1)
+
+
+def stage_sums(target: str) -> Dict[str, float]:
+    try:
+        text = requests.get(f'{target}/metrics', timeout=10).text
+    except requests.RequestException:
+        return {}
+    return {stage: float(value) for stage, value in STAGE_SUM.findall(text)}
+
+
+def run_level(target: str, site: str, concurrency: int, duration: float, timeout: float,
+              llm: ThreadingHTTPServer, pid: Optional[int], test_types: Optional[List[str]]) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    llm_before = dict(llm.stats)
+    stages_before = stage_sums(target)
+
+    def worker(index: int) -> None:
+        session = requests.Session()
+        n = index
+        while time.perf_counter() < deadline:
+            body = {'url': site + SITE_PAGES[n % len(SITE_PAGES)], 'force': True}
+            if test_types:
+                body['test_types'] = test_types
+            n += concurrency
+            started = time.perf_counter()
+            try:
+                response = session.post(f'{target}/api/generate', json=body, timeout=timeout)
+                status = response.status_code
+                error = None if status == 200 else (response.json().get('details') or response.json().get('error'))
+            except (requests.RequestException, ValueError) as e:
+                status, error = None, type(e).__name__
+            with lock:
+                results.append({'latency_ms': (time.perf_counter() - started) * 1000, 'status': status,
+                                'error': error})
+
+    started = time.perf_counter()
+    with ResourceSampler(pid) as sampler, ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [r['latency_ms'] for r in results if r['status'] == 200]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if result['status'] != 200:
+            key = f"{result['status']}: {str(result['error'])[:80]}"
+            errors[key] = errors.get(key, 0) + 1
+    stages_after = stage_sums(target)
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'succeeded': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 3),
+        'error_rate': round(1 - len(latencies) / len(results), 3) if results else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': round(max(latencies), 1) if latencies else None
+        },
+        'errors': errors,
+        'llm': {key: llm.stats[key] - llm_before[key] for key in llm.stats},
+        'stage_seconds_per_request': {
+            stage: round((total - stages_before.get(stage, 0)) / len(results), 3)
+            for stage, total in sorted(stages_after.items()) if results
+        },
+        'resources': sampler.report()
+    }
+
+
+def start_app(llm_url: str, ready_timeout: float):
+    """Run the app on a free port in a scratch directory, so its artifacts are thrown away."""
+    port = free_port()
+    workdir = tempfile.mkdtemp(prefix='cypress-load-')
+    env = dict(os.environ, OPENAI_API_KEY='mock-key', OPENAI_BASE_URL=llm_url,
+               PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    log = open(os.path.join(workdir, 'app.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-c', f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"],
+        cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    target = f'http://127.0.0.1:{port}'
+    deadline = time.time() + ready_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'The app exited with {process.returncode}; see {log.name}')
+        try:
+            if requests.get(f'{target}/api/test_types', timeout=2).ok:
+                return process, target, log.name
+        except requests.RequestException:
+            time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError(f'The app did not start within {ready_timeout}s; see {log.name}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', default='1,2,4,8', help='comma-separated concurrency levels')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per concurrency level')
+    parser.add_argument('--timeout', type=float, default=180, help='seconds before a request counts as failed')
+    parser.add_argument('--llm-latency-ms', type=float, default=400)
+    parser.add_argument('--llm-jitter-ms', type=float, default=100)
+    parser.add_argument('--llm-429-rate', type=float, default=0.0, help='share of LLM requests rate limited')
+    parser.add_argument('--site-latency-ms', type=float, default=1500, help='response delay of the /slow page')
+    parser.add_argument('--test-types', help='comma-separated test type ids to generate (default: all)')
+    parser.add_argument('--target', help='load an already running app here instead of starting one')
+    parser.add_argument('--pid', type=int, help='process to measure resources of when using --target')
+    parser.add_argument('--output', help='write the JSON report here as well as to stdout')
+    args = parser.parse_args()
+
+    site = serve(SiteHandler, latency=args.site_latency_ms / 1000)
+    llm = serve(MockLLMHandler, latency=args.llm_latency_ms / 1000, jitter=args.llm_jitter_ms / 1000,
+                rate_429=args.llm_429_rate, lock=threading.Lock(),
+                stats={'requests': 0, 'rate_limited': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+    site_url = f'http://127.0.0.1:{site.server_port}'
+    llm_url = f'http://127.0.0.1:{llm.server_port}/v1'
+
+    process, log_path = None, None
+    if args.target:
+        target, pid = args.target.rstrip('/'), args.pid
+        print(f'Using {target}; point its OPENAI_BASE_URL at {llm_url} to use the mock LLM', file=sys.stderr)
+    else:
+        process, target, log_path = start_app(llm_url, ready_timeout=60)
+        pid = process.pid
+
+    test_types = args.test_types.split(',') if args.test_types else None
+    levels = []
+    try:
+        for concurrency in [int(level) for level in args.concurrency.split(',') if level.strip()]:
+            level = run_level(target, site_url, concurrency, args.duration, args.timeout, llm, pid, test_types)
+            levels.append(level)
+            latency = level['latency_ms']
+            print(f"concurrency {concurrency}: {level['throughput_rps']} req/s, p50 {latency['p50']} ms, "
+                  f"p99 {latency['p99']} ms, errors {level['error_rate']}", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        site.shutdown()
+        llm.shutdown()
+
+    report = {
+        'duration_per_level': args.duration,
+        'site': site_url,
+        'llm': {'latency_ms': args.llm_latency_ms, 'jitter_ms': args.llm_jitter_ms, 'rate_429': args.llm_429_rate},
+        'app_log': log_path,
+        'levels': levels
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Check that js_postprocess.postprocess() stays linear on large generated specs.
+
+Usage: python benchmarks/postprocess_linearity.py [--max-lines 10000] [--tolerance 2.0]
+Exits non-zero when the per-line cost at the largest size exceeds the smallest size's
+cost by more than ``--tolerance``, or when any of the ``CASES`` (sources the
+post-processor once got wrong) no longer comes out as expected.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from js_postprocess import postprocess  # noqa: E402
+
+TEST_BLOCK = """    it("fills field {n}", () => {{
+      // Types into field {n} and checks the value
+      const unused{n} = "value {n}"
+      console.log("debug {n}")
+      page.getElement("[name='field_{n}']")
+        .type("Test Input Value", {{ delay: 50 }})
+        .should("have.value", "Test Input Value")
+      cy.wait("@livewireUpdate")
+    }})
+"""
+
+
+# (source, expected output) pairs
+CASES = [
+    # A class body is not an object literal: no ';' after it
+    ("class A {\n  m() {\n    return 1\n  }\n}\n", "class A {\n  m() {\n    return 1;\n  }\n}\n"),
+    # Function and arrow bodies in expression position end the statement
+    ("const fn = function () {\n  return 1\n}\nfn()\n", "const fn = function () {\n  return 1;\n};\nfn();\n"),
+    ("const f = () => {\n  go()\n}\nf()\n", "const f = () => {\n  go();\n};\nf();\n"),
+    ("function g() {\n  x()\n}\n", "function g() {\n  x();\n}\n"),
+    # The body line of a brace-less control statement keeps its indentation
+    ("if (a)\n  b()\nc()\n", "if (a)\n  b();\nc();\n"),
+    ("do {\n  x()\n} while (y)\nz()\n", "do {\n  x();\n} while (y);\nz();\n"),
+    # Only literal initializers are side-effect free; property reads may run getters
+    ("const y = obj.x\n", "const y = obj.x;\n"),
+    ("const z = 5\nconst u = [1, 'a']\nconst v = { a: -1 }\n", ""),
+    # Names used only inside template literal expressions are used
+    ("const base = 'x'\ncy.log(`${base}`)\n", "const base = 'x';\ncy.log(`${base}`);\n"),
+    ("const n = 1\ncy.log(`a ${`b ${n}`}`)\n", "const n = 1;\ncy.log(`a ${`b ${n}`}`);\n"),
+    # Statements under a case label and ternary continuation lines sit one level deeper
+    ("switch (x) {\ncase 1:\nfoo()\nbreak\ndefault:\nbar()\n}\n",
+     "switch (x) {\n  case 1:\n    foo();\n    break;\n  default:\n    bar();\n}\n"),
+    ("const a = c\n? x\n: y\nconst b = c ?\nx :\ny\nz(a, b)\n",
+     "const a = c\n  ? x\n  : y;\nconst b = c ?\n  x :\n  y;\nz(a, b);\n"),
+]
+
+
+def check_cases() -> list:
+    """The ``CASES`` whose output differs from the expected one."""
+    return [{'source': source, 'expected': expected, 'actual': postprocess(source)}
+            for source, expected in CASES if postprocess(source) != expected]
+
+
+def synthetic_spec(lines: int) -> str:
+    """Build an unlinted spec of roughly ``lines`` lines in the generator's shape."""
+    header = "const Page = require('./Page')\n\ndescribe('Synthetic', () => {\n  const page = new Page()\n"
+    block_lines = TEST_BLOCK.count('\n')
+    blocks = [TEST_BLOCK.format(n=n) for n in range(max(1, lines // block_lines))]
+    return header + ''.join(blocks) + '})\n'
+
+
+def measure(source: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        postprocess(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-lines', type=int, default=10000)
+    parser.add_argument('--tolerance', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    sizes = [args.max_lines // 10, args.max_lines // 4, args.max_lines // 2, args.max_lines]
+    results = []
+    for size in sizes:
+        source = synthetic_spec(size)
+        line_count = source.count('\n')
+        seconds = measure(source, args.repeat)
+        results.append({
+            'lines': line_count,
+            'seconds': round(seconds, 6),
+            'us_per_line': round(seconds / line_count * 1e6, 3)
+        })
+
+    growth = results[-1]['us_per_line'] / results[0]['us_per_line']
+    failures = check_cases()
+    print(json.dumps({'results': results, 'per_line_growth': round(growth, 3),
+                      'tolerance': args.tolerance, 'case_failures': failures}, indent=2))
+    return 0 if growth <= args.tolerance and not failures else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
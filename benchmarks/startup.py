@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Cold-start times of the app and the CLI, with an import-time budget.
+
+Usage: python benchmarks/startup.py [--runs 10] [--budget-ms 500] [--top 15]
+       [--output startup.json]
+
+Each scenario runs ``--runs`` times in a fresh interpreter (in a scratch directory, so
+the app's artifacts are thrown away): ``python -c pass`` as the interpreter's own
+floor, ``import app``, ``import app`` plus the first requests to ``/`` and
+``/api/test_types``, and ``cli.py --help``. Exits non-zero when the median ``import app``
+exceeds ``--budget-ms`` or when Playwright, OpenAI or BeautifulSoup were imported before
+a page was crawled or an AI call made. ``--top`` lists the slowest imports reported by
+``python -X importtime``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Only needed once a page is crawled or an AI call is made
+DEFERRED_MODULES = ['playwright', 'openai', 'bs4']
+
+FIRST_REQUESTS = """
+import sys, json
+from app import app
+client = app.test_client()
+assert client.get('/').status_code == 200
+assert client.get('/api/test_types').status_code == 200
+print(json.dumps(sorted(m for m in {deferred!r} if m in sys.modules)))
+"""
+
+SCENARIOS = {
+    'python': [sys.executable, '-c', 'pass'],
+    'import_app': [sys.executable, '-c', 'import app'],
+    'first_requests': [sys.executable, '-c', FIRST_REQUESTS.format(deferred=DEFERRED_MODULES)],
+    'cli_help': [sys.executable, os.path.join(ROOT, 'cli.py'), '--help'],
+}
+
+
+def run(command, workdir: str, env) -> float:
+    started = time.perf_counter()
+    subprocess.run(command, cwd=workdir, env=env, check=True, stdout=subprocess.DEVNULL)
+    return (time.perf_counter() - started) * 1000
+
+
+def slowest_imports(workdir: str, env, top: int):
+    """Modules imported directly by the app, slowest first, from ``-X importtime``."""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=workdir, env=env,
+                            check=True, capture_output=True, text=True).stderr
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Modules imported by app itself; nested ones are counted in their importer
+        if len(name) - len(name.lstrip()) == 3:
+            imports.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda item: -item['cumulative_ms'])[:top]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=500,
+                        help='allowed median wall time of a fresh interpreter running "import app"')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--output', help='write the JSON results here as well as to stdout')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cypress-startup-')
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    env.pop('OPENAI_API_KEY', None)
+
+    # One untimed run first, so bytecode caches exist and the disk cache is warm
+    run(SCENARIOS['first_requests'], workdir, env)
+    scenarios = {}
+    for name, command in SCENARIOS.items():
+        times = [run(command, workdir, env) for _ in range(args.runs)]
+        scenarios[name] = {
+            'min_ms': round(min(times), 1),
+            'median_ms': round(statistics.median(times), 1),
+            'max_ms': round(max(times), 1)
+        }
+        print(f"{name}: median {scenarios[name]['median_ms']}ms", file=sys.stderr)
+
+    loaded = json.loads(subprocess.run(SCENARIOS['first_requests'], cwd=workdir, env=env, check=True,
+                                       capture_output=True, text=True).stdout)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'runs': args.runs,
+        'scenarios': scenarios,
+        'budget_ms': args.budget_ms,
+        'over_budget': scenarios['import_app']['median_ms'] > args.budget_ms,
+        'deferred_modules_loaded': loaded,
+        'slowest_imports': slowest_imports(workdir, env, args.top)
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    print(output)
+    return 1 if report['over_budget'] or loaded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
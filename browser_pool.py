@@ -0,0 +1,105 @@
+"""One headless Chromium shared by every crawl.
+
+The browser is launched once and driven by the async Playwright API from a background
+event loop, so crawls from any request thread become coroutines on that loop and the
+contexts of several crawls, or of several viewports of one crawl, load concurrently
+instead of each crawl paying for its own browser launch.
+"""
+
+import asyncio
+import atexit
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+MAX_CONTEXTS = 8
+
+
+class BrowserPool:
+    """Runs crawl coroutines against a pooled browser.
+
+    ``run(job)`` calls ``job(browser, playwright)`` on the pool's loop and blocks the
+    calling thread until it finishes. At most ``max_contexts`` browser contexts are open
+    at a time across all jobs; the browser is relaunched if it crashes.
+    """
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS, headless: bool = True):
+        self.max_contexts = max_contexts
+        self.headless = headless
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._launch_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(max_contexts)
+        self._playwright = None
+        self._browser = None
+        self.active_contexts = 0
+        atexit.register(self.close)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def loop_thread_id(self) -> Optional[int]:
+        """Ident of the event loop thread, starting the loop if it is not running yet."""
+        self._ensure_loop()
+        return self._thread.ident
+
+    def connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _browser_instance(self):
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    # Imported on first launch, so importing the app stays fast
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self._browser
+
+    async def _run(self, job: Callable[[Any, Any], Awaitable[Any]]) -> Any:
+        browser = await self._browser_instance()
+        return await job(browser, self._playwright)
+
+    def run(self, job: Callable[[Any, Any], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run ``job(browser, playwright)`` on the pooled browser and return its result."""
+        future = asyncio.run_coroutine_threadsafe(self._run(job), self._ensure_loop())
+        return future.result(timeout)
+
+    def warm(self, timeout: Optional[float] = None) -> None:
+        """Launch the browser now instead of on the first crawl."""
+        self.run(lambda browser, playwright: asyncio.sleep(0), timeout)
+
+    @asynccontextmanager
+    async def context(self, browser, **options) -> AsyncIterator[Any]:
+        """A new browser context, counted against ``max_contexts`` and closed on exit."""
+        async with self._slots:
+            context = await browser.new_context(**options)
+            self.active_contexts += 1
+            try:
+                yield context
+            finally:
+                self.active_contexts -= 1
+                await context.close()
+
+    async def _shutdown(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._playwright = None
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(10)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
@@ -1,4 +1,350 @@
-from app import app
+"""Command line entry point (``cypress-generator``).
+
+``serve`` runs the production server (pre-forked workers, see ``server.py``); ``dev``,
+the default, runs Flask's single-process development server; ``daemon`` runs the
+resident local server that the npm CLI starts and talks to (see ``daemon.py``);
+``generate`` runs the generation pipeline directly, without a server, on live pages or
+saved HTML/MHTML snapshots, and writes a Cypress project to a directory.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from frontier import DEFAULT_HOST_CONCURRENCY, DEFAULT_PER_TEMPLATE, Frontier, HostLimiter, normalize_url
+from html_snapshots import find_snapshot_files, load_snapshot_file
+
+COMMANDS = ('serve', 'dev', 'daemon', 'generate')
+
+
+def serve(args) -> int:
+    try:
+        from server import serve as run_server
+    except ImportError:
+        print("The production server needs gunicorn: pip install gunicorn", file=sys.stderr)
+        return 1
+    # Options left unset fall back to the server's defaults
+    options = {'threads': args.threads, 'timeout': args.timeout, 'max_jobs': args.max_jobs}
+    run_server(bind=f"{args.host}:{args.port}", workers=args.workers,
+               access_log=None if args.no_access_log else '-',
+               **{key: value for key, value in options.items() if value is not None})
+    return 0
+
+
+def dev(args) -> int:
+    from app import app
+    app.run(host=args.host, port=args.port)
+    return 0
+
+
+def daemon(args) -> int:
+    from daemon import serve as run_daemon
+    run_daemon(args.state_file, args.version_tag, args.idle_timeout, args.port)
+    return 0
+
+
+def collect_urls(args) -> Tuple[List[str], Optional[Frontier]]:
+    """The pages to generate and, if sites or sitemaps were given, the frontier that chose them.
+
+    URLs given directly or in ``--urls-file`` are only normalized and deduplicated. Pages
+    from ``--site`` and ``--sitemap`` also go through robots.txt and template dedupe.
+    """
+    explicit = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, encoding='utf-8') as f:
+            explicit.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith('#'))
+    urls = [url for url in (normalize_url(url) for url in explicit) if url]
+
+    frontier = None
+    if args.site or args.sitemap:
+        frontier = Frontier(respect_robots=not args.ignore_robots, per_template=args.per_template)
+        for site in args.site or []:
+            frontier.add_site(site)
+        for sitemap in args.sitemap or []:
+            frontier.add_sitemap(sitemap)
+        urls.extend(frontier.select())
+    urls = list(dict.fromkeys(urls))
+    return (urls[:args.limit] if args.limit else urls), frontier
+
+
+def page_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The part of a page's result that progress reporting needs (results can be large)."""
+    return {
+        'error': result.get('error'),
+        'cache_hit': bool(result.get('cache_hit')),
+        'element_count': result.get('element_count', 0),
+        'page_title': result.get('page_title', '')
+    }
+
+
+class Progress:
+    """Prints one line per finished page, numbered across all worker processes."""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def __call__(self, url: str, summary: Dict[str, Any]) -> None:
+        self.done += 1
+        if summary['error']:
+            outcome = f"failed: {summary['error']}"
+        else:
+            outcome = f"{'unchanged' if summary['cache_hit'] else 'generated'}, {summary['element_count']} elements"
+        print(f"[{self.done}/{self.total} {time.perf_counter() - self.started:6.1f}s] {url} {outcome}",
+              file=sys.stderr, flush=True)
+
+
+# Set in worker processes: where generate_chunk reports finished pages
+_progress_queue: Optional[Any] = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def generate_chunk(pages: List[str], options: Dict[str, Any], progress=None) -> Dict[str, Any]:
+    """Generate ``pages``, URLs or snapshot paths, as one batch in this process.
+
+    Returns its jobs and stage timings.
+    """
+    import app as generator
+
+    snapshots = [load_snapshot_file(path) for path in pages] if options['snapshots'] else None
+    urls = [snapshot['url'] for snapshot in snapshots] if snapshots else pages
+
+    def report(url: str, result: Dict[str, Any]) -> None:
+        summary = page_summary(result)
+        if progress:
+            progress(url, summary)
+        elif _progress_queue is not None:
+            _progress_queue.put((url, summary))
+
+    limiter = HostLimiter(options['host_concurrency'], options['host_delay'], options['crawl_delays'])
+    response = generator.generate_batch(urls, options['test_types'], options['incremental'], options['force'],
+                                        record_network=options['record_network'], workers=options['threads'],
+                                        progress=report, limiter=limiter, snapshots=snapshots,
+                                        render=options['render'])
+    return {
+        'jobs': [{'url': url, 'snapshot': path if snapshots else None, 'job_id': job.get('job_id'), **page_summary(job)}
+                 for url, path, job in zip(urls, pages, response['jobs'])],
+        'components': len(response['components']),
+        'stages': generator.metrics.stage_totals()
+    }
+
+
+def run_chunks(chunks: List[List[str]], options: Dict[str, Any], progress: Progress) -> List[Dict[str, Any]]:
+    """Generate each chunk in its own process, printing progress from all of them."""
+    context = multiprocessing.get_context('spawn')
+    progress_queue = context.Queue()
+    with ProcessPoolExecutor(max_workers=len(chunks), mp_context=context, initializer=_init_worker,
+                             initargs=(progress_queue,)) as executor:
+        futures = [executor.submit(generate_chunk, chunk, options) for chunk in chunks]
+        while True:
+            try:
+                progress(*progress_queue.get(timeout=0.2))
+            except queue.Empty:
+                if not wait(futures, timeout=0)[1]:
+                    break
+        while not progress_queue.empty():
+            progress(*progress_queue.get())
+    return [future.result() for future in futures]
+
+
+def print_summary(results: List[Dict[str, Any]], elapsed: float, processes: int, threads: int) -> None:
+    jobs = [job for result in results for job in result['jobs']]
+    failed = sum(1 for job in jobs if job['error'])
+    unchanged = sum(1 for job in jobs if job['cache_hit'])
+    stages: Dict[str, Dict[str, float]] = {}
+    for result in results:
+        for stage, totals in result['stages'].items():
+            merged = stages.setdefault(stage, {'seconds': 0.0, 'count': 0})
+            merged['seconds'] += totals['seconds']
+            merged['count'] += totals['count']
+
+    print(f"\n{len(jobs) - failed}/{len(jobs)} pages in {elapsed:.1f}s ({unchanged} unchanged, {failed} failed, "
+          f"{sum(result['components'] for result in results)} shared components) "
+          f"with {processes} process(es) x {threads} thread(s)", file=sys.stderr)
+    if stages:
+        # Stage times are summed over pages running in parallel, so they can exceed the wall time
+        print(f"{'stage':<24}{'total':>10}{'count':>8}{'mean':>10}", file=sys.stderr)
+        for stage, totals in sorted(stages.items(), key=lambda item: -item[1]['seconds']):
+            mean = totals['seconds'] / totals['count'] if totals['count'] else 0
+            print(f"{stage:<24}{totals['seconds']:>9.2f}s{totals['count']:>8}{mean:>9.3f}s", file=sys.stderr)
+
+
+def collect_snapshots(args) -> List[str]:
+    """The snapshot files to generate, each checked to be a readable HTML or MHTML file."""
+    paths = find_snapshot_files(args.snapshot)
+    paths = paths[:args.limit] if args.limit else paths
+    for path in paths:
+        load_snapshot_file(path)
+    return paths
+
+
+def generate(args) -> int:
+    if args.snapshot:
+        if args.urls or args.urls_file or args.site or args.sitemap or args.record_network:
+            print("--snapshot cannot be combined with URLs, sites, sitemaps or --record-network", file=sys.stderr)
+            return 1
+        try:
+            urls, frontier = collect_snapshots(args), None
+        except (OSError, ValueError) as e:
+            print(f"Could not read the snapshots: {e}", file=sys.stderr)
+            return 1
+    else:
+        try:
+            urls, frontier = collect_urls(args)
+        except (OSError, ET.ParseError) as e:
+            print(f"Could not read the URL list: {e}", file=sys.stderr)
+            return 1
+    if frontier:
+        stats = frontier.stats
+        print(f"Frontier: {stats['discovered']} URLs found, {stats['duplicate']} duplicate, "
+              f"{stats['disallowed']} disallowed by robots.txt, {stats['invalid']} invalid; "
+              f"{stats['selected']} pages kept from {stats['templates']} templates", file=sys.stderr)
+    if not urls:
+        print("No pages to generate; pass URLs, --urls-file, --site, --sitemap or --snapshot", file=sys.stderr)
+        return 1
+
+    from spec_templates import select_test_types
+    test_types = args.test_types.split(',') if args.test_types else None
+    try:
+        select_test_types(test_types)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    options = {
+        'test_types': test_types,
+        'incremental': not args.no_incremental,
+        'force': args.force,
+        'record_network': args.record_network,
+        'snapshots': bool(args.snapshot),
+        'render': args.render,
+        'threads': max(1, args.threads),
+        'host_concurrency': args.host_concurrency,
+        'host_delay': args.host_delay,
+        # Crawl delays asked for by robots.txt, by host
+        'crawl_delays': {urlparse(url).netloc: frontier.crawl_delay(url) for url in urls} if frontier else {}
+    }
+    processes = max(1, min(args.processes, len(urls)))
+    # Contiguous chunks keep a site's pages together, so they can share components
+    size = -(-len(urls) // processes)
+    chunks = [urls[i:i + size] for i in range(0, len(urls), size)]
+    progress = Progress(len(urls))
+    print(f"Generating {len(urls)} page(s) with {len(chunks)} process(es) x {options['threads']} thread(s)",
+          file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    if len(chunks) == 1:
+        results = [generate_chunk(chunks[0], options, progress)]
+    else:
+        results = run_chunks(chunks, options, progress)
+
+    import app as generator
+    from project_export import project_entries, write_tree
+    from sharding import MANIFEST_ARTIFACT, build_manifest
+
+    job_ids = [job['job_id'] for result in results for job in result['jobs'] if job['job_id']]
+    jobs = [generator.artifact_store.get_job(job_id) for job_id in job_ids]
+    if jobs:
+        extra = {}
+        if args.shards:
+            manifest = build_manifest(generator.project_specs(jobs), args.shards, generator.timing_model,
+                                      generator.quarantined_specs(jobs))
+            extra[MANIFEST_ARTIFACT] = json.dumps(manifest, indent=2)
+        files = write_tree(project_entries(generator.artifact_store, jobs, extra), args.output)
+        print(f"Wrote {len(files)} files to {args.output}", file=sys.stderr)
+    print_summary(results, time.perf_counter() - started, len(chunks), options['threads'])
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed_seconds': round(time.perf_counter() - started, 2),
+                       'frontier': frontier.stats if frontier else None,
+                       'templates': frontier.templates() if frontier else None,
+                       'jobs': [job for result in results for job in result['jobs']]}, f, indent=2)
+    return 1 if any(job['error'] for result in results for job in result['jobs']) else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='cypress-generator', description='AI-powered Cypress test generator')
+    commands = parser.add_subparsers(dest='command')
+
+    serve_parser = commands.add_parser('serve', help='run the production server')
+    serve_parser.add_argument('--host', default=os.getenv('HOST', '0.0.0.0'))
+    serve_parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    serve_parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '2')),
+                              help='worker processes, each with its own browser')
+    serve_parser.add_argument('--threads', type=int, help='concurrent requests per worker (default: 4)')
+    serve_parser.add_argument('--timeout', type=int, help='seconds before a stuck worker is restarted (default: 300)')
+    serve_parser.add_argument('--max-jobs', type=int,
+                              default=int(os.environ['WORKER_MAX_JOBS']) if os.getenv('WORKER_MAX_JOBS') else None,
+                              help='generations after which a worker is replaced, 0 for never (default: 200)')
+    serve_parser.add_argument('--no-access-log', action='store_true')
+    serve_parser.set_defaults(handler=serve)
+
+    dev_parser = commands.add_parser('dev', help='run the Flask development server')
+    dev_parser.add_argument('--host', default='0.0.0.0')
+    dev_parser.add_argument('--port', type=int, default=5000)
+    dev_parser.set_defaults(handler=dev)
+
+    daemon_parser = commands.add_parser('daemon', help='run the resident server for the npm CLI')
+    daemon_parser.add_argument('--state-file', required=True, help='where to write the port, pid and token')
+    daemon_parser.add_argument('--version-tag', default='', help='reported to clients, which restart stale daemons')
+    daemon_parser.add_argument('--idle-timeout', type=float,
+                               default=float(os.getenv('CYPRESS_GENERATOR_DAEMON_IDLE', '900')),
+                               help='seconds without requests before exiting, 0 for never (default: 900)')
+    daemon_parser.add_argument('--port', type=int, default=0, help='loopback port (default: any free port)')
+    daemon_parser.set_defaults(handler=daemon)
+
+    generate_parser = commands.add_parser('generate', help='generate a Cypress project without a server')
+    generate_parser.add_argument('urls', nargs='*', help='pages to generate tests for')
+    generate_parser.add_argument('--urls-file', help='file with one URL per line (# starts a comment)')
+    generate_parser.add_argument('--site', action='append',
+                                 help='site to generate: its home page and the sitemaps robots.txt lists; may be repeated')
+    generate_parser.add_argument('--sitemap', action='append', help='sitemap.xml path or URL; may be repeated')
+    generate_parser.add_argument('--per-template', type=int, default=DEFAULT_PER_TEMPLATE,
+                                 help='pages generated per page template from sites and sitemaps, 0 for all (default: 1)')
+    generate_parser.add_argument('--ignore-robots', action='store_true', help='crawl pages robots.txt disallows')
+    generate_parser.add_argument('--snapshot', action='append',
+                                 help='saved HTML or MHTML page, or a directory of them, to generate offline; may be repeated')
+    generate_parser.add_argument('--render', action='store_true',
+                                 help='load snapshots in the browser, offline, instead of parsing the saved HTML')
+    generate_parser.add_argument('--limit', type=int, help='generate at most this many pages')
+    generate_parser.add_argument('--output', '-o', default='cypress-project', help='project directory to write')
+    generate_parser.add_argument('--test-types', help='comma-separated test type ids (default: all)')
+    generate_parser.add_argument('--processes', type=int, default=1,
+                                 help='worker processes, each with its own browser (default: 1)')
+    generate_parser.add_argument('--threads', type=int, default=4,
+                                 help='pages crawled and generated at a time per process (default: 4)')
+    generate_parser.add_argument('--host-concurrency', type=int, default=DEFAULT_HOST_CONCURRENCY,
+                                 help='pages of one host crawled at a time per process (default: 2)')
+    generate_parser.add_argument('--host-delay', type=float, default=0.0,
+                                 help='minimum seconds between page loads of one host, if robots.txt asks for less')
+    generate_parser.add_argument('--force', action='store_true', help='regenerate pages that are unchanged')
+    generate_parser.add_argument('--no-incremental', action='store_true', help='regenerate every element')
+    generate_parser.add_argument('--record-network', action='store_true', help='record traffic for stubbed specs')
+    generate_parser.add_argument('--shards', type=int, help='add a sharding manifest for this many CI runners')
+    generate_parser.add_argument('--report', help='write a JSON report of every page here')
+    generate_parser.set_defaults(handler=generate)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Without a command, as before, run the development server
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv = ['dev'] + argv
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    sys.exit(main())
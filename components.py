@@ -0,0 +1,193 @@
+"""Detection of UI components shared by several crawled pages.
+
+Headers, navbars, footers, sidebars and forms that are structurally identical on
+several pages (same subtree hash) become one component object, emitted once and
+composed by every page object that contains it. Their selectors are resolved once and
+their elements share AI suggestions, so generation cost grows with the number of
+distinct components instead of pages x components.
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from spec_templates import css_string, js_identifier
+
+CONTAINER_TAGS = {'header', 'nav', 'footer', 'aside', 'form'}
+CONTAINER_ROLES = {'banner', 'navigation', 'contentinfo', 'complementary', 'search', 'form', 'dialog'}
+MIN_PAGES = 2
+ROOT_ATTRIBUTES = ['data-testid', 'data-cy', 'data-test', 'aria-label', 'role']
+NAME_ATTRIBUTES = ['data-testid', 'data-cy', 'data-test', 'id', 'name', 'aria-label', 'text_content', 'placeholder']
+MEMBER_SUFFIXES = {
+    'input': 'Input', 'button': 'Button', 'a': 'Link', 'select': 'Select', 'textarea': 'TextArea', 'form': 'Form'
+}
+
+
+def _is_container(tag) -> bool:
+    return tag.name in CONTAINER_TAGS or tag.get('role') in CONTAINER_ROLES
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r'[A-Za-z0-9]+', text)[:4]
+
+
+def component_base_name(container) -> str:
+    """``Header``, ``MainNav``, ... from the container's id, label, role or tag."""
+    source = container.get('id') or container.get('aria-label') or container.get('role') or container.name
+    return js_identifier(''.join(w.capitalize() for w in _words(str(source))) or container.name.capitalize())
+
+
+def member_name(element: Dict[str, Any]) -> str:
+    """Getter name for an element, e.g. ``emailInput`` or ``signInButton``."""
+    source = next((str(element[a]) for a in NAME_ATTRIBUTES if element.get(a)), '')
+    words = _words(source.rstrip('.'))
+    suffix = MEMBER_SUFFIXES.get(element['tag'], 'Element')
+    base = (words[0].lower() + ''.join(w.capitalize() for w in words[1:])) if words else element['tag']
+    if base.lower().endswith(suffix.lower()):
+        suffix = ''
+    return js_identifier(base + suffix)
+
+
+def _unique(name: str, taken: Dict[str, int]) -> str:
+    taken[name] = taken.get(name, 0) + 1
+    return name if taken[name] == 1 else f"{name}{taken[name]}"
+
+
+def _contains(container_xpath: str, element: Dict[str, Any]) -> bool:
+    return element['xpath'].startswith(container_xpath + '/')
+
+
+def root_selector(occurrences: Dict[int, Tuple[Any, Any]]) -> Dict[str, Any]:
+    """Selector for a component's root on the pages it occurs on.
+
+    ``occurrences`` map page indexes to ``(soup, container_tag)``. ``indexes`` is None
+    when the selector matches just the container on every page. Otherwise the selector
+    is the candidate that finds the container on the most pages, and ``indexes`` maps
+    those pages to the container's position among the matches; other pages are left out.
+    """
+    _, container = occurrences[min(occurrences)]
+    candidates = [f"#{container['id']}"] if container.get('id') else []
+    candidates += [f"{container.name}[{a}={css_string(container[a])}]" for a in ROOT_ATTRIBUTES if container.get(a)]
+    candidates.append(container.name)
+    fallback: Optional[Dict[str, Any]] = None
+    for candidate in candidates:
+        try:
+            matches = {page: soup.select(candidate) for page, (soup, _) in occurrences.items()}
+        except Exception:
+            continue
+        indexes = {}
+        for page, (_, tag) in occurrences.items():
+            index = next((i for i, match in enumerate(matches[page]) if match is tag), None)
+            if index is not None:
+                indexes[page] = index
+        if len(indexes) == len(occurrences) and all(len(m) == 1 for m in matches.values()):
+            return {'selector': candidate, 'indexes': None}
+        if fallback is None or len(indexes) > len(fallback['indexes']):
+            fallback = {'selector': candidate, 'indexes': indexes}
+    return fallback
+
+
+def find_shared_components(pages: List[Dict[str, Any]], xpath: Callable[[Any], str],
+                           min_pages: int = MIN_PAGES) -> List[Dict[str, Any]]:
+    """Find container subtrees that occur on at least ``min_pages`` of ``pages``.
+
+    ``pages`` are ``parse_page`` results; ``xpath(tag)`` must compute element XPaths the
+    same way the element extractor does. Only the outermost shared container is used on
+    each page. Member elements are tagged with ``_component_key`` (component hash plus
+    position) so equal elements on different pages can share AI suggestions.
+    """
+    candidates: List[List[Tuple[str, Any]]] = []
+    page_counts: Dict[str, set] = {}
+    for index, page in enumerate(pages):
+        hashes = page['subtree_hashes']
+        found = [(hashes[id(tag)], tag) for tag in page['soup'].find_all(_is_container)]
+        candidates.append(found)
+        for digest, _ in found:
+            page_counts.setdefault(digest, set()).add(index)
+
+    # Outermost shared container per page, in document order (ancestors come first).
+    chosen: Dict[str, Dict[int, Tuple[Any, str, List[Dict[str, Any]]]]] = {}
+    for index, page in enumerate(pages):
+        taken: List[str] = []
+        for digest, tag in candidates[index]:
+            if len(page_counts[digest]) < min_pages or index in chosen.get(digest, {}):
+                continue
+            container_xpath = xpath(tag)
+            if any(container_xpath == t or container_xpath.startswith(t + '/') for t in taken):
+                continue
+            members = [e for e in page['elements'] if _contains(container_xpath, e)]
+            if not members:
+                continue
+            taken.append(container_xpath)
+            chosen.setdefault(digest, {})[index] = (tag, container_xpath, members)
+
+    components = []
+    class_names: Dict[str, int] = {}
+    for digest, occurrences in chosen.items():
+        if len(occurrences) < min_pages:
+            continue
+        root = root_selector({i: (pages[i]['soup'], tag) for i, (tag, _, _) in occurrences.items()})
+        if root['indexes'] is not None:
+            # Pages the root cannot be located on keep their own selectors
+            occurrences = {i: occurrence for i, occurrence in occurrences.items() if i in root['indexes']}
+            if len(occurrences) < min_pages:
+                continue
+        for _, _, members in occurrences.values():
+            for position, element in enumerate(members):
+                element['_component_key'] = f"{digest}:{position}"
+        first_page = min(occurrences)
+        container, _, members = occurrences[first_page]
+        base = _unique(component_base_name(container), class_names)
+        components.append({
+            'hash': digest,
+            'class_name': f"{base}Component",
+            'property': base[0].lower() + base[1:],
+            'filename': f"{base}Component_{digest[:8]}.js",
+            'pages': sorted(occurrences),
+            'root': root,
+            'scope': container,
+            'elements': members
+        })
+    return components
+
+
+def component_members(component: Dict[str, Any],
+                      resolve: Callable[[Dict[str, Any], Any], str]) -> List[Dict[str, Any]]:
+    """Getters of a component, with selectors resolved once within the component's subtree.
+
+    ``resolve(element, scope)`` returns a selector; elements it can only locate by XPath
+    are found by their text, or by position among same-tag members.
+    """
+    members = []
+    names: Dict[str, int] = {'root': 1}
+    positions: Dict[str, int] = {}
+    for element in component['elements']:
+        member = {'name': _unique(member_name(element), names), 'selector': None, 'index': None, 'text': None}
+        selector = resolve(element, component['scope'])
+        fallback = f"{element['tag']}[role={css_string(element['role'])}]" if element.get('role') else element['tag']
+        position = positions.get(fallback, 0)
+        positions[fallback] = position + 1
+        if not selector.startswith('//'):
+            member['selector'] = selector
+        elif element.get('text_content'):
+            member['selector'] = element['tag']
+            member['text'] = element['text_content'][:-3] if element['text_content'].endswith('...') else element['text_content']
+        else:
+            member['selector'] = fallback
+            member['index'] = position
+        members.append(member)
+    return members
+
+
+def page_components(components: List[Dict[str, Any]], page_index: int,
+                    require_prefix: str) -> List[Dict[str, Optional[str]]]:
+    """Template context for the components a page object composes.
+
+    ``root_index`` is the component root's position among its selector's matches on
+    this page, or None when the selector is unique.
+    """
+    return [
+        {'property': c['property'], 'class_name': c['class_name'], 'filename': c['filename'],
+         'module': require_prefix + c['filename'][:-len('.js')],
+         'root_index': (c['root']['indexes'] or {}).get(page_index)}
+        for c in components if page_index in c['pages']
+    ]
@@ -0,0 +1,196 @@
+"""What the crawler loads and how long it waits for a page to settle.
+
+Non-essential requests (images, media, fonts and known analytics/ads domains by
+default) are aborted before they leave the browser. Instead of waiting for
+``networkidle``, which pages with long-polling or beacons never reach, a page is
+considered ready once the DOM has stopped changing; an optional selector must be
+present and network idle is only awaited up to a cap. Every phase is timed.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+WAIT_MODES = ['dom-stable', 'load', 'domcontentloaded', 'networkidle']
+DEFAULT_BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font']
+DEFAULT_BLOCKED_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'facebook.net', 'connect.facebook.net', 'hotjar.com', 'segment.io', 'segment.com', 'mixpanel.com',
+    'clarity.ms', 'fullstory.com', 'intercom.io', 'newrelic.com', 'nr-data.net', 'amplitude.com',
+]
+# Resource types that cannot be blocked: the DOM and its styles decide what is extracted.
+REQUIRED_RESOURCE_TYPES = {'document', 'stylesheet'}
+# Errors of a page script whose document was replaced by a navigation (e.g. a JS redirect)
+NAVIGATION_ERRORS = ('Execution context was destroyed', 'Cannot find context with specified id')
+
+# Resolves once no DOM mutation has happened for quietMs (true), or after maxMs (false).
+DOM_STABLE_SCRIPT = """
+([quietMs, maxMs]) => new Promise((resolve) => {
+    let timer = null;
+    let cap = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(timer);
+        timer = setTimeout(() => done(true), quietMs);
+    });
+    const done = (stable) => {
+        observer.disconnect();
+        clearTimeout(timer);
+        clearTimeout(cap);
+        resolve(stable);
+    };
+    observer.observe(document.documentElement, { childList: true, subtree: true, attributes: true, characterData: true });
+    timer = setTimeout(() => done(true), quietMs);
+    cap = setTimeout(() => done(false), maxMs);
+})
+"""
+
+
+def _domain_matches(host: str, domains: List[str]) -> bool:
+    return any(host == d or host.endswith('.' + d) for d in domains)
+
+
+@contextmanager
+def phase(timings: Dict[str, Any], key: str) -> Iterator[None]:
+    """Add the milliseconds spent in the block to ``timings[key]``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[key] = round(timings.get(key, 0) + (time.perf_counter() - started) * 1000, 1)
+
+
+class CrawlPolicy:
+    """Request blocking and wait strategy for one crawl.
+
+    ``wait`` is one of ``WAIT_MODES``: ``dom-stable`` navigates to DOMContentLoaded and
+    waits for ``dom_quiet_ms`` without DOM mutations (at most ``max_wait_ms``); the
+    others navigate with that Playwright ``wait_until``. ``wait_selector`` must then be
+    present, and network idle is awaited for at most ``max_idle_ms`` (0 skips it).
+    """
+
+    def __init__(self, wait: str = 'dom-stable', wait_selector: Optional[str] = None,
+                 dom_quiet_ms: int = 500, max_wait_ms: int = 10000, max_idle_ms: int = 3000,
+                 block_resource_types: Optional[List[str]] = None, block_domains: Optional[List[str]] = None,
+                 timeout_ms: int = 30000):
+        if wait not in WAIT_MODES:
+            raise ValueError(f"wait must be one of: {', '.join(WAIT_MODES)}")
+        self.wait = wait
+        self.wait_selector = wait_selector or None
+        self.dom_quiet_ms = int(dom_quiet_ms)
+        self.max_wait_ms = int(max_wait_ms)
+        self.max_idle_ms = int(max_idle_ms)
+        self.timeout_ms = int(timeout_ms)
+        types = DEFAULT_BLOCKED_RESOURCE_TYPES if block_resource_types is None else block_resource_types
+        self.block_resource_types = set(types) - REQUIRED_RESOURCE_TYPES
+        self.block_domains = list(DEFAULT_BLOCKED_DOMAINS if block_domains is None else block_domains)
+
+    def with_overrides(self, overrides: Optional[Dict[str, Any]]) -> 'CrawlPolicy':
+        """A copy with the keys of ``overrides`` (constructor argument names) replaced.
+
+        Raises ValueError for unknown keys or values of the wrong type.
+        """
+        if not overrides:
+            return self
+        settings = self.to_dict()
+        unknown = set(overrides) - set(settings)
+        if unknown:
+            raise ValueError(f"Unknown crawl options: {', '.join(sorted(unknown))}")
+        for key, value in overrides.items():
+            expected = list if key.startswith('block_') else (str, type(None)) if key == 'wait_selector' \
+                else str if key == 'wait' else int
+            if not isinstance(value, expected) or isinstance(value, bool):
+                raise ValueError(f"Invalid value for crawl option {key}")
+        settings.update(overrides)
+        return CrawlPolicy(**settings)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'wait': self.wait,
+            'wait_selector': self.wait_selector,
+            'dom_quiet_ms': self.dom_quiet_ms,
+            'max_wait_ms': self.max_wait_ms,
+            'max_idle_ms': self.max_idle_ms,
+            'block_resource_types': sorted(self.block_resource_types),
+            'block_domains': self.block_domains,
+            'timeout_ms': self.timeout_ms,
+        }
+
+    def blocks(self, url: str, resource_type: str, page_host: str) -> bool:
+        """Whether a request is non-essential. The crawled host itself is never blocked by domain."""
+        if resource_type in self.block_resource_types:
+            return True
+        host = urlparse(url).hostname or ''
+        return host != page_host and _domain_matches(host, self.block_domains)
+
+    async def attach(self, page, page_url: str, stats: Dict[str, int]) -> None:
+        """Abort blocked requests of ``page``, counting them in ``stats['blocked_requests']``.
+
+        Attach after any other ``**/*`` route (e.g. the network recorder): Playwright runs
+        the latest handler first, and requests that are not blocked fall back to it.
+        """
+        if not self.block_resource_types and not self.block_domains:
+            return
+        page_host = urlparse(page_url).hostname or ''
+        stats.setdefault('blocked_requests', 0)
+
+        async def handle(route) -> None:
+            request = route.request
+            if self.blocks(request.url, request.resource_type, page_host):
+                stats['blocked_requests'] += 1
+                await route.abort('blockedbyclient')
+            else:
+                await route.fallback()
+
+        await page.route('**/*', handle)
+
+    async def dom_stable(self, page) -> bool:
+        """Wait for the DOM of ``page`` to stop changing; whether it did within the cap.
+
+        A redirect after ``domcontentloaded`` destroys the document the observer runs in:
+        the new document is then awaited and observed once more. A page that navigates
+        again counts as not stable and is crawled as it is.
+        """
+        from playwright.async_api import Error as PlaywrightError
+
+        for attempt in range(2):
+            try:
+                return await page.evaluate(DOM_STABLE_SCRIPT, [self.dom_quiet_ms, self.max_wait_ms])
+            except PlaywrightError as e:
+                if not any(message in str(e) for message in NAVIGATION_ERRORS):
+                    raise
+            if attempt == 0:
+                try:
+                    await page.wait_for_load_state('domcontentloaded', timeout=self.max_wait_ms)
+                except PlaywrightError:
+                    return False
+        return False
+
+    async def load(self, page, url: str, timings: Dict[str, Any]) -> None:
+        """Navigate ``page`` to ``url`` and wait until it is ready, recording each phase in ``timings``.
+
+        Only the navigation itself may raise a timeout; the later phases are capped and
+        record whether they were reached.
+        """
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        page.set_default_timeout(self.timeout_ms)
+        with phase(timings, 'navigation_ms'):
+            await page.goto(url, wait_until='domcontentloaded' if self.wait == 'dom-stable' else self.wait)
+        if self.wait == 'dom-stable':
+            with phase(timings, 'dom_stable_ms'):
+                timings['dom_stable'] = await self.dom_stable(page)
+        if self.wait_selector:
+            with phase(timings, 'selector_ms'):
+                try:
+                    await page.wait_for_selector(self.wait_selector, state='attached', timeout=self.max_wait_ms)
+                    timings['selector_found'] = True
+                except PlaywrightTimeoutError:
+                    timings['selector_found'] = False
+        if self.max_idle_ms and self.wait != 'networkidle':
+            with phase(timings, 'network_idle_ms'):
+                try:
+                    await page.wait_for_load_state('networkidle', timeout=self.max_idle_ms)
+                    timings['network_idle'] = True
+                except PlaywrightTimeoutError:
+                    timings['network_idle'] = False
@@ -714,4 +714,5 @@ Achievements/Projects:
 if __name__ == '__main__':
     import sys
     port = 5001 if len(sys.argv) > 1 and sys.argv[1] == '--port' else 5000
-    app.run(debug=True, port=port)
\ No newline at end of file
+    # Debug mode (reloader and in-browser debugger) only with FLASK_DEBUG=1
+    app.run(port=port)
\ No newline at end of file
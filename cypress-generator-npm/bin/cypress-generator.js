@@ -1,13 +1,27 @@
 #!/usr/bin/env node
 
 const { spawn } = require('child_process');
+const fs = require('fs');
 const path = require('path');
+const daemon = require('./daemon');
 
 /**
  * Cypress Generator CLI
- * Launches the Flask backend server for the Cypress test generator
+ * Launches the Flask backend server for the Cypress test generator, or generates tests
+ * from the command line through the resident daemon (see daemon.js)
  */
 
+const USAGE = `Usage:
+  cypress-generator                         Start the web interface on http://localhost:5000
+  cypress-generator generate <url...>       Generate Cypress tests through the background daemon
+      --test-types <ids>                    Comma-separated test type ids (default: all)
+      --out <dir>                           Where to write the Cypress project (default: cypress-generated)
+      --zip <file>                          Also download the generated Cypress project as a ZIP
+      --force                               Regenerate even if the page is unchanged
+      --json                                Print the full API response
+  cypress-generator daemon <start|stop|restart|status>
+`;
+
 function startFlaskServer() {
     console.log('🚀 Starting Cypress Generator Flask Server...');
     console.log('📝 AI-powered Cypress test generation');
@@ -73,9 +87,129 @@ function startFlaskServer() {
     });
 }
 
+function parseOptions(args) {
+    const options = { urls: [], out: 'cypress-generated' };
+    for (let i = 0; i < args.length; i++) {
+        const arg = args[i];
+        if (arg === '--test-types') options.testTypes = args[++i].split(',').filter(Boolean);
+        else if (arg === '--out') options.out = args[++i];
+        else if (arg === '--zip') options.zip = args[++i];
+        else if (arg === '--force') options.force = true;
+        else if (arg === '--json') options.json = true;
+        else if (arg.startsWith('--')) throw new Error(`Unknown option: ${arg}`);
+        else options.urls.push(arg);
+    }
+    return options;
+}
+
+async function generate(args) {
+    const options = parseOptions(args);
+    if (!options.urls.length) {
+        console.error(USAGE);
+        return 1;
+    }
+    const state = await daemon.ensure();
+    const payload = options.urls.length === 1 ? { url: options.urls[0] } : { urls: options.urls };
+    if (options.testTypes) payload.test_types = options.testTypes;
+    if (options.force) payload.force = true;
+
+    const started = Date.now();
+    const { status, data } = await daemon.requestJson(state, 'POST', '/api/generate', payload);
+    if (status !== 200) {
+        console.error('❌ Generation failed:', data.error || status);
+        return 1;
+    }
+    if (options.json) {
+        console.log(JSON.stringify(data, null, 2));
+    }
+
+    const jobs = data.jobs || [{ url: options.urls[0], ...data }];
+    let failed = 0;
+    for (const job of jobs) {
+        if (job.error) {
+            failed++;
+            console.error(`❌ ${job.url}: ${job.error}`);
+            continue;
+        }
+        if (!options.json) {
+            console.log(`✅ ${job.page_title}: ${job.element_count} elements${job.cache_hit ? ' (unchanged, reused)' : ''}`);
+        }
+    }
+
+    const jobIds = jobs.filter((job) => job.job_id).map((job) => job.job_id);
+    if (jobIds.length) {
+        // The daemon lays the jobs out as a Cypress project: shared components under
+        // cypress/support/components, one spec folder per page
+        const exported = await daemon.requestJson(state, 'POST', '/daemon/export',
+            { jobs: jobIds, directory: path.resolve(options.out) });
+        if (exported.status !== 200) {
+            console.error('❌ Writing the project failed:', exported.data.error || exported.status);
+            return 1;
+        }
+        if (!options.json) console.log(`📁 ${exported.data.files.length} files -> ${options.out}`);
+    }
+    if (options.zip && jobIds.length) {
+        const query = jobIds.map((id) => `job=${encodeURIComponent(id)}`).join('&');
+        const res = await daemon.request(state, 'GET', `/api/download?${query}`);
+        if (res.status !== 200) {
+            console.error('❌ Download failed:', res.body.toString('utf8'));
+            return 1;
+        }
+        fs.writeFileSync(options.zip, res.body);
+        if (!options.json) console.log(`📦 Cypress project -> ${options.zip}`);
+    }
+    if (!options.json) console.log(`⏱️  ${((Date.now() - started) / 1000).toFixed(1)}s`);
+    return failed ? 1 : 0;
+}
+
+async function daemonCommand(action) {
+    if (action === 'start' || action === 'restart') {
+        if (action === 'restart') await daemon.stop();
+        const state = await daemon.ensure();
+        console.log(`✅ Daemon ${state.pid} running on 127.0.0.1:${state.port} (version ${state.version})`);
+    } else if (action === 'stop') {
+        console.log(await daemon.stop() ? '🛑 Daemon stopped' : 'Daemon is not running');
+    } else if (action === 'status') {
+        const status = await daemon.status();
+        if (!status) {
+            console.log('Daemon is not running');
+            return 1;
+        }
+        const stale = status.version !== daemon.versionTag() ? ' (stale, restarts on next use)' : '';
+        console.log(`✅ Daemon ${status.pid} up ${status.uptime_seconds}s, idle ${status.idle_seconds}s`
+            + ` of ${status.idle_timeout}s, ${status.requests} requests, version ${status.version}${stale}`);
+        console.log(`📄 Log: ${daemon.logPath}`);
+    } else {
+        console.error(USAGE);
+        return 1;
+    }
+    return 0;
+}
+
+async function main(args) {
+    const [command, ...rest] = args;
+    if (!command || command === 'server') {
+        startFlaskServer();
+        return null;
+    }
+    if (command === 'generate') return generate(rest);
+    if (command === 'daemon') return daemonCommand(rest[0]);
+    if (command === '--help' || command === '-h' || command === 'help') {
+        console.log(USAGE);
+        return 0;
+    }
+    console.error(USAGE);
+    return 1;
+}
+
 // Check if we're being run directly
 if (require.main === module) {
-    startFlaskServer();
+    main(process.argv.slice(2)).then((code) => {
+        if (code !== null) process.exitCode = code;
+    }, (err) => {
+        console.error('❌', err.message);
+        process.exitCode = 1;
+    });
 }
 
-module.exports = { startFlaskServer };
+module.exports = { startFlaskServer, generate };
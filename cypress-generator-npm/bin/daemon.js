@@ -0,0 +1,241 @@
+const { spawn } = require('child_process');
+const crypto = require('crypto');
+const fs = require('fs');
+const http = require('http');
+const os = require('os');
+const path = require('path');
+
+/**
+ * Client for the resident generator daemon (`python cli.py daemon`, see daemon.py).
+ *
+ * The first command that needs the daemon starts it in the background; later commands
+ * find it through its state file (port, pid, token and version tag) and reuse it, so
+ * they skip Python startup, imports and the browser launch. A daemon started for a
+ * different package version or different Python sources is stopped and replaced. The
+ * daemon exits by itself after CYPRESS_GENERATOR_DAEMON_IDLE seconds without requests.
+ */
+
+const packageDir = path.join(__dirname, '..');
+// The Python project the daemon runs; defaults to the copy shipped in this package
+const projectDir = process.env.CYPRESS_GENERATOR_HOME || packageDir;
+const stateDir = process.env.CYPRESS_GENERATOR_STATE_DIR || path.join(os.homedir(), '.cypress-generator');
+const statePath = path.join(stateDir, 'daemon.json');
+const lockPath = path.join(stateDir, 'daemon.lock');
+const logPath = path.join(stateDir, 'daemon.log');
+const pythonPath = process.env.PYTHON || (process.platform === 'win32' ? 'python' : 'python3');
+const idleTimeout = process.env.CYPRESS_GENERATOR_DAEMON_IDLE || '900';
+
+const START_TIMEOUT_MS = 90000;
+const STOP_TIMEOUT_MS = 15000;
+const POLL_MS = 100;
+// Directories of the Python project that hold no sources the daemon runs
+const SKIPPED_DIRS = new Set(['node_modules', '__pycache__', 'generated_scripts', 'cypress-generator-npm']);
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/** Whether projectDir holds the Python project the daemon runs. */
+function hasProject() {
+    return fs.existsSync(path.join(projectDir, 'cli.py'));
+}
+
+/**
+ * Throws unless projectDir holds the Python project. The npm package ships only the
+ * web interface's app.py, so the daemon needs CYPRESS_GENERATOR_HOME.
+ */
+function checkProject() {
+    if (!hasProject()) {
+        throw new Error(`cli.py not found in ${projectDir}. The daemon runs the Python project: `
+            + 'set CYPRESS_GENERATOR_HOME to a checkout of https://github.com/Thirlo401/cypress-generator');
+    }
+}
+
+/**
+ * The files whose changes make a running daemon stale: every Python source of the
+ * project (virtualenvs and hidden directories aside) and every template, in name order.
+ */
+function versionedFiles(dir = projectDir, inTemplates = false) {
+    const files = [];
+    const entries = fs.readdirSync(dir, { withFileTypes: true }).sort((a, b) => a.name.localeCompare(b.name));
+    for (const entry of entries) {
+        const file = path.join(dir, entry.name);
+        if (entry.isDirectory()) {
+            if (entry.name.startsWith('.') || SKIPPED_DIRS.has(entry.name)
+                || fs.existsSync(path.join(file, 'pyvenv.cfg'))) continue;
+            files.push(...versionedFiles(file, inTemplates || (dir === projectDir && entry.name === 'template')));
+        } else if (entry.isFile() && (inTemplates || entry.name.endsWith('.py'))) {
+            files.push(file);
+        }
+    }
+    return files;
+}
+
+/**
+ * Identifies this package and the Python sources it would start; changes when
+ * either is upgraded or edited.
+ */
+function versionTag() {
+    const pkg = require(path.join(packageDir, 'package.json'));
+    const hash = crypto.createHash('sha1');
+    hash.update(`${pythonPath}\0${projectDir}`);
+    for (const file of [path.join(packageDir, 'package.json'), ...versionedFiles()]) {
+        const stat = fs.statSync(file);
+        hash.update(`\0${path.relative(projectDir, file)}:${stat.size}:${stat.mtimeMs}`);
+    }
+    return `${pkg.version}+${hash.digest('hex').slice(0, 12)}`;
+}
+
+function readState() {
+    try {
+        return JSON.parse(fs.readFileSync(statePath, 'utf8'));
+    } catch (err) {
+        return null;
+    }
+}
+
+function isRunning(pid) {
+    try {
+        process.kill(pid, 0);
+        return true;
+    } catch (err) {
+        return err.code === 'EPERM';
+    }
+}
+
+/**
+ * Sends a request to the daemon and resolves with `{ status, headers, body }`
+ * (body is a Buffer). Rejects on connection errors.
+ */
+function request(state, method, urlPath, payload, timeoutMs) {
+    return new Promise((resolve, reject) => {
+        const body = payload === undefined ? null : Buffer.from(JSON.stringify(payload));
+        const req = http.request({
+            host: '127.0.0.1',
+            port: state.port,
+            method,
+            path: urlPath,
+            headers: {
+                'X-Daemon-Token': state.token,
+                ...(body ? { 'Content-Type': 'application/json', 'Content-Length': body.length } : {})
+            }
+        }, (res) => {
+            const chunks = [];
+            res.on('data', (chunk) => chunks.push(chunk));
+            res.on('end', () => resolve({ status: res.statusCode, headers: res.headers, body: Buffer.concat(chunks) }));
+            res.on('error', reject);
+        });
+        req.on('error', reject);
+        if (timeoutMs) {
+            req.setTimeout(timeoutMs, () => req.destroy(new Error(`Daemon did not answer within ${timeoutMs}ms`)));
+        }
+        if (body) req.write(body);
+        req.end();
+    });
+}
+
+async function requestJson(state, method, urlPath, payload, timeoutMs) {
+    const res = await request(state, method, urlPath, payload, timeoutMs);
+    let data;
+    try {
+        data = JSON.parse(res.body.toString('utf8'));
+    } catch (err) {
+        data = { error: res.body.toString('utf8') };
+    }
+    return { status: res.status, data };
+}
+
+/** The daemon's status, or null if it is not running or not answering. */
+async function status(state = readState()) {
+    if (!state || !isRunning(state.pid)) return null;
+    try {
+        const res = await requestJson(state, 'GET', '/daemon/status', undefined, 2000);
+        return res.status === 200 ? res.data : null;
+    } catch (err) {
+        return null;
+    }
+}
+
+async function stop(state = readState()) {
+    if (!state || !isRunning(state.pid)) return false;
+    try {
+        await requestJson(state, 'POST', '/daemon/shutdown', undefined, 2000);
+    } catch (err) {
+        process.kill(state.pid, 'SIGTERM');
+    }
+    const deadline = Date.now() + STOP_TIMEOUT_MS;
+    while (isRunning(state.pid)) {
+        if (Date.now() > deadline) {
+            process.kill(state.pid, 'SIGKILL');
+            break;
+        }
+        await sleep(POLL_MS);
+    }
+    return true;
+}
+
+/** Takes the start lock; false if another CLI process is starting the daemon. */
+function acquireLock() {
+    fs.mkdirSync(stateDir, { recursive: true });
+    try {
+        fs.closeSync(fs.openSync(lockPath, 'wx'));
+        return true;
+    } catch (err) {
+        if (err.code !== 'EEXIST') throw err;
+        // A lock left behind by a CLI process that died while starting the daemon
+        if (Date.now() - fs.statSync(lockPath).mtimeMs > START_TIMEOUT_MS) {
+            fs.unlinkSync(lockPath);
+            return acquireLock();
+        }
+        return false;
+    }
+}
+
+async function waitForDaemon(version, child) {
+    const deadline = Date.now() + START_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        if (child && child.exitCode !== null) {
+            throw new Error(`Daemon exited with code ${child.exitCode}; see ${logPath}`);
+        }
+        const state = readState();
+        const current = state && await status(state);
+        if (current && current.version === version) return state;
+        await sleep(POLL_MS);
+    }
+    throw new Error(`Daemon did not start within ${START_TIMEOUT_MS / 1000}s; see ${logPath}`);
+}
+
+async function start(version) {
+    if (!acquireLock()) return waitForDaemon(version, null);
+    try {
+        const cliPath = path.join(projectDir, 'cli.py');
+        const log = fs.openSync(logPath, 'a');
+        const child = spawn(pythonPath, [cliPath, 'daemon', '--state-file', statePath, '--version-tag', version,
+            '--idle-timeout', idleTimeout], {
+            cwd: projectDir,
+            detached: true,
+            stdio: ['ignore', log, log],
+            windowsHide: true
+        });
+        fs.closeSync(log);
+        child.on('error', () => {});
+        child.unref();
+        return await waitForDaemon(version, child);
+    } finally {
+        fs.rmSync(lockPath, { force: true });
+    }
+}
+
+/**
+ * The state of a daemon running the current version, starting one (and stopping a
+ * stale one) if needed.
+ */
+async function ensure() {
+    checkProject();
+    const version = versionTag();
+    const state = readState();
+    const current = await status(state);
+    if (current && current.version === version) return state;
+    if (current) await stop(state);
+    return start(version);
+}
+
+module.exports = { hasProject, checkProject, ensure, start, stop, status, readState, request, requestJson, versionTag, statePath, logPath };
@@ -3,6 +3,7 @@ const express = require('express');
 const cors = require('cors');
 const axios = require('axios');
 const path = require('path');
+const daemon = require('./bin/daemon');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
@@ -12,18 +13,28 @@ app.use(cors());
 app.use(express.json());
 app.use(express.static('public'));
 
-// Proxy to Flask backend
+// Proxy to the Flask backend at FLASK_URL; without it, to the resident daemon (see
+// bin/daemon.js) when the Python project is available, else to a local `npm run dev`
+const USE_DAEMON = !process.env.FLASK_URL && daemon.hasProject();
 const FLASK_URL = process.env.FLASK_URL || 'http://localhost:5000';
 
+async function backend() {
+    if (!USE_DAEMON) return { url: FLASK_URL, headers: {} };
+    const state = await daemon.ensure();
+    return { url: `http://127.0.0.1:${state.port}`, headers: { 'X-Daemon-Token': state.token } };
+}
+
 app.use('/api', async (req, res) => {
     try {
+        const target = await backend();
         const response = await axios({
             method: req.method,
-            url: `${FLASK_URL}${req.originalUrl}`,
+            url: `${target.url}${req.originalUrl}`,
             data: req.body,
             headers: {
                 'Content-Type': 'application/json',
-                ...req.headers
+                ...req.headers,
+                ...target.headers
             }
         });
         
@@ -32,7 +43,7 @@ app.use('/api', async (req, res) => {
         console.error('Proxy error:', error.message);
         res.status(500).json({ 
             error: 'Backend service unavailable',
-            message: 'Make sure the Flask server is running on port 5000'
+            message: USE_DAEMON ? error.message : `Make sure the Flask server is running at ${FLASK_URL}`
         });
     }
 });
@@ -81,7 +92,7 @@ app.get('/', (req, res) => {
                 <h2>🔧 Usage</h2>
                 <p>To use this package:</p>
                 <ol>
-                    <li>Make sure the Flask backend is running: <code>npm run dev</code></li>
+                    <li>Make sure the Flask backend is running: <code>npm run dev</code>, or set <code>CYPRESS_GENERATOR_HOME</code> to the Python project to use the background daemon</li>
                     <li>Send POST requests to <code>/api/generate</code> with a JSON body containing the URL</li>
                     <li>Example: <code>{"url": "https://example.com"}</code></li>
                 </ol>
@@ -101,6 +112,6 @@ app.get('/', (req, res) => {
 
 app.listen(PORT, () => {
     console.log(`🌐 NPM Package server running on http://localhost:${PORT}`);
-    console.log(`🔗 Flask backend should be running on ${FLASK_URL}`);
+    console.log(USE_DAEMON ? '🔗 Requests go to the background daemon' : `🔗 Flask backend should be running on ${FLASK_URL}`);
     console.log(`📖 Visit http://localhost:${PORT} for the interface`);
 });
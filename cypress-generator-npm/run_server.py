@@ -41,12 +41,11 @@ def main():
         print("📁 App path:", os.path.abspath('app.py'))
         print()
         
-        # Run the Flask app
+        # Run the Flask app; debug mode and the reloader only with FLASK_DEBUG=1
         app.run(
-            debug=True, 
             host='0.0.0.0',  # Allow external connections
             port=5001,  # Use port 5001 to avoid conflict with AirPlay
-            use_reloader=True
+            use_reloader=app.debug
         )
         
     except KeyboardInterrupt:
@@ -0,0 +1,186 @@
+"""Resident local server for the npm CLI (``cypress-generator generate``).
+
+The first CLI invocation starts this process in the background and later invocations
+send their requests to it, so only the first pays for Python startup, imports and the
+browser launch. It listens on 127.0.0.1 only and answers only requests carrying the
+token from its state file, which is readable by the owner only and also records its
+port, pid and version tag. A client whose version tag differs, because the package or
+its Python sources changed, stops the daemon and starts a fresh one. The daemon exits
+once no request has been in flight for ``idle_timeout`` seconds.
+"""
+
+import hmac
+import json
+import os
+import secrets
+import signal
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_IDLE_TIMEOUT = 900
+BROWSER_WARM_TIMEOUT = 60
+TOKEN_HEADER = 'X-Daemon-Token'
+
+
+class DaemonApp:
+    """WSGI middleware that checks the token, tracks activity and serves ``/daemon/*``."""
+
+    def __init__(self, wsgi_app, token: str, version: str, idle_timeout: float):
+        self.wsgi_app = wsgi_app
+        self.token = token
+        self.version = version
+        self.idle_timeout = idle_timeout
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.requests = 0
+        self.last_active = time.monotonic()
+        self.stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            'pid': os.getpid(),
+            'version': self.version,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'idle_seconds': round(time.monotonic() - self.last_active, 1),
+            'idle_timeout': self.idle_timeout,
+            'in_flight': self.in_flight,
+            'requests': self.requests
+        }
+
+    @staticmethod
+    def _json(start_response, status: str, body: Dict[str, Any]):
+        payload = json.dumps(body).encode('utf-8')
+        start_response(status, [('Content-Type', 'application/json'), ('Content-Length', str(len(payload)))])
+        return [payload]
+
+    def _export(self, environ, start_response):
+        """Write the Cypress project of the posted ``jobs`` into ``directory``, as ``cli.py generate`` does.
+
+        The CLI cannot unpack the project ZIP without extra dependencies, and the daemon
+        runs as the same user on the same machine, so it writes the files itself.
+        """
+        from app import artifact_store
+        from project_export import project_entries, write_tree
+
+        try:
+            body = json.loads(environ['wsgi.input'].read(int(environ.get('CONTENT_LENGTH') or 0)) or b'{}')
+            job_ids, directory = list(body['jobs']), str(body['directory'])
+        except (ValueError, KeyError, TypeError):
+            return self._json(start_response, '400 BAD REQUEST', {'error': 'Expected {"jobs": [...], "directory": ...}'})
+        if not job_ids or not os.path.isabs(directory):
+            return self._json(start_response, '400 BAD REQUEST',
+                              {'error': 'At least one job id and an absolute directory are required'})
+        jobs = [artifact_store.get_job(job_id) for job_id in job_ids]
+        missing = [job_id for job_id, job in zip(job_ids, jobs) if job is None]
+        if missing:
+            return self._json(start_response, '404 NOT FOUND', {'error': f'Job not found: {missing[0]}'})
+        try:
+            files = write_tree(project_entries(artifact_store, jobs), directory)
+        except OSError as e:
+            return self._json(start_response, '500 INTERNAL SERVER ERROR', {'error': str(e)})
+        return self._json(start_response, '200 OK', {'files': files})
+
+    def _finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.last_active = time.monotonic()
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        supplied = environ.get('HTTP_' + TOKEN_HEADER.upper().replace('-', '_'), '')
+        if not hmac.compare_digest(supplied.encode('utf-8'), self.token.encode('utf-8')):
+            return self._json(start_response, '403 FORBIDDEN', {'error': 'Invalid daemon token'})
+        path, method = environ.get('PATH_INFO'), environ.get('REQUEST_METHOD')
+        if path == '/daemon/status':
+            return self._json(start_response, '200 OK', self.status())
+        if path == '/daemon/shutdown' and method == 'POST':
+            self.stopping.set()
+            return self._json(start_response, '200 OK', {'status': 'stopping'})
+
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+        if path == '/daemon/export' and method == 'POST':
+            try:
+                return self._export(environ, start_response)
+            finally:
+                self._finished()
+        try:
+            response = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._finished()
+            raise
+        # Streamed responses (project downloads) stay in flight until fully sent
+        return ClosingIterator(response, [self._finished])
+
+    def wait(self) -> str:
+        """Block until asked to stop or idle for ``idle_timeout``; returns the reason."""
+        while not self.stopping.wait(1):
+            with self._lock:
+                idle = self.in_flight == 0 and time.monotonic() - self.last_active > self.idle_timeout
+            if self.idle_timeout and idle:
+                return 'idle'
+        return 'stopped'
+
+
+def write_state(path: str, state: Dict[str, Any]) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.daemon-')
+    # The token lets any local process drive the daemon; keep it readable by the owner only
+    os.chmod(tmp_path, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def remove_state(path: str) -> None:
+    """Remove the state file unless a newer daemon has replaced it."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            if json.load(f).get('pid') == os.getpid():
+                os.remove(path)
+    except (OSError, ValueError):
+        pass
+
+
+def serve(state_file: str, version: str = '', idle_timeout: float = DEFAULT_IDLE_TIMEOUT, port: int = 0) -> str:
+    """Run the daemon until it is idle, shut down or sent SIGTERM; returns why it stopped."""
+    from werkzeug.serving import make_server
+
+    from app import app, browser_pool, eslint_worker
+
+    token = secrets.token_urlsafe(32)
+    daemon = DaemonApp(app.wsgi_app, token, version, idle_timeout)
+    server = make_server('127.0.0.1', port, daemon, threaded=True)
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stopping.set())
+    thread = threading.Thread(target=server.serve_forever, name='daemon-server', daemon=True)
+    thread.start()
+    write_state(state_file, {
+        'pid': os.getpid(),
+        'port': server.server_port,
+        'token': token,
+        'version': version,
+        'started_at': daemon.started_at
+    })
+    print(f"Daemon {os.getpid()} listening on 127.0.0.1:{server.server_port}", flush=True)
+    try:
+        browser_pool.warm(BROWSER_WARM_TIMEOUT)
+    except Exception as e:
+        # Crawls retry the launch; the first generation reports the error
+        print(f"Browser failed to launch: {e}", flush=True)
+
+    reason: Optional[str] = None
+    try:
+        reason = daemon.wait()
+    finally:
+        remove_state(state_file)
+        server.shutdown()
+        browser_pool.close()
+        eslint_worker.close()
+        print(f"Daemon {os.getpid()} exiting ({reason or 'interrupted'})", flush=True)
+    return reason
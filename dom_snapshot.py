@@ -0,0 +1,191 @@
+"""Element snapshots with per-subtree structural hashes, used for incremental regeneration.
+
+A snapshot records, for every extracted element, a fingerprint (its subtree hash plus
+its extracted data), the AI suggestions and resolved selector computed for it, and the
+rendered spec fragments. Diffing a fresh crawl against the previous snapshot tells the
+pipeline which elements are new or changed; everything else is reused.
+"""
+
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set
+
+if TYPE_CHECKING:
+    from bs4 import Tag
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_ARTIFACT = 'snapshot.json'
+
+# Attributes whose values change on every page load (CSRF tokens, Livewire state, nonces)
+# and would otherwise make every subtree look modified.
+VOLATILE_ATTRIBUTES = {
+    'nonce', 'wire:id', 'wire:snapshot', 'wire:initial-data', 'wire:effects', 'data-csrf',
+    'csrf-token', 'data-reactid', 'data-react-checksum'
+}
+OPAQUE_TAGS = {'script', 'style', 'noscript', 'template'}
+KEY_ATTRIBUTES = ['data-testid', 'data-cy', 'data-test', 'data-automation-id', 'id', 'name', 'wire:model', 'aria-label']
+SELECTOR_ATTRIBUTES = KEY_ATTRIBUTES + ['placeholder']
+
+
+def _attribute_items(tag: 'Tag') -> Iterable[str]:
+    hidden = tag.name == 'input' and str(tag.get('type', '')).lower() == 'hidden'
+    for name in sorted(tag.attrs):
+        if name in VOLATILE_ATTRIBUTES or (hidden and name == 'value'):
+            continue
+        value = tag.attrs[name]
+        yield f"{name}={' '.join(value) if isinstance(value, list) else value}"
+
+
+def subtree_hashes(soup) -> Dict[int, str]:
+    """Hash every tag's subtree (name, stable attributes, text, child hashes), keyed by ``id(tag)``.
+
+    Runs as one iterative post-order traversal, so each node is hashed exactly once.
+    """
+    from bs4 import NavigableString, Tag
+    from bs4.element import Comment, Doctype, ProcessingInstruction
+
+    hashes: Dict[int, str] = {}
+    stack = [(soup, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            if node.name not in OPAQUE_TAGS:
+                stack.extend((child, False) for child in node.children if isinstance(child, Tag))
+            continue
+        digest = hashlib.sha1(f"<{node.name}".encode('utf-8'))
+        for item in _attribute_items(node):
+            digest.update(b'\0' + item.encode('utf-8'))
+        if node.name not in OPAQUE_TAGS:
+            for child in node.children:
+                if isinstance(child, Tag):
+                    digest.update(b'\1' + hashes[id(child)].encode('ascii'))
+                elif isinstance(child, NavigableString) and not isinstance(child, (Comment, Doctype, ProcessingInstruction)):
+                    text = ' '.join(child.split())
+                    if text:
+                        digest.update(b'\2' + text.encode('utf-8'))
+        hashes[id(node)] = digest.hexdigest()
+    return hashes
+
+
+def assign_keys(elements: List[Dict[str, Any]]) -> None:
+    """Give each element a ``_key`` that identifies it across crawls.
+
+    Stable attributes (test ids, id, name, ...) are preferred over the positional XPath so
+    that inserting content elsewhere on the page does not re-key everything after it.
+    """
+    seen: Dict[str, int] = {}
+    for element in elements:
+        attribute = next((a for a in KEY_ATTRIBUTES if element.get(a)), None)
+        key = f"{element['tag']}[{attribute}={element[attribute]}]" if attribute else f"{element['tag']}@{element['xpath']}"
+        seen[key] = seen.get(key, 0) + 1
+        element['_key'] = key if seen[key] == 1 else f"{key}#{seen[key]}"
+
+
+def public_data(element: Dict[str, Any]) -> Dict[str, Any]:
+    """Element data without internal (``_``-prefixed) keys or derived AI suggestions."""
+    return {k: v for k, v in element.items() if not k.startswith('_') and k != 'ai_suggestions'}
+
+
+def element_fingerprint(element: Dict[str, Any]) -> str:
+    data = public_data(element)
+    if str(data.get('type', '')).lower() == 'hidden':
+        # Hidden inputs mostly carry per-request tokens.
+        data.pop('value', None)
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1((element.get('_subtree_hash', '') + payload).encode('utf-8')).hexdigest()
+
+
+def selector_tokens(element: Dict[str, Any]) -> Set[str]:
+    """Attribute values a selector for ``element`` could be built from."""
+    return {f"{a}={element[a]}" for a in SELECTOR_ATTRIBUTES if element.get(a)} | {f"tag={element['tag']}"}
+
+
+def diff_elements(elements: List[Dict[str, Any]], previous: Optional[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Split element keys into added, changed, unchanged and removed relative to ``previous``."""
+    diff = {'added': [], 'changed': [], 'unchanged': [], 'removed': []}
+    old = (previous or {}).get('elements', {})
+    for element in elements:
+        entry = old.get(element['_key'])
+        if entry is None:
+            diff['added'].append(element['_key'])
+        elif entry['fingerprint'] == element_fingerprint(element):
+            diff['unchanged'].append(element['_key'])
+        else:
+            diff['changed'].append(element['_key'])
+    current = {e['_key'] for e in elements}
+    diff['removed'] = [key for key in old if key not in current]
+    return diff
+
+
+def reusable_selectors(elements: List[Dict[str, Any]], previous: Optional[Dict[str, Any]],
+                       diff: Dict[str, List[str]]) -> Dict[str, str]:
+    """Selectors from ``previous`` that are still valid for unchanged elements.
+
+    Selector uniqueness depends on the rest of the page, so a cached selector is dropped
+    when any added, changed or removed element shares an attribute value it could match on.
+    """
+    if not previous:
+        return {}
+    old = previous.get('elements', {})
+    by_key = {e['_key']: e for e in elements}
+    touched: Set[str] = set()
+    for key in diff['added'] + diff['changed']:
+        touched |= selector_tokens(by_key[key])
+    for key in diff['changed'] + diff['removed']:
+        touched |= set(old[key].get('selector_tokens', []))
+    reusable = {}
+    for key in diff['unchanged']:
+        entry = old[key]
+        if entry.get('selector') and not (set(entry.get('selector_tokens', [])) & touched):
+            reusable[key] = entry['selector']
+    return reusable
+
+
+class SelectorResolver:
+    """Resolves and memoizes selectors per element key, seeded with reusable ones."""
+
+    def __init__(self, soup, resolve: Callable[[Dict[str, Any], Any], str],
+                 reusable: Optional[Dict[str, str]] = None):
+        self.soup = soup
+        self._resolve = resolve
+        self.reused = dict(reusable or {})
+        self.resolved: Dict[str, str] = {}
+        self.hits = 0
+
+    def __call__(self, element: Dict[str, Any]) -> str:
+        key = element.get('_key')
+        if key is None:
+            return self._resolve(element, self.soup)
+        if key not in self.resolved:
+            if key in self.reused:
+                self.hits += 1
+                self.resolved[key] = self.reused[key]
+            else:
+                self.resolved[key] = self._resolve(element, self.soup)
+        return self.resolved[key]
+
+
+def build_snapshot(url: str, elements: List[Dict[str, Any]], selectors: Dict[str, str],
+                   fragments: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+    """Snapshot of one generation, to be diffed against by the next one."""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'url': url,
+        'elements': {
+            e['_key']: {
+                'fingerprint': element_fingerprint(e),
+                'ai_suggestions': e.get('ai_suggestions', {}),
+                'selector': selectors.get(e['_key']),
+                'selector_tokens': sorted(selector_tokens(e)),
+            } for e in elements
+        },
+        'fragments': fragments
+    }
+
+
+def load_snapshot(raw: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    if not raw:
+        return None
+    snapshot = json.loads(raw)
+    return snapshot if snapshot.get('version') == SNAPSHOT_VERSION else None
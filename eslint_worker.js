@@ -0,0 +1,72 @@
+#!/usr/bin/env node
+
+/**
+ * Persistent ESLint worker.
+ * Reads one JSON request per line on stdin:
+ *   {"id": 1, "files": [{"name": "spec.js", "source": "..."}]}
+ * and writes one JSON response per line on stdout:
+ *   {"id": 1, "results": [{"name": "spec.js", "output": "...", "errorCount": 0, "messages": [...]}]}
+ * ESLint and its configuration are loaded once for the lifetime of the process.
+ */
+
+const path = require('path');
+const readline = require('readline');
+
+const { ESLint } = require(process.env.ESLINT_MODULE_PATH || 'eslint');
+
+const cwd = process.env.ESLINT_CWD || process.cwd();
+const eslint = new ESLint({ cwd, fix: true });
+
+function write(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+async function lintFile(file) {
+    const [result] = await eslint.lintText(file.source, {
+        filePath: path.join(cwd, path.basename(file.name || 'generated.js'))
+    });
+    return {
+        name: file.name,
+        output: result.output !== undefined ? result.output : file.source,
+        errorCount: result.errorCount,
+        warningCount: result.warningCount,
+        messages: result.messages.map((m) => ({
+            ruleId: m.ruleId,
+            severity: m.severity,
+            line: m.line,
+            column: m.column,
+            message: m.message
+        }))
+    };
+}
+
+async function handle(line) {
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (err) {
+        write({ id: null, error: `Invalid request: ${err.message}` });
+        return;
+    }
+    try {
+        const results = [];
+        for (const file of request.files || []) {
+            results.push(await lintFile(file));
+        }
+        write({ id: request.id, results });
+    } catch (err) {
+        write({ id: request.id, error: err.message });
+    }
+}
+
+// Requests are handled strictly in order so responses line up with requests.
+let queue = Promise.resolve();
+const input = readline.createInterface({ input: process.stdin, terminal: false });
+input.on('line', (line) => {
+    if (line.trim()) {
+        queue = queue.then(() => handle(line));
+    }
+});
+input.on('close', () => {
+    queue.then(() => process.exit(0));
+});
@@ -0,0 +1,125 @@
+"""Client for a long-lived ESLint worker process (see eslint_worker.js)."""
+
+import atexit
+import itertools
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from typing import Any, Dict, Optional
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eslint_worker.js')
+
+
+def find_eslint_module() -> Optional[str]:
+    """Locate the eslint package behind the ``eslint`` binary on PATH, or None if it is missing."""
+    binary = shutil.which('eslint')
+    if binary is None:
+        return None
+    target = os.path.realpath(binary)
+    # npm installs bin/eslint.js inside the package and symlinks it onto PATH.
+    if os.path.basename(os.path.dirname(target)) == 'bin':
+        return os.path.dirname(os.path.dirname(target))
+    return 'eslint'
+
+
+class ESLintWorker:
+    """Keeps one Node process with ESLint loaded and lints sources through it in memory.
+
+    The process is started on first use and restarted if it dies or stops responding.
+    ``lint()`` returns None when ESLint (or Node) is not installed, so callers can skip linting.
+    """
+
+    def __init__(self, cwd: Optional[str] = None, timeout: float = 30.0):
+        self.cwd = cwd or os.getcwd()
+        self.timeout = timeout
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        atexit.register(self.close)
+
+    def available(self) -> bool:
+        # A pip install ships the Python modules only, not the worker script
+        return (shutil.which('node') is not None and os.path.exists(WORKER_SCRIPT)
+                and find_eslint_module() is not None)
+
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def _start(self) -> subprocess.Popen:
+        env = {**os.environ, 'ESLINT_MODULE_PATH': find_eslint_module(), 'ESLINT_CWD': self.cwd}
+        process = subprocess.Popen(
+            ['node', WORKER_SCRIPT],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            cwd=self.cwd,
+            env=env
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read_responses, args=(process, self._responses), daemon=True).start()
+        return process
+
+    @staticmethod
+    def _read_responses(process: subprocess.Popen, responses: 'queue.Queue[Optional[str]]') -> None:
+        for line in process.stdout:
+            responses.put(line)
+        responses.put(None)
+
+    def _request(self, files: Dict[str, str]) -> Dict[str, Any]:
+        if self._process is None or self._process.poll() is not None:
+            self._process = self._start()
+        request_id = next(self._ids)
+        payload = {'id': request_id, 'files': [{'name': name, 'source': source} for name, source in files.items()]}
+        self._process.stdin.write(json.dumps(payload) + '\n')
+        self._process.stdin.flush()
+        while True:
+            line = self._responses.get(timeout=self.timeout)
+            if line is None:
+                raise BrokenPipeError('ESLint worker exited')
+            response = json.loads(line)
+            if response.get('id') == request_id:
+                return response
+
+    def lint(self, files: Dict[str, str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Lint and fix ``{name: source}`` in one round trip; returns ``{name: result}`` or None if skipped."""
+        if not files or not self.available():
+            return None
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    response = self._request(files)
+                    break
+                except (OSError, ValueError, queue.Empty) as e:
+                    # Crashed, hung or garbled worker: kill it and retry once with a fresh one.
+                    print(f"ESLint worker error (attempt {attempt + 1}): {e}")
+                    self._kill()
+            else:
+                return None
+        if 'error' in response:
+            print(f"ESLint worker failed: {response['error']}")
+            return None
+        return {result['name']: result for result in response['results']}
+
+    def _kill(self) -> None:
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+    def close(self) -> None:
+        """Shut the worker down by closing its stdin, killing it if it does not exit."""
+        with self._lock:
+            if self._process is None:
+                return
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process = None
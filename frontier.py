@@ -0,0 +1,332 @@
+"""URL frontier for whole-site generation.
+
+Page URLs are gathered from sitemaps (plain or gzipped, following sitemap indexes) and
+from each site's robots.txt, which also decides which URLs may be crawled and how long to
+wait between page loads. URLs are normalized so that trivially different spellings of a
+page (case, default ports, fragments, tracking parameters, parameter order) are counted
+once. They are then grouped by page template: path segments that look like ids, hashes,
+dates or slugs with numbers become placeholders, so ``/product/123`` and ``/product/456``
+share the template ``/product/{int}``. A literal last segment is also treated as a
+placeholder when it has many siblings, e.g. ``/blog/<slug>``. Only ``per_template``
+representatives of each template are generated, since the pages of a template have the
+same elements. ``HostLimiter`` caps concurrent page loads per host and spaces them out.
+"""
+
+import gzip
+import math
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.error import HTTPError
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urljoin, urlparse, urlunparse
+from urllib.request import Request, urlopen
+from urllib.robotparser import RobotFileParser
+
+USER_AGENT = 'cypress-generator'
+FETCH_TIMEOUT = 30
+# Nested sitemap indexes are followed up to this many sitemaps per site
+MAX_SITEMAPS = 100
+DEFAULT_PER_TEMPLATE = 1
+# A literal last path segment with at least this many siblings is treated as a slug
+SIBLING_THRESHOLD = 10
+DEFAULT_HOST_CONCURRENCY = 2
+
+TRACKING_PARAMETERS = {'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl'}
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+UNRESERVED = re.compile(r'%([0-9A-Fa-f]{2})')
+FRACTIONAL_DELAY = re.compile(r'^(\s*crawl-delay\s*:\s*)(\d*\.\d+)', re.I)
+# Placeholders for path segments that vary between pages of one template, in match order
+VARIABLE_SEGMENTS: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r'^\d+$'), '{int}'),
+    (re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I), '{uuid}'),
+    (re.compile(r'^\d{4}-\d{2}(-\d{2})?$'), '{date}'),
+    (re.compile(r'^[0-9a-f]{12,}$', re.I), '{hash}'),
+    # Slugs that carry an id, e.g. red-shoe-4711 or sku12ab
+    (re.compile(r'^(?=[^/]*\d)(?=[^/]*[a-z])[a-z0-9]+(?:[-_.][a-z0-9]+)*$', re.I), '{slug}'),
+]
+
+
+def fetch(url: str) -> bytes:
+    """The body of ``url``, or of a local file, gunzipped if compressed."""
+    if url.startswith(('http://', 'https://')):
+        with urlopen(Request(url, headers={'User-Agent': USER_AGENT}), timeout=FETCH_TIMEOUT) as response:
+            data = response.read()
+    else:
+        with open(url, 'rb') as f:
+            data = f.read()
+    return gzip.decompress(data) if data[:2] == b'\x1f\x8b' else data
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def read_sitemap(location: str, fetcher: Callable[[str], bytes] = fetch,
+                 max_sitemaps: int = MAX_SITEMAPS) -> List[str]:
+    """Page URLs listed in a sitemap (a path or URL), following sitemap indexes."""
+    urls: List[str] = []
+    pending, seen = [location], set()
+    while pending and len(seen) < max_sitemaps:
+        current = pending.pop(0)
+        if current in seen:
+            continue
+        seen.add(current)
+        root = ET.fromstring(fetcher(current))
+        locations = [element.text.strip() for element in root.iter()
+                     if _local_name(element.tag) == 'loc' and element.text and element.text.strip()]
+        if _local_name(root.tag) == 'sitemapindex':
+            pending.extend(locations)
+        else:
+            urls.extend(locations)
+    return urls
+
+
+def _normalize_escape(match: re.Match) -> str:
+    char = chr(int(match.group(1), 16))
+    # Unreserved characters never need escaping; other escapes are kept, in upper case
+    return char if char.isascii() and (char.isalnum() or char in '-._~') else match.group(0).upper()
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """A canonical spelling of ``url`` (resolved against ``base``), or None if it is not http(s).
+
+    Lowercases the scheme and host, drops default ports, fragments and tracking
+    parameters, sorts the query, resolves ``.``/``..`` segments, merges repeated slashes
+    and normalizes percent-escapes.
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+    elif '://' not in url:
+        url = 'https://' + url
+    parts = urlparse(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+    host = parts.hostname.rstrip('.')
+    if ':' in host:
+        host = f'[{host}]'
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port in (None, DEFAULT_PORTS[scheme]) else f'{host}:{port}'
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+    segments: List[str] = []
+    for segment in re.sub(r'/{2,}', '/', parts.path).split('/'):
+        if segment == '..':
+            if segments:
+                segments.pop()
+        elif segment != '.':
+            segments.append(segment)
+    path = '/'.join(segments)
+    if not path.startswith('/'):
+        path = '/' + path
+    if parts.path.endswith(('/.', '/..')) and not path.endswith('/'):
+        path += '/'
+    path = UNRESERVED.sub(_normalize_escape, path)
+
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if key.lower() not in TRACKING_PARAMETERS and not key.lower().startswith(TRACKING_PREFIXES))
+    return urlunparse((scheme, netloc, path, '', urlencode(query, quote_via=quote), ''))
+
+
+def origin_of(url: str) -> str:
+    parts = urlparse(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def _segment_template(segment: str) -> str:
+    decoded = unquote(segment)
+    for pattern, placeholder in VARIABLE_SEGMENTS:
+        if pattern.match(decoded):
+            return placeholder
+    return segment
+
+
+def template_key(url: str) -> str:
+    """The page template of a normalized URL: host, path with placeholders and query parameter names."""
+    parts = urlparse(url)
+    segments = [_segment_template(segment) for segment in parts.path.split('/')]
+    keys = sorted({key for key, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    return parts.netloc + '/'.join(segments) + ('?' + '&'.join(keys) if keys else '')
+
+
+def _split_last(key: str) -> Tuple[str, str, str]:
+    """A template key's parent path, last segment, and the trailing slash and query after it."""
+    path, mark, query = key.partition('?')
+    trailing = '/' if path.endswith('/') else ''
+    parent, _, last = path.rstrip('/').rpartition('/')
+    return parent, last, trailing + mark + query
+
+
+class Frontier:
+    """Collects, filters and deduplicates the page URLs of one or more sites.
+
+    ``add`` takes URLs in discovery order; ``select`` returns the pages to generate. URLs
+    disallowed by robots.txt (unless ``respect_robots`` is off), duplicates after
+    normalization and pages beyond ``per_template`` per template (0 keeps all) are left
+    out and counted in ``stats``.
+    """
+
+    def __init__(self, respect_robots: bool = True, per_template: int = DEFAULT_PER_TEMPLATE,
+                 sibling_threshold: int = SIBLING_THRESHOLD, fetcher: Callable[[str], bytes] = fetch):
+        self.respect_robots = respect_robots
+        self.per_template = per_template
+        self.sibling_threshold = sibling_threshold
+        self.fetcher = fetcher
+        self.urls: List[str] = []
+        self._seen: Set[str] = set()
+        self._robots: Dict[str, RobotFileParser] = {}
+        self.stats = {'discovered': 0, 'invalid': 0, 'duplicate': 0, 'disallowed': 0, 'templates': 0,
+                      'same_template': 0, 'selected': 0}
+
+    def robots(self, url: str) -> RobotFileParser:
+        """The parsed robots.txt of ``url``'s origin, fetched once.
+
+        As for ``RobotFileParser.read``, a 401 or 403 disallows everything and a missing
+        or unreachable file allows everything.
+        """
+        origin = origin_of(url)
+        if origin not in self._robots:
+            parser = RobotFileParser(origin + '/robots.txt')
+            try:
+                lines = self.fetcher(origin + '/robots.txt').decode('utf-8', 'replace').splitlines()
+                # RobotFileParser ignores fractional crawl delays; round them up instead
+                parser.parse([FRACTIONAL_DELAY.sub(lambda m: m.group(1) + str(math.ceil(float(m.group(2)))), line)
+                              for line in lines])
+            except HTTPError as e:
+                if e.code in (401, 403):
+                    parser.disallow_all = True
+                else:
+                    parser.allow_all = True
+            except (OSError, ValueError) as e:
+                print(f"Could not read {origin}/robots.txt, allowing all: {e}")
+                parser.allow_all = True
+            self._robots[origin] = parser
+        return self._robots[origin]
+
+    def crawl_delay(self, url: str) -> float:
+        """Seconds robots.txt asks for between page loads on ``url``'s host (0 if none)."""
+        if not self.respect_robots:
+            return 0.0
+        robots = self.robots(url)
+        delay = float(robots.crawl_delay(USER_AGENT) or 0)
+        rate = robots.request_rate(USER_AGENT)
+        if rate and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        return delay
+
+    def add(self, url: str, base: Optional[str] = None) -> bool:
+        """Add a discovered URL; returns whether it was new and allowed."""
+        self.stats['discovered'] += 1
+        normalized = normalize_url(url, base)
+        if normalized is None:
+            self.stats['invalid'] += 1
+            return False
+        if normalized in self._seen:
+            self.stats['duplicate'] += 1
+            return False
+        self._seen.add(normalized)
+        if self.respect_robots and not self.robots(normalized).can_fetch(USER_AGENT, normalized):
+            self.stats['disallowed'] += 1
+            return False
+        self.urls.append(normalized)
+        return True
+
+    def add_sitemap(self, location: str) -> int:
+        """Add every page of a sitemap or sitemap index; returns how many were added."""
+        return sum(self.add(url, location if location.startswith(('http://', 'https://')) else None)
+                   for url in read_sitemap(location, self.fetcher))
+
+    def add_site(self, url: str) -> int:
+        """Add a site's home page and the pages of the sitemaps its robots.txt lists.
+
+        Without a ``Sitemap:`` line, ``/sitemap.xml`` is tried.
+        """
+        home = normalize_url(url)
+        if home is None:
+            self.add(url)
+            return 0
+        added = int(self.add(home))
+        sitemaps = self.robots(home).site_maps() or [origin_of(home) + '/sitemap.xml']
+        for sitemap in sitemaps:
+            try:
+                added += self.add_sitemap(sitemap)
+            except (OSError, ET.ParseError) as e:
+                print(f"Could not read sitemap {sitemap}: {e}")
+        return added
+
+    def templates(self) -> Dict[str, List[str]]:
+        """Added URLs grouped by template, in discovery order.
+
+        Literal last segments with ``sibling_threshold`` or more siblings under the same
+        parent (below the top level) are collapsed into ``{slug}`` as well.
+        """
+        keys = {url: template_key(url) for url in self.urls}
+        siblings: Dict[str, Set[str]] = defaultdict(set)
+        for key in keys.values():
+            parent, last, _ = _split_last(key)
+            if parent.count('/') >= 1 and last and not last.startswith('{'):
+                siblings[parent].add(last)
+        groups: Dict[str, List[str]] = {}
+        for url, key in keys.items():
+            parent, last, rest = _split_last(key)
+            if last and self.sibling_threshold and len(siblings.get(parent, ())) >= self.sibling_threshold:
+                key = f"{parent}/{{slug}}{rest}"
+            groups.setdefault(key, []).append(url)
+        return groups
+
+    def select(self) -> List[str]:
+        """The URLs to generate: up to ``per_template`` of each template, in discovery order."""
+        if not self.per_template:
+            selected = list(self.urls)
+            self.stats['templates'] = len(self.templates())
+        else:
+            groups = self.templates()
+            chosen = {url for urls in groups.values() for url in urls[:self.per_template]}
+            selected = [url for url in self.urls if url in chosen]
+            self.stats['templates'] = len(groups)
+        self.stats['same_template'] = len(self.urls) - len(selected)
+        self.stats['selected'] = len(selected)
+        return selected
+
+
+class HostLimiter:
+    """Limits concurrent page loads per host and spaces their starts.
+
+    Loads of one host start at least ``delay`` seconds apart, or the host's own delay
+    from ``delays`` (e.g. robots.txt crawl-delay) if longer.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_HOST_CONCURRENCY, delay: float = 0.0,
+                 delays: Optional[Dict[str, float]] = None):
+        self.concurrency = max(1, concurrency)
+        self.delay = delay
+        self.delays = delays or {}
+        self._lock = threading.Lock()
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._next_start: Dict[str, float] = {}
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Hold one of the host's slots, waiting for its turn, while the block runs."""
+        host = urlparse(url).netloc
+        with self._lock:
+            slots = self._slots.setdefault(host, threading.BoundedSemaphore(self.concurrency))
+        with slots:
+            interval = max(self.delay, self.delays.get(host, 0.0))
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, 0.0))
+                self._next_start[host] = start + interval
+            if start > now:
+                time.sleep(start - now)
+            yield
@@ -0,0 +1,199 @@
+"""Saved pages (HTML or MHTML files) as an offline source for generation.
+
+A snapshot is the document of a page saved from a browser, for example from a staging
+site the generator cannot reach. Its original URL, which the specs visit and jobs are
+stored under, is read from the MHTML headers, from ``<link rel="canonical">``,
+``<base href>`` or the "saved from url" comment browsers add, and is otherwise the
+snapshot's ``file://`` URL. An uploaded snapshot with no recorded URL gets a synthetic
+one on the reserved ``.invalid`` domain, unique to its content. Snapshots are parsed as they are, or rendered in the pooled
+browser under ``SnapshotReplay``, which answers every request from the snapshot and
+its MHTML resources so that nothing is fetched from the network.
+"""
+
+import email
+import email.policy
+import hashlib
+import os
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote, urljoin, urlparse
+from urllib.request import pathname2url
+
+HTML_SUFFIXES = ('.html', '.htm', '.xhtml')
+MHTML_SUFFIXES = ('.mhtml', '.mht')
+SNAPSHOT_SUFFIXES = HTML_SUFFIXES + MHTML_SUFFIXES
+# How much of a file is searched for its charset, URL hints and MHTML headers
+HEAD_BYTES = 8192
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w-]+)', re.I)
+SAVED_FROM = re.compile(r'<!--\s*saved from url=\(\d+\)(\S+?)\s*-->', re.I)
+CANONICAL = re.compile(r'<link\b(?=[^>]*\brel\s*=\s*["\']?canonical\b)[^>]*\bhref\s*=\s*["\']([^"\']+)["\']', re.I)
+BASE_HREF = re.compile(r'<base\b[^>]*\bhref\s*=\s*["\']([^"\']+)["\']', re.I)
+# Host of the URLs given to uploads that record none; .invalid never resolves
+SYNTHETIC_DOMAIN = 'snapshot.invalid'
+
+
+def is_mhtml(data: bytes, name: str = '') -> bool:
+    """Whether ``data`` is an MHTML archive, by its suffix or its MIME headers."""
+    if name.lower().endswith(MHTML_SUFFIXES):
+        return True
+    head = data[:HEAD_BYTES].lstrip().lower()
+    return not head.startswith(b'<') and b'multipart/related' in head
+
+
+def decode_html(data: bytes, charset: Optional[str] = None) -> str:
+    """Decode an HTML document by its byte order mark, ``charset`` or ``<meta charset>``."""
+    if data.startswith(b'\xef\xbb\xbf'):
+        return data[3:].decode('utf-8', errors='replace')
+    if data.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return data.decode('utf-16', errors='replace')
+    if not charset:
+        match = META_CHARSET.search(data[:HEAD_BYTES])
+        charset = match.group(1).decode('ascii') if match else 'utf-8'
+    try:
+        return data.decode(charset, errors='replace')
+    except LookupError:
+        return data.decode('utf-8', errors='replace')
+
+
+def original_url(html: str) -> Optional[str]:
+    """The page's own URL as recorded in its HTML, if it is an absolute http(s) URL."""
+    head = html[:HEAD_BYTES * 4]
+    for pattern in (SAVED_FROM, CANONICAL, BASE_HREF):
+        match = pattern.search(head)
+        if match and urlparse(match.group(1)).scheme in ('http', 'https'):
+            return match.group(1)
+    return None
+
+
+def read_mhtml(data: bytes) -> Tuple[str, Optional[str], Dict[str, Tuple[str, bytes]]]:
+    """The HTML document of an MHTML archive, its URL and its other parts by URL.
+
+    Parts are ``(content_type, body)``; the first ``text/html`` part is the document.
+    """
+    message = email.message_from_bytes(data, policy=email.policy.compat32)
+    html, url = None, message.get('Snapshot-Content-Location')
+    resources: Dict[str, Tuple[str, bytes]] = {}
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        body = part.get_payload(decode=True) or b''
+        location = part.get('Content-Location')
+        if html is None and part.get_content_type() == 'text/html':
+            html = decode_html(body, part.get_content_charset())
+            url = url or location
+        elif location:
+            resources[location] = (part.get_content_type(), body)
+    if html is None:
+        raise ValueError('MHTML archive has no text/html part')
+    return html, url, resources
+
+
+def read_snapshot(data: bytes, name: str, url: Optional[str] = None, path: Optional[str] = None) -> Dict[str, Any]:
+    """A snapshot from the bytes of a saved HTML or MHTML file.
+
+    ``url`` overrides the URL recorded in the file; ``path`` is where the file is on
+    disk, which becomes its URL when none is recorded. Without either, the URL is
+    synthetic: different uploads with the same name do not share cached jobs. Raises
+    ``ValueError`` if the file is neither.
+    """
+    resources: Dict[str, Tuple[str, bytes]] = {}
+    if is_mhtml(data, name):
+        html, recorded, resources = read_mhtml(data)
+    else:
+        html, recorded = decode_html(data), None
+    if '<' not in html:
+        raise ValueError(f'{name} is not an HTML document')
+    if not url:
+        url = recorded if urlparse(recorded or '').scheme in ('http', 'https') else original_url(html)
+    if not url and path:
+        url = Path(os.path.abspath(path)).as_uri()
+    if not url:
+        digest = hashlib.sha256(data).hexdigest()[:16]
+        url = f"http://{digest}.{SYNTHETIC_DOMAIN}/{quote(name)}"
+    return {'name': name, 'url': url, 'html': html, 'resources': resources}
+
+
+def page_label(url: str, name: Optional[str] = None) -> str:
+    """What a page's spec is named after: its host, or for a local or synthetic URL the snapshot's name."""
+    host = urlparse(url).netloc
+    if name and (not host or host.endswith('.' + SYNTHETIC_DOMAIN)):
+        return os.path.splitext(name)[0]
+    return host
+
+
+def load_snapshot_file(path: str, url: Optional[str] = None) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        return read_snapshot(f.read(), os.path.basename(path), url, path)
+
+
+def find_snapshot_files(paths: List[str]) -> List[str]:
+    """The snapshot files among ``paths``, searching directories recursively in name order.
+
+    Files named directly are kept whatever their suffix; in directories only HTML and
+    MHTML files count. Raises ``OSError`` for a path that does not exist.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                found.extend(os.path.join(directory, name) for name in sorted(names)
+                             if name.lower().endswith(SNAPSHOT_SUFFIXES))
+        elif os.path.isfile(path):
+            found.append(path)
+        else:
+            raise FileNotFoundError(f'No such snapshot file or directory: {path}')
+    return list(dict.fromkeys(found))
+
+
+def within(root: str, path: str) -> bool:
+    """Whether ``path`` resolves to ``root`` or somewhere below it."""
+    root = os.path.realpath(root)
+    return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+
+class SnapshotReplay:
+    """Loads a snapshot in a browser page as if it were fetched from its URL.
+
+    Used in place of a ``CrawlPolicy`` by the crawl: the document request is answered
+    with the snapshot's HTML, requests for MHTML resources with those resources, and
+    every other request is aborted and counted in ``blocked_requests``. Waiting for the
+    page to settle is left to ``policy``.
+    """
+
+    def __init__(self, snapshot: Dict[str, Any], policy):
+        self.snapshot = snapshot
+        self.policy = policy
+
+    def render_url(self) -> str:
+        """Where the page is loaded: its URL, unless that cannot be intercepted."""
+        url = self.snapshot['url']
+        if urlparse(url).scheme in ('http', 'https'):
+            return url
+        # file: URLs are not routed through request interception
+        return urljoin('http://snapshot.invalid/', pathname2url(self.snapshot['name']))
+
+    async def attach(self, page, page_url: str, stats: Dict[str, int]) -> None:
+        # The browser may add a trailing slash to the URL it requests
+        document = page_url.split('#')[0].rstrip('/')
+        resources = self.snapshot['resources']
+        stats.setdefault('blocked_requests', 0)
+
+        async def handle(route) -> None:
+            url = route.request.url.split('#')[0]
+            if url.rstrip('/') == document:
+                await route.fulfill(status=200, content_type='text/html; charset=utf-8', body=self.snapshot['html'])
+            elif url in resources:
+                content_type, body = resources[url]
+                await route.fulfill(status=200, content_type=content_type, body=body)
+            else:
+                stats['blocked_requests'] += 1
+                await route.abort('blockedbyclient')
+
+        await page.route('**/*', handle)
+
+    async def load(self, page, url: str, timings: Dict[str, Any]) -> None:
+        await self.policy.load(page, url, timings)
+
@@ -0,0 +1,449 @@
+"""Token-aware, linear-time clean-up of generated JavaScript.
+
+Replaces the old regex lint fixes: the source is tokenized once (strings, template
+literals, comments and regex literals are opaque tokens, so nothing inside them is
+touched) and then fixed in a constant number of passes over the token list:
+
+- inserts missing semicolons where a statement ends at a line break,
+- drops unused ``const``/``let``/``var`` declarations whose initializer is a literal
+  (anything else, even a property read, may run code), and ``console.log(...)`` statements,
+- converts double-quoted strings to single quotes unless that would need escaping,
+- re-indents lines from bracket nesting, the body line of a brace-less ``if``, ``for``,
+  ``while`` or ``else``, the statements under a ``case`` and the continuation lines of
+  a ternary, and strips trailing whitespace.
+
+Braces are classified when they open: object literals, statement blocks, and the bodies
+of functions and classes, which end the statement when the ``function``/``class``
+keyword or the arrow is in expression position (``const f = function () {...};``).
+"""
+
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"""
+    (?P<nl>\n)
+  | (?P<ws>[ \t\r\f\v]+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?(?:\*/|\Z))
+  | (?P<string>'(?:[^'\\\n]|\\[\s\S])*'?|"(?:[^"\\\n]|\\[\s\S])*"?)
+  | (?P<number>\.?\d[\w.]*)
+  | (?P<ident>[A-Za-z_$\u0080-￿][\w$\u0080-￿]*)
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|&&=|\|\|=|\?\?=|\?\.|\?\?|=>|==|!=|<=|>=|&&|\|\||\+\+|--
+             |\+=|-=|\*=|/=|%=|&=|\|=|\^=|\*\*|<<|>>|[{}()\[\];,<>+\-*/%&|^!~?:=.@\#\\])
+""", re.VERBOSE)
+
+_REGEX_BODY_RE = re.compile(r'(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+CLOSERS = {')', ']', '}'}
+
+# Keywords that can end a line without ending the statement.
+_NON_TERMINAL_KEYWORDS = {
+    'else', 'do', 'try', 'finally', 'in', 'of', 'instanceof', 'typeof', 'new', 'delete',
+    'void', 'case', 'default', 'const', 'let', 'var', 'function', 'class', 'extends',
+    'async', 'await', 'yield', 'import', 'export', 'from', 'if', 'for', 'while', 'switch',
+    'catch', 'with'
+}
+_CONTROL_KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'with'}
+_BLOCK_PRECEDERS = {')', '=>', 'else', 'try', 'finally', 'do', ';', '{', '}', None}
+# A line starting with one of these continues the previous line's expression.
+_CONTINUATIONS = {
+    '.', '?.', ')', ']', ',', '?', ':', '=>', '(', '[', '+', '-', '*', '/', '%', '**', '&&',
+    '||', '??', '==', '===', '!=', '!==', '<', '>', '<=', '>=', '&', '|', '^', '<<', '>>',
+    '>>>', '=', '+=', '-=', '*=', '/=', '%=', 'in', 'of', 'instanceof', '{'
+}
+# Brace kinds whose contents are statements, where missing semicolons are inserted.
+_STATEMENT_BODIES = {'block', 'function', 'function_expr'}
+# Brace kinds whose closing brace ends the enclosing statement.
+_EXPRESSION_BODIES = {'object', 'function_expr', 'class_expr'}
+_LITERAL_IDENTS = {'true', 'false', 'null', 'undefined'}
+# Punctuation allowed in a literal initializer: array and object literals and signs.
+_LITERAL_PUNCT = {'[', ']', '{', '}', ',', ':', '-', '+'}
+_REGEX_PRECEDERS_IDENT = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete', 'void', 'yield', 'await'}
+
+Token = Tuple[str, str]
+
+
+def _template_end(source: str, pos: int) -> int:
+    """Return the index just past the template literal starting at ``source[pos] == '`'``."""
+    i = pos + 1
+    n = len(source)
+    while i < n:
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            return i + 1
+        elif ch == '$' and source.startswith('${', i):
+            i = _expression_end(source, i + 2)
+        else:
+            i += 1
+    return n
+
+
+def _expression_end(source: str, pos: int) -> int:
+    """Return the index just past the ``}`` closing a template ``${`` expression."""
+    depth = 0
+    i = pos
+    n = len(source)
+    while i < n:
+        ch = source[i]
+        if ch == '`':
+            i = _template_end(source, i)
+            continue
+        if ch in '\'"':
+            match = _TOKEN_RE.match(source, i)
+            i = match.end()
+            continue
+        if ch == '{':
+            depth += 1
+        elif ch == '}':
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return n
+
+
+def _template_expressions(text: str) -> List[str]:
+    """The source of each ``${...}`` expression of the template literal ``text``."""
+    expressions = []
+    i = 1
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch == '\\':
+            i += 2
+        elif ch == '`':
+            break
+        elif ch == '$' and text.startswith('${', i):
+            end = _expression_end(text, i + 2)
+            expressions.append(text[i + 2:end - 1])
+            i = end
+        else:
+            i += 1
+    return expressions
+
+
+def _template_idents(text: str) -> List[str]:
+    """Identifiers used in the ``${...}`` expressions of a template literal, nested ones included."""
+    names = []
+    for expression in _template_expressions(text):
+        for kind, value in tokenize(expression):
+            if kind == 'ident':
+                names.append(value)
+            elif kind == 'template':
+                names.extend(_template_idents(value))
+    return names
+
+
+def tokenize(source: str) -> List[Token]:
+    """Split JavaScript source into ``(kind, text)`` tokens in a single pass."""
+    tokens: List[Token] = []
+    last_sig: Optional[Token] = None
+    pos = 0
+    n = len(source)
+    while pos < n:
+        ch = source[pos]
+        if ch == '`':
+            end = _template_end(source, pos)
+            token = ('template', source[pos:end])
+        elif ch == '/' and not source.startswith(('//', '/*'), pos) and _regex_allowed(last_sig):
+            match = _REGEX_BODY_RE.match(source, pos + 1)
+            end = match.end() if match else pos + 1
+            token = ('regex', source[pos:end]) if match else ('punct', '/')
+        else:
+            match = _TOKEN_RE.match(source, pos)
+            if match is None:
+                end = pos + 1
+                token = ('punct', ch)
+            else:
+                end = match.end()
+                token = (match.lastgroup, match.group())
+        tokens.append(token)
+        if token[0] not in ('ws', 'nl', 'comment'):
+            last_sig = token
+        pos = end
+    return tokens
+
+
+def _regex_allowed(last_sig: Optional[Token]) -> bool:
+    if last_sig is None:
+        return True
+    kind, text = last_sig
+    if kind == 'ident':
+        return text in _REGEX_PRECEDERS_IDENT
+    if kind == 'punct':
+        return text not in (')', ']', '}', '++', '--')
+    return False
+
+
+def _ends_statement(token: Token, closed_kind: Optional[str]) -> bool:
+    kind, text = token
+    if kind in ('string', 'template', 'number', 'regex'):
+        return True
+    if kind == 'ident':
+        return text not in _NON_TERMINAL_KEYWORDS
+    if text in (']', '++', '--'):
+        return True
+    if text == ')':
+        return closed_kind != 'control'
+    if text == '}':
+        return closed_kind in _EXPRESSION_BODIES
+    return False
+
+
+def _normalize_quotes(text: str) -> str:
+    """Turn a double-quoted string literal into a single-quoted one when no escaping is needed."""
+    if len(text) < 2 or text[0] != '"' or text[-1] != '"':
+        return text
+    body = text[1:-1]
+    if "'" in body:
+        return text
+    return "'" + body.replace('\\"', '"') + "'"
+
+
+def postprocess(source: str, indent_unit: str = '  ') -> str:
+    """Apply the semicolon, unused-declaration, quote and indentation fixes to ``source``."""
+    tokens = tokenize(source)
+    n = len(tokens)
+
+    # Index of the next significant token after each position (reverse scan).
+    next_sig: List[Optional[int]] = [None] * (n + 1)
+    following = None
+    for i in range(n - 1, -1, -1):
+        next_sig[i] = following
+        if tokens[i][0] not in ('ws', 'nl', 'comment'):
+            following = i
+
+    semicolon_after: Set[int] = set()
+    closed_kind: Dict[int, str] = {}
+    ident_counts: Dict[str, int] = {}
+    # [start index, declared name (None for console.log), initializer start, literal, end index]
+    candidates: List[List] = []
+    open_statements: Dict[int, List] = {}
+    removals: List[Tuple[int, int]] = []
+    stack: List[str] = []
+    # Opening brace index of each stack entry, and the opener each closer matched
+    openers: List[int] = []
+    opener_of: Dict[int, int] = {}
+    opened_kind: Dict[int, str] = {}
+    prev_sig_of: Dict[int, Optional[int]] = {}
+    # Depth -> kind of the next brace opened at that depth (after ``function``/``class``)
+    pending_body: Dict[int, str] = {}
+    # Control parens that close a ``do {...} while (...)``, which has no body after it
+    do_while: Set[int] = set()
+    prev_sig: Optional[int] = None
+    line_last_sig: Optional[int] = None
+    starts_statement: Dict[int, bool] = {}
+
+    def close_statement(depth: int, end: int) -> None:
+        statement = open_statements.pop(depth, None)
+        if statement is not None:
+            statement[4] = end
+            candidates.append(statement)
+
+    def is_literal(i: int) -> bool:
+        kind, text = tokens[i]
+        if kind in ('string', 'number', 'regex'):
+            return True
+        if kind == 'template':
+            return '${' not in text
+        if kind == 'ident':
+            # Literal values, and keys of an object literal
+            following = next_sig[i]
+            return text in _LITERAL_IDENTS or (bool(stack) and stack[-1] == 'object' and following is not None
+                                               and tokens[following][1] == ':')
+        return text in _LITERAL_PUNCT
+
+    for i, (kind, text) in enumerate(tokens):
+        if kind == 'nl':
+            if line_last_sig is not None and (not stack or stack[-1] in _STATEMENT_BODIES):
+                last = tokens[line_last_sig]
+                following = next_sig[i]
+                continues = following is not None and tokens[following][1] in _CONTINUATIONS \
+                    and tokens[following][0] in ('punct', 'ident')
+                if last[1] != ';' and _ends_statement(last, closed_kind.get(line_last_sig)) and not continues:
+                    semicolon_after.add(line_last_sig)
+                    close_statement(len(stack), line_last_sig)
+            line_last_sig = None
+            continue
+        if kind in ('ws', 'comment'):
+            continue
+
+        prev_text = tokens[prev_sig][1] if prev_sig is not None else None
+        at_statement_start = prev_sig is None or prev_text in (';', '{', '}') or prev_sig in semicolon_after
+        starts_statement[i] = at_statement_start
+        prev_sig_of[i] = prev_sig
+        depth = len(stack)
+        for statement in open_statements.values():
+            if statement[3] and i >= statement[2] and not is_literal(i):
+                statement[3] = False
+
+        if kind == 'ident':
+            ident_counts[text] = ident_counts.get(text, 0) + 1
+            if text in ('function', 'class'):
+                # ``async function`` starts where ``async`` does; ``export [default]`` declares
+                declaration = starts_statement.get(prev_sig, False) if prev_text == 'async' else at_statement_start
+                declaration = declaration or prev_text in ('export', 'default')
+                pending_body[depth] = text + ('' if declaration else '_expr')
+            elif text == 'while' and prev_text == '}' and prev_sig in opener_of:
+                before = prev_sig_of.get(opener_of[prev_sig])
+                if before is not None and tokens[before][1] == 'do':
+                    do_while.add(depth)
+            if at_statement_start and depth not in open_statements:
+                a, b, c = next_sig[i], None, None
+                b = next_sig[a] if a is not None else None
+                c = next_sig[b] if b is not None else None
+                if text in ('const', 'let', 'var') and a is not None and tokens[a][0] == 'ident' \
+                        and b is not None and tokens[b][1] == '=':
+                    open_statements[depth] = [i, tokens[a][1], b + 1, True, None]
+                elif text == 'console' and a is not None and tokens[a][1] == '.' \
+                        and b is not None and tokens[b][1] == 'log' and c is not None and tokens[c][1] == '(':
+                    open_statements[depth] = [i, None, i, True, None]
+        elif kind == 'template':
+            # Names used only inside ``${...}`` are still used
+            for name in _template_idents(text):
+                ident_counts[name] = ident_counts.get(name, 0) + 1
+        elif kind == 'punct':
+            if text in OPENERS:
+                if text == '{':
+                    if depth in pending_body:
+                        stack.append(pending_body.pop(depth))
+                    elif prev_text == '=>':
+                        stack.append('function_expr')
+                    else:
+                        stack.append('block' if prev_text in _BLOCK_PRECEDERS or at_statement_start else 'object')
+                elif text == '(':
+                    if prev_text == 'while' and depth in do_while:
+                        do_while.discard(depth)
+                        stack.append('do_while')
+                    else:
+                        stack.append('control' if prev_text in _CONTROL_KEYWORDS else 'paren')
+                else:
+                    stack.append('bracket')
+                opened_kind[i] = stack[-1]
+                openers.append(i)
+            elif text in CLOSERS:
+                if stack:
+                    closed_kind[i] = stack.pop()
+                    opener_of[i] = openers.pop()
+                if len(stack) < depth:
+                    open_statements.pop(depth, None)
+            elif text == ';':
+                close_statement(depth, i)
+            elif text == ',' and depth in open_statements:
+                # ``const a = 1, b = 2`` declares several names; leave it alone.
+                open_statements[depth][3] = False
+        prev_sig = i
+        line_last_sig = i
+
+    if line_last_sig is not None and (not stack or stack[-1] in _STATEMENT_BODIES) \
+            and tokens[line_last_sig][1] != ';' and _ends_statement(tokens[line_last_sig], closed_kind.get(line_last_sig)):
+        semicolon_after.add(line_last_sig)
+        close_statement(len(stack), line_last_sig)
+
+    for start, name, _init, literal, end in candidates:
+        if end is None:
+            continue
+        if name is None or (literal and ident_counts.get(name, 0) == 1):
+            removals.append((start, end))
+
+    removed = [False] * n
+    for start, end in removals:
+        for i in range(start, end + 1):
+            removed[i] = True
+        # Swallow the rest of the line (``;``, whitespace, newline) so no blank line is left.
+        j = end + 1
+        while j < n and tokens[j][0] == 'ws':
+            removed[j] = True
+            j += 1
+        if j < n and tokens[j][1] == ';':
+            removed[j] = True
+            j += 1
+            while j < n and tokens[j][0] == 'ws':
+                removed[j] = True
+                j += 1
+        if j < n and tokens[j][0] == 'nl':
+            removed[j] = True
+        # Also drop the indentation in front of the removed statement.
+        k = start - 1
+        while k >= 0 and tokens[k][0] == 'ws':
+            removed[k] = True
+            k -= 1
+
+    # Final pass: emit tokens with normalized quotes and indentation. Each open bracket
+    # remembers the indent its contents sit under, the line it was opened on, its kind
+    # and whether a ``case`` label has been seen in it. A line after a brace-less control
+    # header (``if (a)``, ``else``) is its body and hangs one level deeper, cumulatively
+    # for nested headers. Statements under a ``case`` and lines that continue a ternary
+    # (starting with ``?``/``:``, or after a line ending in ``?``) sit one level deeper.
+    out: List[str] = []
+    indent_stack: List[List] = []
+    line_no = 0
+    line_base = 0
+    at_line_start = True
+    pending_ws = ''
+    last_emitted: Optional[int] = None
+    previous_last: Optional[int] = None
+    hanging = 0
+    ternary = False
+    for i, (kind, text) in enumerate(tokens):
+        if removed[i]:
+            continue
+        if kind == 'nl':
+            out.append('\n')
+            line_no += 1
+            at_line_start = True
+            pending_ws = ''
+            if last_emitted is not None:
+                last_kind, last_text = tokens[last_emitted]
+                header = (last_text == ')' and closed_kind.get(last_emitted) == 'control') \
+                    or (last_kind == 'ident' and last_text in ('else', 'do'))
+                hanging = hanging + 1 if header else 0
+            previous_last = last_emitted
+            last_emitted = None
+            continue
+        if kind == 'ws':
+            if not at_line_start:
+                pending_ws = text
+            continue
+        if at_line_start:
+            after = tokens[previous_last][1] if previous_last is not None else None
+            ternary = kind == 'punct' and text in ('?', ':') or after == '?' or (after == ':' and ternary)
+            if kind == 'punct' and text in CLOSERS:
+                line_indent = indent_stack[-1][0] if indent_stack else 0
+            else:
+                line_indent = indent_stack[-1][0] + 1 if indent_stack else 0
+                if text in ('.', '?.') or ternary:
+                    line_indent += 1
+                if indent_stack and indent_stack[-1][2] == 'block':
+                    if kind == 'ident' and text in ('case', 'default'):
+                        indent_stack[-1][3] = True
+                    elif indent_stack[-1][3]:
+                        line_indent += 1
+            if text != '{':
+                line_indent += hanging
+            line_base = line_indent
+            out.append(indent_unit * line_indent)
+            at_line_start = False
+        elif pending_ws:
+            out.append(pending_ws)
+        pending_ws = ''
+
+        if kind == 'string':
+            text = _normalize_quotes(text)
+        out.append(text)
+        if kind != 'comment':
+            last_emitted = i
+        if kind == 'punct':
+            if text in OPENERS:
+                indent_stack.append([line_base, line_no, opened_kind.get(i), False])
+            elif text in CLOSERS and indent_stack:
+                indent, opened_on, _, _ = indent_stack.pop()
+                # ``b) {`` closes a bracket from an earlier line: what opens next on
+                # this line nests under that bracket's line, not under this one.
+                if opened_on != line_no:
+                    line_base = indent
+        if i in semicolon_after:
+            out.append(';')
+    return ''.join(out)
@@ -0,0 +1,268 @@
+"""Pipeline timings, counters and gauges, exposed in the Prometheus text format.
+
+Each stage of a generation (browser acquire, navigation, extraction, AI enrichment,
+selector resolution, generation, lint, writes) is timed into a latency histogram.
+While a request is being served, the same timings are summed into a per-request
+breakdown that the API returns with its response. There is no client library
+dependency: the registry renders the text exposition format itself.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NAMESPACE = 'cypress_generator'
+# Seconds; crawls and AI calls run to tens of seconds, template rendering to milliseconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# crawl_timings phases and the stage each is reported as.
+CRAWL_STAGES = {
+    'context_ms': 'browser_acquire',
+    'auth_ms': 'login',
+    'navigation_ms': 'navigation',
+    'dom_stable_ms': 'load_wait',
+    'selector_ms': 'load_wait',
+    'network_idle_ms': 'load_wait',
+    'fingerprint_ms': 'fingerprint',
+    'extract_ms': 'extraction',
+    'parse_ms': 'parse',
+}
+
+_breakdown: ContextVar[Optional[Dict[str, Any]]] = ContextVar('metrics_breakdown', default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Family:
+    """A metric with a fixed set of label names and one series per label combination."""
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels: {', '.join(self.labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+    def _render_series(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}']
+
+
+class Counter(_Family):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+
+class Gauge(_Family):
+    """A value set directly, or read from ``callback()`` at scrape time when one is given."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def render(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                self.set(float(self.callback()))
+            except Exception as e:
+                print(f"Metrics gauge {self.name} failed: {e}")
+        return super().render()
+
+
+class Histogram(_Family):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def totals(self) -> Dict[Tuple[str, ...], Tuple[float, int]]:
+        """``(sum, count)`` of every series, keyed by label values."""
+        with self._lock:
+            return {key: (series['sum'], series['count']) for key, series in self._series.items()}
+
+    def _render_series(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, value['counts']):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, ("le", _format_value(bound)))} '
+                         f'{cumulative}')
+        lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, ("le", "+Inf"))} {value["count"]}')
+        lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_format_value(round(value["sum"], 6))}')
+        lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {value["count"]}')
+        return lines
+
+
+class Metrics:
+    """The generator's metric families and the per-request timing breakdown.
+
+    ``begin_request()`` starts a breakdown for the current context (the request thread)
+    and ``end_request()`` records the request itself. Stages timed with ``stage()`` or
+    reported through ``observe_crawl()`` while a breakdown is active are summed into it
+    as ``<stage>_ms``. Gauges of other components are registered with ``gauge()``.
+    """
+
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self._families: List[_Family] = []
+        self.stage_seconds = self.register(Histogram(
+            f'{namespace}_stage_seconds', 'Time spent in each generation pipeline stage.', ['stage']))
+        self.request_seconds = self.register(Histogram(
+            f'{namespace}_http_request_seconds', 'HTTP request latency.', ['endpoint', 'method']))
+        self.requests = self.register(Counter(
+            f'{namespace}_http_requests_total', 'HTTP requests served.', ['endpoint', 'method', 'status']))
+        self.cache = self.register(Counter(
+            f'{namespace}_cache_lookups_total', 'Cache lookups by cache and result (hit or miss).',
+            ['cache', 'result']))
+        self.ai_requests = self.register(Counter(
+            f'{namespace}_ai_requests_total', 'AI suggestion requests by result.', ['result']))
+        self.ai_tokens = self.register(Counter(
+            f'{namespace}_ai_tokens_total', 'Tokens used by AI suggestion requests.', ['kind']))
+        self.blocked_requests = self.register(Counter(
+            f'{namespace}_crawl_blocked_requests_total', 'Requests aborted by the crawl policy.'))
+
+    def register(self, family: _Family) -> Any:
+        self._families.append(family)
+        return family
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]) -> Gauge:
+        """Register a gauge read from ``callback()`` on every scrape."""
+        return self.register(Gauge(f'{self.namespace}_{name}', help_text, callback=callback))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        return '\n'.join(lines) + '\n'
+
+    def begin_request(self) -> Any:
+        """Start a timing breakdown for the current request; returns a token for ``end_request``."""
+        return (_breakdown.set({}), time.perf_counter())
+
+    def end_request(self, token: Any, endpoint: str, method: str, status: int) -> None:
+        if token is None:
+            return
+        context_token, started = token
+        self.request_seconds.observe(time.perf_counter() - started, endpoint=endpoint, method=method)
+        self.requests.inc(endpoint=endpoint, method=method, status=status)
+        _breakdown.reset(context_token)
+
+    def request_timings(self) -> Optional[Dict[str, Any]]:
+        """A copy of the current request's breakdown, or None outside a request."""
+        breakdown = _breakdown.get()
+        return None if breakdown is None else {key: round(value, 1) if isinstance(value, float) else value
+                                               for key, value in breakdown.items()}
+
+    def _add(self, key: str, amount: float) -> None:
+        breakdown = _breakdown.get()
+        if breakdown is not None:
+            breakdown[key] = breakdown.get(key, 0) + amount
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self.stage_seconds.observe(seconds, stage=stage)
+        self._add(f'{stage}_ms', seconds * 1000)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the block as pipeline stage ``name``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - started)
+
+    def observe_crawl(self, timings: Optional[Dict[str, Any]]) -> None:
+        """Report a crawl's ``crawl_timings`` (primary viewport) as pipeline stages.
+
+        Crawls run on the browser pool's event loop, outside the request context, so
+        their phases are reported from the returned timings.
+        """
+        if not timings:
+            return
+        stages: Dict[str, float] = {}
+        for key, stage in CRAWL_STAGES.items():
+            if key in timings:
+                stages[stage] = stages.get(stage, 0) + timings[key]
+        for stage, ms in stages.items():
+            self.observe_stage(stage, ms / 1000)
+        if timings.get('blocked_requests'):
+            self.blocked_requests.inc(timings['blocked_requests'])
+            self._add('blocked_requests', timings['blocked_requests'])
+
+    def stage_totals(self) -> Dict[str, Dict[str, float]]:
+        """Seconds and count of every stage observed by this process, e.g. for a CLI summary."""
+        return {key[0]: {'seconds': seconds, 'count': count}
+                for key, (seconds, count) in self.stage_seconds.totals().items()}
+
+    def cache_lookup(self, cache: str, hits: int, misses: int = 0) -> None:
+        """Count ``hits`` and ``misses`` of one of the generator's caches."""
+        if hits:
+            self.cache.inc(hits, cache=cache, result='hit')
+        if misses:
+            self.cache.inc(misses, cache=cache, result='miss')
+
+    def ai_usage(self, result: str, usage: Any = None) -> None:
+        """Count one AI request and the tokens reported in its ``usage``."""
+        self.ai_requests.inc(result=result)
+        self._add('ai_requests', 1)
+        for kind in ('prompt', 'completion'):
+            tokens = getattr(usage, f'{kind}_tokens', None) or 0
+            if tokens:
+                self.ai_tokens.inc(tokens, kind=kind)
+                self._add('ai_tokens', tokens)
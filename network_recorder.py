@@ -0,0 +1,202 @@
+"""Records a page's network traffic during the crawl so generated specs can run stubbed.
+
+Every request of the crawled page is routed through Playwright, fetched once and
+fulfilled with the fetched response, which is recorded on the way. The recording is
+stored as a HAR log whose bodies live in fixture files, and rendered as a module of
+``cy.intercept`` stubs that serve those fixtures. Livewire updates only happen when a
+test interacts with the page, so none is recorded; the stubs answer them without
+changes instead.
+"""
+
+import hashlib
+import json
+import mimetypes
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+MAX_ENTRIES = 300
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_TOTAL_BYTES = 32 * 1024 * 1024
+# Streaming and media requests cannot be replayed from a single recorded response.
+SKIPPED_RESOURCE_TYPES = {'media', 'websocket', 'eventsource', 'manifest', 'other'}
+FIXTURE_DIR = 'network'
+HAR_ARTIFACT = 'network.har'
+TEXT_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml',
+              'application/xhtml+xml', 'application/ld+json', 'image/svg+xml')
+_REGEX_SPECIAL = re.compile(r'[\\^$.*+?()[\]{}|]')
+
+
+class NetworkRecorder:
+    """Records request/response pairs of one (async API) Playwright page.
+
+    Only the first response per method and URL is kept, which is also the one a
+    ``cy.intercept`` stub for that method and URL can serve. Bodies over the size limits
+    are passed through unrecorded.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_body_bytes: int = MAX_BODY_BYTES,
+                 max_total_bytes: int = MAX_TOTAL_BYTES):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self.max_total_bytes = max_total_bytes
+        self.entries: List[Dict[str, Any]] = []
+        self.total_bytes = 0
+        self._seen = set()
+
+    async def attach(self, page) -> None:
+        await page.route('**/*', self._handle)
+
+    async def _handle(self, route) -> None:
+        request = route.request
+        started = time.time()
+        try:
+            response = await route.fetch()
+        except Exception as e:
+            print(f"Network recording skipped {request.url}: {e}")
+            try:
+                await route.continue_()
+            except Exception:
+                pass
+            return
+        await route.fulfill(response=response)
+        await self._record(request, response, started, (time.time() - started) * 1000)
+
+    async def _record(self, request, response, started: float, elapsed_ms: float) -> None:
+        key = (request.method, request.url)
+        if key in self._seen or request.resource_type in SKIPPED_RESOURCE_TYPES \
+                or len(self.entries) >= self.max_entries:
+            return
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        if len(body) > self.max_body_bytes or self.total_bytes + len(body) > self.max_total_bytes:
+            return
+        self._seen.add(key)
+        self.total_bytes += len(body)
+        headers = response.headers
+        self.entries.append({
+            'method': request.method,
+            'url': request.url,
+            'resource_type': request.resource_type,
+            'post_data': request.post_data,
+            'status': response.status,
+            'status_text': response.status_text,
+            'content_type': headers.get('content-type', ''),
+            'headers': headers,
+            'body': body,
+            'started': started,
+            'time': elapsed_ms
+        })
+
+
+def _is_text(content_type: str) -> bool:
+    return content_type.split(';')[0].strip().lower().startswith(TEXT_TYPES)
+
+
+def fixture_name(entry: Dict[str, Any]) -> Optional[str]:
+    """Fixture file (relative to cypress/fixtures) holding the entry's body, or None if it is empty.
+
+    Names are content hashes, so identical bodies share one file across pages and jobs.
+    """
+    if not entry['body']:
+        return None
+    digest = hashlib.sha1(entry['body']).hexdigest()[:16]
+    mime = entry['content_type'].split(';')[0].strip().lower()
+    if 'json' in mime:
+        try:
+            json.loads(entry['body'])
+            extension = '.json'
+        except ValueError:
+            extension = '.txt'
+    elif _is_text(mime):
+        extension = {'text/html': '.html', 'text/css': '.css', 'image/svg+xml': '.svg'}.get(mime, '.txt')
+        if 'javascript' in mime:
+            extension = '.js'
+    else:
+        extension = mimetypes.guess_extension(mime) or '.bin'
+    return f"{FIXTURE_DIR}/{digest}{extension}"
+
+
+def url_pattern(url: str) -> str:
+    """A JavaScript regular expression source that matches exactly ``url``.
+
+    ``cy.intercept`` matches a URL string as a glob or substring, so a recorded URL with
+    ``*``, ``?``, braces or brackets would stub other requests, or miss its own.
+    """
+    return '^' + _REGEX_SPECIAL.sub(lambda match: '\\' + match.group(), url) + '$'
+
+
+def stub_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Template context for the ``cy.intercept`` stubs of ``entries``.
+
+    Binary bodies are served with the ``null`` fixture encoding so Cypress sends the raw bytes.
+    """
+    stubs = []
+    for entry in entries:
+        name = fixture_name(entry)
+        if name and not _is_text(entry['content_type']):
+            name += ',null'
+        stubs.append({
+            'method': entry['method'],
+            'url': entry['url'],
+            'url_pattern': url_pattern(entry['url']),
+            'status': entry['status'],
+            'content_type': entry['content_type'],
+            'fixture': name
+        })
+    return stubs
+
+
+def to_har(entries: List[Dict[str, Any]], page_url: str) -> Dict[str, Any]:
+    """HAR 1.2 log of ``entries``; bodies are referenced by fixture file (``_file``), not inlined."""
+    har_entries = []
+    for entry in entries:
+        content = {'size': len(entry['body']), 'mimeType': entry['content_type']}
+        name = fixture_name(entry)
+        if name:
+            content['_file'] = name
+        request = {
+            'method': entry['method'],
+            'url': entry['url'],
+            'httpVersion': 'HTTP/1.1',
+            'headers': [],
+            'queryString': [],
+            'cookies': [],
+            'headersSize': -1,
+            'bodySize': len(entry['post_data'] or '')
+        }
+        if entry['post_data']:
+            request['postData'] = {'mimeType': '', 'text': entry['post_data']}
+        har_entries.append({
+            'pageref': 'page_1',
+            'startedDateTime': datetime.fromtimestamp(entry['started'], timezone.utc).isoformat(),
+            'time': round(entry['time'], 3),
+            '_resourceType': entry['resource_type'],
+            'request': request,
+            'response': {
+                'status': entry['status'],
+                'statusText': entry['status_text'],
+                'httpVersion': 'HTTP/1.1',
+                'headers': [{'name': k, 'value': v} for k, v in entry['headers'].items()],
+                'cookies': [],
+                'content': content,
+                'redirectURL': '',
+                'headersSize': -1,
+                'bodySize': len(entry['body'])
+            },
+            'cache': {},
+            'timings': {'send': 0, 'wait': round(entry['time'], 3), 'receive': 0}
+        })
+    return {
+        'log': {
+            'version': '1.2',
+            'creator': {'name': 'cypress-generator', 'version': '1.0'},
+            'pages': [{'id': 'page_1', 'title': urlparse(page_url).netloc, 'startedDateTime':
+                       har_entries[0]['startedDateTime'] if har_entries else '', 'pageTimings': {}}],
+            'entries': har_entries
+        }
+    }
@@ -0,0 +1,79 @@
+"""Cheap fingerprint of a page's interactive structure.
+
+The fingerprint is computed in the browser right after navigation, before any HTML is
+parsed or sent to the LLM, so an unchanged page can be answered from stored artifacts.
+``fingerprint_soup`` computes the same value from already-parsed HTML.
+"""
+
+import hashlib
+import json
+import re
+from typing import Any, Iterable, List
+
+INTERACTIVE_SELECTOR = ', '.join([
+    'input', 'button', 'a', 'form', 'select', 'textarea', 'option', 'label',
+    '[role]', '[data-testid]', '[data-cy]', '[data-test]', '[data-automation-id]',
+    '[aria-label]', '[wire\\:model]'
+])
+STABLE_ATTRIBUTES = [
+    'id', 'name', 'type', 'role', 'href', 'action', 'method', 'placeholder', 'aria-label',
+    'data-testid', 'data-cy', 'data-test', 'data-automation-id', 'wire:model', 'required', 'for'
+]
+TEXT_LIMIT = 50
+
+# Returns [tag, [[attr, value], ...], text] per interactive element in document order.
+FINGERPRINT_SCRIPT = """
+([selector, attributes, textLimit]) => {
+    const items = [document.title];
+    for (const el of document.querySelectorAll(selector)) {
+        const attrs = [];
+        for (const name of attributes) {
+            if (el.hasAttribute(name)) attrs.push([name, el.getAttribute(name)]);
+        }
+        if (el.hasAttribute('value') && (el.getAttribute('type') || '').toLowerCase() !== 'hidden') {
+            attrs.push(['value', el.getAttribute('value')]);
+        }
+        const text = ['INPUT', 'TEXTAREA', 'SELECT'].includes(el.tagName)
+            ? '' : (el.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, textLimit);
+        items.push([el.tagName.toLowerCase(), attrs, text]);
+    }
+    return items;
+}
+"""
+
+
+def fingerprint_items(items: Iterable[Any]) -> str:
+    """Hash the canonical item list produced by ``FINGERPRINT_SCRIPT`` or ``soup_items``."""
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(json.dumps(item, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()
+
+
+async def fingerprint_page(page) -> str:
+    """Fingerprint a loaded (async API) Playwright page."""
+    items = await page.evaluate(FINGERPRINT_SCRIPT, [INTERACTIVE_SELECTOR, STABLE_ATTRIBUTES, TEXT_LIMIT])
+    return fingerprint_items(items)
+
+
+def soup_items(soup) -> List[Any]:
+    """The same item list as ``FINGERPRINT_SCRIPT``, computed from a BeautifulSoup document."""
+    items: List[Any] = [soup.title.get_text() if soup.title else '']
+    for element in soup.select(INTERACTIVE_SELECTOR):
+        attrs = []
+        for name in STABLE_ATTRIBUTES:
+            if element.has_attr(name):
+                value = element[name]
+                attrs.append([name, ' '.join(value) if isinstance(value, list) else value])
+        if element.has_attr('value') and str(element.get('type', '')).lower() != 'hidden':
+            attrs.append(['value', element['value']])
+        text = ''
+        if element.name not in ('input', 'textarea', 'select'):
+            text = re.sub(r'\s+', ' ', element.get_text()).strip()[:TEXT_LIMIT]
+        items.append([element.name, attrs, text])
+    return items
+
+
+def fingerprint_soup(soup) -> str:
+    return fingerprint_items(soup_items(soup))
@@ -0,0 +1,113 @@
+"""Sampling profiler for single generation requests.
+
+While a profiled request runs, a background thread samples the Python stacks of the
+request thread and the browser pool's event loop thread every few milliseconds, so the
+profile covers parsing and fingerprinting on the pool as well as AI calls, selector
+resolution and rendering on the request thread, and includes time spent waiting on I/O.
+Results are flamegraph-compatible collapsed stacks (``flamegraph.pl``, speedscope) and
+a summary of the functions with the most samples.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.005
+TOP_FUNCTIONS = 30
+# Deep recursion (e.g. BeautifulSoup descendants) is cut off rather than sampled in full.
+MAX_DEPTH = 200
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+    return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _stack(frame) -> Tuple[str, ...]:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return tuple(labels)
+
+
+class SamplingProfiler:
+    """Samples the stacks of ``threads`` (``{label: thread ident}``) every ``interval`` seconds.
+
+    Samples of the browser pool thread can include other crawls running at the same time.
+    """
+
+    def __init__(self, threads: Dict[str, Optional[int]], interval: float = DEFAULT_INTERVAL):
+        self.threads = {label: ident for label, ident in threads.items() if ident is not None}
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'SamplingProfiler':
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'SamplingProfiler':
+        """Stop sampling; safe to call more than once."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            frames = sys._current_frames()
+            for label, ident in self.threads.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples[(label,) + _stack(frame)] += 1
+            self.sample_count += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        """One ``root;caller;callee count`` line per distinct stack."""
+        return ''.join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def summary(self, limit: int = TOP_FUNCTIONS) -> Dict[str, Any]:
+        """Functions by own (innermost frame) and total (anywhere on the stack) samples.
+
+        Times are estimated from the measured sampling period, which can be longer than
+        ``interval`` when the interpreter is busy.
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.samples.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        period_ms = self.duration * 1000 / self.sample_count if self.sample_count else 0
+        sampled = sum(self.samples.values()) or 1
+        return {
+            'duration_ms': round(self.duration * 1000, 1),
+            'samples': self.sample_count,
+            'period_ms': round(period_ms, 2),
+            'threads': sorted(self.threads),
+            'top_functions': [
+                {
+                    'function': label,
+                    'own_samples': own[label],
+                    'total_samples': count,
+                    'own_ms': round(own[label] * period_ms, 1),
+                    'total_ms': round(count * period_ms, 1),
+                    'own_percent': round(100 * own[label] / sampled, 1)
+                } for label, count in sorted(total.items(), key=lambda item: (-own[item[0]], -item[1]))[:limit]
+            ]
+        }
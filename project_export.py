@@ -0,0 +1,193 @@
+"""Exports stored generation jobs as a ready-to-run Cypress project, streamed as a ZIP or written to a directory."""
+
+import io
+import json
+import os
+import shutil
+import zipfile
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from html_snapshots import SYNTHETIC_DOMAIN
+
+CHUNK_SIZE = 64 * 1024
+PROJECT_ROOT = 'cypress-project'
+
+# Where each artifact kind lives inside the project. Page objects sit next to the specs
+# because specs load them with require('./<Name>Page').
+KIND_DIRS = {
+    'spec': 'cypress/e2e',
+    'page_object': 'cypress/e2e',
+    'fixture': 'cypress/fixtures',
+    'component': 'cypress/support/components',
+    'stubs': 'cypress/e2e',
+}
+# Kinds shared by all jobs of a project rather than placed in per-job folders.
+SHARED_KINDS = {'fixture', 'component'}
+# How page objects require shared components. Jobs with components are always exported
+# into their own folder (cypress/e2e/<job_id>), so this path is the same for every job.
+COMPONENT_REQUIRE_PREFIX = '../../support/components/'
+
+# A project entry is an archive name plus either a blob path on disk or in-memory bytes.
+Entry = Tuple[str, Union[str, bytes]]
+
+
+def generate_cypress_config(base_url: Optional[str]) -> str:
+    """Generate cypress.config.js for the exported project."""
+    base_url_line = f"\n    baseUrl: {json.dumps(base_url)}," if base_url else ''
+    return f"""const {{ defineConfig }} = require('cypress');
+
+module.exports = defineConfig({{
+  e2e: {{{base_url_line}
+    specPattern: 'cypress/e2e/**/cypress_test_*.js',
+    supportFile: false,
+    defaultCommandTimeout: 10000,
+    pageLoadTimeout: 30000,
+  }},
+}});
+"""
+
+
+def project_base_url(jobs: List[Dict[str, Any]]) -> Optional[str]:
+    """The origin all ``jobs`` share, if it is one Cypress can use as ``baseUrl``.
+
+    Saved pages have ``file:`` URLs or synthetic ones on a domain that never resolves;
+    Cypress rejects the first and fails to reach the second, so neither is used.
+    """
+    origins = {urlparse(job['url'])[:2] for job in jobs}
+    if len(origins) != 1:
+        return None
+    scheme, netloc = origins.pop()
+    if scheme not in ('http', 'https') or netloc.endswith('.' + SYNTHETIC_DOMAIN):
+        return None
+    return f"{scheme}://{netloc}"
+
+
+def generate_package_json() -> str:
+    return json.dumps({
+        'name': 'generated-cypress-tests',
+        'private': True,
+        'scripts': {
+            'cy:open': 'cypress open',
+            'cy:run': 'cypress run'
+        },
+        'devDependencies': {
+            'cypress': '^13.0.0'
+        }
+    }, indent=2) + '\n'
+
+
+def project_layout(jobs: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], Dict[str, Any]]]:
+    """Place the artifacts of ``jobs`` (as returned by ``ArtifactStore.get_job``) in the project.
+
+    Returns ``(path, job, artifact)`` triples with paths relative to the project root.
+    A single job is exported flat; several jobs, or a job whose page object composes
+    shared components, each get their own spec folder so that same-named specs and page
+    objects from different pages do not collide. Fixtures and components are shared,
+    keeping the first copy of each name.
+    """
+    layout = []
+    seen = set()
+    for job in jobs:
+        nested = len(jobs) > 1 or any(a['kind'] == 'component' for a in job['artifacts'])
+        for artifact in job['artifacts']:
+            directory = KIND_DIRS.get(artifact['kind'])
+            if directory is None:
+                continue
+            if nested and artifact['kind'] not in SHARED_KINDS:
+                directory = f"{directory}/{job['job_id']}"
+            path = f"{directory}/{artifact['name']}"
+            if path in seen:
+                continue
+            seen.add(path)
+            layout.append((path, job, artifact))
+    return layout
+
+
+def project_entries(store, jobs: List[Dict[str, Any]], extra: Optional[Dict[str, str]] = None) -> List[Entry]:
+    """Project files for ``jobs`` laid out by ``project_layout``, plus config and ``extra`` files.
+
+    ``extra`` maps paths relative to the project root to generated text content.
+    """
+    entries: List[Entry] = [
+        (f"{PROJECT_ROOT}/{path}", store.blob_path(artifact['digest'])) for path, _, artifact in project_layout(jobs)
+    ]
+    config = generate_cypress_config(project_base_url(jobs))
+    entries.append((f'{PROJECT_ROOT}/cypress.config.js', config.encode('utf-8')))
+    entries.append((f'{PROJECT_ROOT}/package.json', generate_package_json().encode('utf-8')))
+    for path, content in (extra or {}).items():
+        entries.append((f'{PROJECT_ROOT}/{path}', content.encode('utf-8')))
+    return entries
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """Write-only, non-seekable sink that hands written bytes back to the caller."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.pending = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        self.pending += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self.pending = 0
+        return data
+
+
+def stream_zip(entries: Iterable[Entry], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a ZIP archive of ``entries`` piece by piece.
+
+    Files are read ``chunk_size`` bytes at a time and the archive is never assembled in
+    memory: because the sink is not seekable, zipfile writes data descriptors after each
+    member instead of seeking back to patch local headers.
+    """
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for arcname, source in entries:
+            info = zipfile.ZipInfo(arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, mode='w', force_zip64=True) as member:
+                if isinstance(source, bytes):
+                    member.write(source)
+                else:
+                    with open(source, 'rb') as f:
+                        for block in iter(lambda: f.read(chunk_size), b''):
+                            member.write(block)
+                            if sink.pending >= chunk_size:
+                                yield sink.drain()
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def write_tree(entries: Iterable[Entry], directory: str) -> List[str]:
+    """Write ``entries`` as files under ``directory`` (in place of ``PROJECT_ROOT``); returns their paths."""
+    paths = []
+    for name, source in entries:
+        relative = name[len(PROJECT_ROOT) + 1:] if name.startswith(PROJECT_ROOT + '/') else name
+        path = os.path.join(directory, *relative.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(source, bytes):
+            with open(path, 'wb') as f:
+                f.write(source)
+        else:
+            shutil.copyfile(source, path)
+        paths.append(path)
+    return paths
@@ -0,0 +1,115 @@
+"""Production server: pre-forked gunicorn workers, each with its own warm browser.
+
+The app is not preloaded, so every worker imports it after the fork and owns its
+browser pool, ESLint worker and OpenAI client. A worker launches its browser before it
+accepts requests, so ``/health/ready`` only answers from warm workers. After
+``max_jobs`` generations (plus jitter, so workers do not restart together) a worker
+finishes its in-flight requests and is replaced, which bounds memory growth. On
+shutdown each worker closes its browser and ESLint worker.
+"""
+
+import os
+import random
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from gunicorn.app.base import BaseApplication
+
+DEFAULT_BIND = '0.0.0.0:5000'
+DEFAULT_WORKERS = 2
+DEFAULT_THREADS = 4
+# Generations with AI enrichment of every element can take minutes
+DEFAULT_TIMEOUT = 300
+GRACEFUL_TIMEOUT = 60
+DEFAULT_MAX_JOBS = 200
+BROWSER_WARM_TIMEOUT = 60
+
+
+class JobCounter:
+    """WSGI middleware that calls ``on_limit()`` once ``limit`` generations have succeeded."""
+
+    def __init__(self, wsgi_app, limit: int, on_limit: Callable[[], None]):
+        self.wsgi_app = wsgi_app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != '/api/generate' or environ.get('REQUEST_METHOD') != 'POST':
+            return self.wsgi_app(environ, start_response)
+
+        def counting_start_response(status, headers, exc_info=None):
+            if status.startswith('200'):
+                with self._lock:
+                    self.count += 1
+                    reached = self.count == self.limit
+                if reached:
+                    self.on_limit()
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, counting_start_response)
+
+
+class ProductionServer(BaseApplication):
+    """gunicorn application for ``app``; ``options`` are gunicorn settings."""
+
+    def __init__(self, options: Dict[str, Any], max_jobs: int = DEFAULT_MAX_JOBS, max_jobs_jitter: int = 0):
+        self.options = options
+        self.max_jobs = max_jobs
+        self.max_jobs_jitter = max_jobs_jitter
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+        self.cfg.set('preload_app', False)
+        self.cfg.set('post_worker_init', self.post_worker_init)
+        self.cfg.set('worker_exit', self.worker_exit)
+
+    def load(self):
+        from app import app
+        return app
+
+    def post_worker_init(self, worker) -> None:
+        """Warm the worker's browser and LLM client and arm job-count recycling."""
+        from app import app, browser_pool, openai_client
+        try:
+            browser_pool.warm(BROWSER_WARM_TIMEOUT)
+            worker.log.info(f"Worker {os.getpid()}: browser ready")
+        except Exception as e:
+            # Still serve; /health/ready reports the worker as not ready
+            worker.log.error(f"Worker {os.getpid()}: browser failed to launch: {e}")
+        if app.config['OPENAI_API_KEY']:
+            openai_client()
+        if self.max_jobs:
+            limit = self.max_jobs + random.randint(0, self.max_jobs_jitter)
+
+            def recycle() -> None:
+                worker.log.info(f"Worker {os.getpid()}: {limit} jobs done, restarting")
+                worker.alive = False
+
+            app.wsgi_app = JobCounter(app.wsgi_app, limit, recycle)
+
+    @staticmethod
+    def worker_exit(server, worker) -> None:
+        from app import browser_pool, eslint_worker
+        browser_pool.close()
+        eslint_worker.close()
+
+
+def serve(bind: str = DEFAULT_BIND, workers: int = DEFAULT_WORKERS, threads: int = DEFAULT_THREADS,
+          timeout: int = DEFAULT_TIMEOUT, max_jobs: int = DEFAULT_MAX_JOBS, max_jobs_jitter: Optional[int] = None,
+          access_log: Optional[str] = '-') -> None:
+    """Run the production server until it is stopped (SIGTERM/SIGINT shut down gracefully)."""
+    options = {
+        'bind': bind,
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'timeout': timeout,
+        'graceful_timeout': GRACEFUL_TIMEOUT,
+        'accesslog': access_log,
+    }
+    jitter = max_jobs // 10 if max_jobs_jitter is None else max_jobs_jitter
+    ProductionServer(options, max_jobs, jitter).run()
@@ -1,9 +1,19 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="cypress-generator",
     version="0.1.0",
-    packages=find_packages(),
+    # The project is flat modules; the templates are looked up next to them, so they
+    # are installed alongside as package data
+    py_modules=[
+        "app", "artifact_store", "auth_session", "browser_pool", "cli", "components",
+        "crawl_policy", "daemon", "dom_snapshot", "eslint_worker", "frontier",
+        "html_snapshots", "js_postprocess", "metrics", "network_recorder",
+        "page_fingerprint", "profiler", "project_export", "server", "sharding",
+        "spec_templates", "verify_runner", "viewports",
+    ],
+    packages=["template"],
+    package_data={"template": ["*.html", "cypress/*.j2", "cypress/tests/*.j2"]},
     install_requires=[
         "flask",
         "flask-cors",
@@ -11,8 +21,10 @@ setup(
         "beautifulsoup4",
         "playwright",
         "werkzeug",
+        "jinja2",
         "openai",
-        "python-dotenv"
+        "python-dotenv",
+        "gunicorn"
     ],
     entry_points={
         "console_scripts": [
@@ -20,8 +32,3 @@ setup(
         ],
     },
 )
- 
-
-
-
- 
\ No newline at end of file
@@ -0,0 +1,449 @@
+"""Runtime estimates for generated specs and a balanced sharding manifest.
+
+Each ``it`` block is reduced to a feature vector (visits, commands, typed characters,
+typing delay, waits, sessions, ...) by a token-level scan of the spec, with calls to
+page object methods expanded from the page object source and ``before``/``beforeEach``
+hooks charged to the tests they run for. A linear ``TimingModel`` turns features into
+milliseconds; its coefficients can be refit from Cypress JUnit or mochawesome reports.
+Specs are then packed into shards with the longest-processing-time-first heuristic.
+"""
+
+import heapq
+import json
+import os
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional, Tuple
+
+from js_postprocess import tokenize
+
+FEATURES = ['tests', 'visits', 'commands', 'typed_chars', 'typed_delay_ms', 'alias_waits',
+            'fixed_wait_ms', 'sessions', 'intercepts']
+# Milliseconds per unit of each feature, before any timing report has been seen.
+DEFAULT_COEFFICIENTS = {
+    'tests': 200.0,
+    'visits': 1800.0,
+    'commands': 60.0,
+    'typed_chars': 15.0,
+    'typed_delay_ms': 1.0,
+    'alias_waits': 600.0,
+    'fixed_wait_ms': 1.0,
+    'sessions': 1500.0,
+    'intercepts': 5.0,
+}
+# Browser launch, bundling and reporting per spec file; not observable per test.
+SPEC_OVERHEAD_MS = 3000.0
+CYPRESS_TYPE_DELAY = 10
+# Characters assumed when the typed value is not a literal (e.g. fixture data).
+DEFAULT_TYPED_CHARS = 16
+BLOCKS = {'describe', 'context', 'it', 'specify', 'before', 'beforeEach', 'after', 'afterEach'}
+TEST_BLOCKS = {'it', 'specify'}
+MANIFEST_ARTIFACT = 'shards.json'
+
+Features = Dict[str, float]
+
+
+def _empty() -> Features:
+    return dict.fromkeys(FEATURES, 0.0)
+
+
+def _add(target: Features, other: Features) -> None:
+    for key, value in other.items():
+        target[key] += value
+
+
+def _unquote(token: Tuple[str, str]) -> str:
+    kind, text = token
+    if kind == 'string' or kind == 'template':
+        return text[1:-1].replace("\\'", "'").replace('\\"', '"').replace('\\\\', '\\')
+    return text
+
+
+def _significant(source: str) -> List[Tuple[str, str]]:
+    return [t for t in tokenize(source) if t[0] not in ('ws', 'nl', 'comment')]
+
+
+def _matching(tokens: List[Tuple[str, str]], start: int) -> int:
+    """Index of the token closing the bracket opened at ``start``."""
+    depth = 0
+    for index in range(start, len(tokens)):
+        text = tokens[index][1]
+        if tokens[index][0] == 'punct' and text in '([{':
+            depth += 1
+        elif tokens[index][0] == 'punct' and text in ')]}':
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _call_features(tokens: List[Tuple[str, str]], index: int,
+                   receivers: Tuple[str, ...]) -> Tuple[Features, Optional[str]]:
+    """Features of the call ``<receiver>.<name>(...)`` whose name is at ``index``.
+
+    Returns the features and, for calls on one of ``receivers`` (``page`` in specs,
+    ``this`` in page objects), the method name to expand instead.
+    """
+    features = _empty()
+    name = tokens[index][1]
+    receiver = tokens[index - 2][1] if index >= 2 else None
+    if receiver in receivers:
+        return features, name
+    end = _matching(tokens, index + 1)
+    args = tokens[index + 2:end]
+    if name == 'visit':
+        features['visits'] += 1
+    elif name == 'type':
+        chars = len(_unquote(args[0])) if args and args[0][0] in ('string', 'template') else DEFAULT_TYPED_CHARS
+        delay = CYPRESS_TYPE_DELAY
+        for position, token in enumerate(args[:-2]):
+            if token == ('ident', 'delay') and args[position + 1][1] == ':' and args[position + 2][0] == 'number':
+                delay = float(args[position + 2][1])
+        features['typed_chars'] += chars
+        features['typed_delay_ms'] += chars * delay
+    elif name == 'wait':
+        if args and args[0][0] == 'string' and _unquote(args[0]).startswith('@'):
+            features['alias_waits'] += 1
+        elif args and args[0][0] == 'number':
+            features['fixed_wait_ms'] += float(args[0][1])
+    elif name == 'session':
+        features['sessions'] += 1
+    elif name == 'intercept':
+        features['intercepts'] += 1
+    else:
+        features['commands'] += 1
+    return features, None
+
+
+def _scan(tokens: List[Tuple[str, str]], start: int, end: int, receivers: Tuple[str, ...]) -> Tuple[Features, List[str]]:
+    """Features of the calls between ``start`` and ``end`` plus the receiver methods they call."""
+    features = _empty()
+    expanded = []
+    for index in range(start, end):
+        if tokens[index][0] == 'ident' and index > 0 and tokens[index - 1][1] in ('.', '?.') \
+                and index + 1 < end and tokens[index + 1][1] == '(':
+            call, method = _call_features(tokens, index, receivers)
+            _add(features, call)
+            if method:
+                expanded.append(method)
+    return features, expanded
+
+
+def page_object_methods(source: str) -> Dict[str, Features]:
+    """Features of each method of a generated page object, with ``this.<method>()`` calls expanded."""
+    tokens = _significant(source)
+    raw: Dict[str, Tuple[Features, List[str]]] = {}
+    try:
+        body_start = next(i for i, t in enumerate(tokens) if t == ('ident', 'class'))
+        body_start = next(i for i in range(body_start, len(tokens)) if tokens[i][1] == '{')
+    except StopIteration:
+        return {}
+    body_end = _matching(tokens, body_start)
+    index = body_start + 1
+    while index < body_end:
+        if tokens[index][0] == 'ident' and index + 1 < body_end and tokens[index + 1][1] == '(':
+            params_end = _matching(tokens, index + 1)
+            if tokens[params_end + 1][1] == '{':
+                method_end = _matching(tokens, params_end + 1)
+                raw[tokens[index][1]] = _scan(tokens, params_end + 1, method_end, ('this',))
+                index = method_end + 1
+                continue
+        index += 1
+
+    resolved: Dict[str, Features] = {}
+
+    def resolve(name: str, stack: Tuple[str, ...] = ()) -> Features:
+        if name in resolved:
+            return resolved[name]
+        features, calls = raw.get(name, (_empty(), []))
+        total = dict(features)
+        for call in calls:
+            if call in raw and call not in stack and call != name:
+                _add(total, resolve(call, stack + (name,)))
+            else:
+                total['commands'] += 1
+        resolved[name] = total
+        return total
+
+    for name in raw:
+        resolve(name)
+    return resolved
+
+
+def spec_tests(source: str, page_methods: Optional[Dict[str, Features]] = None) -> List[Dict[str, Any]]:
+    """Tests of a spec with their full titles and features, hooks included.
+
+    ``beforeEach`` hooks are charged to every test below them and ``before`` hooks to the
+    first test that runs after them, which is where Cypress reports their time.
+    """
+    page_methods = page_methods or {}
+    tokens = _significant(source)
+    tests: List[Dict[str, Any]] = []
+    pending = _empty()
+
+    def walk(start: int, end: int, titles: List[str], each: Features) -> None:
+        each = dict(each)
+        blocks = []
+        index = start
+        while index < end:
+            token = tokens[index]
+            if token[0] == 'ident' and token[1] in BLOCKS and index + 1 < end and tokens[index + 1][1] == '(' \
+                    and (index == 0 or tokens[index - 1][1] not in ('.', '?.')):
+                close = _matching(tokens, index + 1)
+                title = _unquote(tokens[index + 2]) if index + 2 < len(tokens) and tokens[index + 2][0] in ('string', 'template') else ''
+                blocks.append((token[1], title, index + 2, close))
+                index = close + 1
+                continue
+            index += 1
+
+        for kind, _, body_start, body_end in blocks:
+            if kind in ('before', 'beforeEach'):
+                features = _block_features(body_start, body_end)
+                _add(pending if kind == 'before' else each, features)
+
+        for kind, title, body_start, body_end in blocks:
+            if kind in ('describe', 'context'):
+                walk(body_start, body_end, titles + [title], each)
+            elif kind in TEST_BLOCKS:
+                features = _block_features(body_start, body_end)
+                features['tests'] += 1
+                _add(features, each)
+                _add(features, pending)
+                pending.update(_empty())
+                tests.append({'title': title, 'full_title': ' '.join(titles + [title]), 'features': features})
+
+    def _block_features(start: int, end: int) -> Features:
+        features, methods = _scan(tokens, start, end, ('page',))
+        for method in methods:
+            if method in page_methods:
+                _add(features, page_methods[method])
+            else:
+                features['commands'] += 1
+        return features
+
+    walk(0, len(tokens), [], _empty())
+    return tests
+
+
+class TimingModel:
+    """Linear runtime model (milliseconds per feature unit) persisted as JSON.
+
+    ``refine`` refits the coefficients to observed test durations with ridge regression
+    toward the current coefficients, so a small report nudges the model rather than
+    replacing it, and coefficients never go negative.
+    """
+
+    def __init__(self, path: Optional[str] = None, regularization: float = 5.0):
+        self.path = path
+        self.regularization = regularization
+        self.coefficients = dict(DEFAULT_COEFFICIENTS)
+        self.samples = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.coefficients.update(data.get('coefficients', {}))
+            self.samples = data.get('samples', 0)
+
+    def estimate(self, features: Features) -> float:
+        return sum(self.coefficients[key] * features.get(key, 0.0) for key in FEATURES)
+
+    def refine(self, observations: List[Tuple[Features, float]]) -> int:
+        """Fit to ``(features, duration_ms)`` pairs and save; returns the number of observations used."""
+        if not observations:
+            return 0
+        with self._lock:
+            # Columns are scaled to unit magnitude so one regularization weight suits
+            # features measured in counts and in milliseconds alike.
+            scale = [max(max(abs(f.get(key, 0.0)) for f, _ in observations), 1.0) for key in FEATURES]
+            size = len(FEATURES)
+            lam = self.regularization * len(observations) ** 0.5
+            prior = [self.coefficients[key] * scale[i] for i, key in enumerate(FEATURES)]
+            matrix = [[lam if i == j else 0.0 for j in range(size)] for i in range(size)]
+            vector = [lam * prior[i] for i in range(size)]
+            for features, duration in observations:
+                row = [features.get(key, 0.0) / scale[i] for i, key in enumerate(FEATURES)]
+                for i in range(size):
+                    if row[i]:
+                        vector[i] += row[i] * duration
+                        for j in range(size):
+                            matrix[i][j] += row[i] * row[j]
+            solution = _solve(matrix, vector)
+            for i, key in enumerate(FEATURES):
+                self.coefficients[key] = round(max(solution[i] / scale[i], 0.0), 4)
+            self.samples += len(observations)
+            self._save()
+        return len(observations)
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.timing-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'coefficients': self.coefficients, 'samples': self.samples}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'coefficients': dict(self.coefficients), 'samples': self.samples,
+                'spec_overhead_ms': SPEC_OVERHEAD_MS}
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Solve a small symmetric positive definite system by Gaussian elimination."""
+    size = len(vector)
+    a = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(a[r][col]))
+        a[col], a[pivot] = a[pivot], a[col]
+        if abs(a[col][col]) < 1e-12:
+            continue
+        for row in range(col + 1, size):
+            factor = a[row][col] / a[col][col]
+            for k in range(col, size + 1):
+                a[row][k] -= factor * a[col][k]
+    solution = [0.0] * size
+    for row in range(size - 1, -1, -1):
+        if abs(a[row][row]) < 1e-12:
+            continue
+        solution[row] = (a[row][size] - sum(a[row][k] * solution[k] for k in range(row + 1, size))) / a[row][row]
+    return solution
+
+
+def parse_timing_report(content: str) -> List[Dict[str, Any]]:
+    """Test durations from a Cypress JUnit XML or mochawesome JSON report.
+
+    Returns ``{'file', 'title', 'full_title', 'duration_ms', 'passed', 'message'}`` dicts;
+    ``file`` is None when the report does not name the spec and ``message`` is the error
+    of a failed test.
+    """
+    content = content.strip()
+    results = []
+    if content.startswith('<'):
+        root = ET.fromstring(content)
+        spec_file = None
+        for suite in root.iter('testsuite'):
+            spec_file = suite.get('file') or spec_file
+            for case in suite.findall('testcase'):
+                failure = case.find('failure')
+                if failure is None:
+                    failure = case.find('error')
+                if case.find('skipped') is not None:
+                    continue
+                results.append({
+                    'file': spec_file,
+                    'title': case.get('classname') or case.get('name', ''),
+                    'full_title': case.get('name', ''),
+                    'duration_ms': float(case.get('time') or 0) * 1000,
+                    'passed': failure is None,
+                    'message': None if failure is None else (failure.get('message') or failure.text or '').strip()
+                })
+        return results
+
+    report = json.loads(content)
+
+    def walk(suite: Dict[str, Any], spec_file: Optional[str]) -> None:
+        spec_file = suite.get('file') or suite.get('fullFile') or spec_file
+        for test in suite.get('tests', []):
+            if test.get('pending') or test.get('skipped'):
+                continue
+            passed = test.get('state') == 'passed' or bool(test.get('pass'))
+            results.append({
+                'file': spec_file,
+                'title': test.get('title', ''),
+                'full_title': test.get('fullTitle', ''),
+                'duration_ms': float(test.get('duration') or 0),
+                'passed': passed,
+                'message': None if passed else (test.get('err') or {}).get('message', '')
+            })
+        for child in suite.get('suites', []):
+            walk(child, spec_file)
+
+    for result in report.get('results', []):
+        walk(result, result.get('file') or result.get('fullFile'))
+    return results
+
+
+def match_observations(specs: List[Dict[str, Any]], report: List[Dict[str, Any]]) -> List[Tuple[Features, float]]:
+    """Pair reported durations with the features of the matching generated tests.
+
+    Tests are matched by spec path and full title, falling back to the full title alone
+    when the report does not name spec files. Failed tests are ignored.
+    """
+    by_path: Dict[Tuple[str, str], Features] = {}
+    by_title: Dict[str, List[Features]] = {}
+    for spec in specs:
+        for test in spec['tests']:
+            by_path[(spec['path'], test['full_title'])] = test['features']
+            by_title.setdefault(test['full_title'], []).append(test['features'])
+    observations = []
+    for result in report:
+        if not result['passed']:
+            continue
+        features = None
+        if result['file']:
+            path = result['file'].replace('\\', '/')
+            features = next((f for (p, title), f in by_path.items()
+                             if title == result['full_title'] and (path.endswith(p) or p.endswith(path))), None)
+        if features is None and len(by_title.get(result['full_title'], [])) == 1:
+            features = by_title[result['full_title']][0]
+        if features is not None:
+            observations.append((features, result['duration_ms']))
+    return observations
+
+
+def analyze_specs(files: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Tests and features of each spec.
+
+    ``files`` are ``{'path', 'source', 'page_object'}`` dicts; ``page_object`` is the source
+    of the page object the spec requires, used to expand ``page.<method>()`` calls.
+    """
+    return [
+        {'path': f['path'], 'tests': spec_tests(f['source'], page_object_methods(f.get('page_object') or ''))}
+        for f in files
+    ]
+
+
+def build_manifest(specs: List[Dict[str, Any]], shards: int, model: TimingModel,
+                   quarantined: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Pack specs into ``shards`` balanced shards, longest estimated spec first.
+
+    Specs whose path is in ``quarantined`` (they failed verification) are left out of the
+    shards and listed separately, so CI can run them without blocking on them.
+    """
+    held_back = sorted(spec['path'] for spec in specs if spec['path'] in set(quarantined or []))
+    specs = [spec for spec in specs if spec['path'] not in held_back]
+    shards = max(1, min(shards, len(specs) or 1))
+    estimates = []
+    for spec in specs:
+        tests = {t['full_title']: round(model.estimate(t['features'])) for t in spec['tests']}
+        estimates.append((SPEC_OVERHEAD_MS + sum(tests.values()), spec['path'], tests))
+    estimates.sort(key=lambda item: (-item[0], item[1]))
+
+    heap = [(0.0, index) for index in range(shards)]
+    assigned: List[List[str]] = [[] for _ in range(shards)]
+    loads = [0.0] * shards
+    for estimate, path, _ in estimates:
+        load, index = heapq.heappop(heap)
+        assigned[index].append(path)
+        loads[index] = load + estimate
+        heapq.heappush(heap, (loads[index], index))
+
+    total = sum(item[0] for item in estimates)
+    return {
+        'version': 1,
+        'shard_count': shards,
+        'estimated_total_ms': round(total),
+        'estimated_wall_clock_ms': round(max(loads) if loads else 0),
+        'ideal_wall_clock_ms': round(total / shards),
+        'model': model.to_dict(),
+        'shards': [
+            {'index': index, 'estimated_ms': round(loads[index]), 'specs': sorted(assigned[index]),
+             'spec_arg': ','.join(sorted(assigned[index]))}
+            for index in range(shards)
+        ],
+        'quarantined': held_back,
+        'specs': {path: {'estimated_ms': round(estimate), 'tests': tests} for estimate, path, tests in estimates}
+    }
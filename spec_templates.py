@@ -0,0 +1,207 @@
+"""Precompiled templates for generated Cypress specs and page objects.
+
+Templates live in ``template/cypress`` and are compiled once, when this module is
+imported. All values interpolated into JavaScript go through the ``js`` filter, which is
+the single place JS string escaping happens.
+"""
+
+import hashlib
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template', 'cypress')
+
+# Generation profiles a test type can be rendered with. Fragment templates read the
+# selected one as ``profile``.
+PROFILES = {
+    'standard': 'Fresh visit per test, realistic typing delays, waits on Livewire requests',
+    'fast': 'Shared visits for read-only tests, zero-delay typing or direct value setting, '
+            'cached login sessions and retrying assertions instead of blocking waits',
+}
+DEFAULT_PROFILE = 'standard'
+
+# Test types offered by /api/test_types, each rendered by its own template fragment.
+# ``group`` decides whether the fragment goes in the smoke or the end-to-end describe block;
+# ``inputs`` are the context keys the fragment reads, used to reuse unchanged fragments;
+# ``profiles`` are the profiles the fragment supports.
+TEST_TYPES: List[Dict[str, Any]] = [
+    {'id': 'basic', 'name': 'Basic Page Tests', 'description': 'Tests that the page loads and basic elements are visible',
+     'template': 'tests/basic.js.j2', 'group': 'smoke', 'inputs': ['url'], 'profiles': ['standard', 'fast']},
+    {'id': 'interactive', 'name': 'Interactive Element Tests', 'description': 'Tests for forms, buttons, and inputs',
+     'template': 'tests/interactive.js.j2', 'group': 'e2e', 'inputs': ['form', 'livewire'],
+     'profiles': ['standard', 'fast']},
+    {'id': 'auth', 'name': 'Authentication Tests', 'description': 'Tests for login flows',
+     'template': 'tests/auth.js.j2', 'group': 'e2e', 'inputs': ['login_form'], 'profiles': ['standard', 'fast']},
+    {'id': 'validation', 'name': 'Validation Tests', 'description': 'Tests for form validation',
+     'template': 'tests/validation.js.j2', 'group': 'e2e', 'inputs': ['required_field'], 'profiles': ['standard']},
+    {'id': 'responsive', 'name': 'Responsive Layout Tests',
+     'description': 'cy.viewport tests of element visibility per viewport (needs a viewport matrix)',
+     'template': 'tests/responsive.js.j2', 'group': 'smoke', 'inputs': ['responsive'], 'profiles': ['standard']},
+]
+TEST_TYPE_IDS = [t['id'] for t in TEST_TYPES]
+
+_JS_STRING_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    "'": "\\'",
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+    '\u2028': '\\u2028',
+    '\u2029': '\\u2029',
+})
+_JS_DOUBLE_QUOTED_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+    '\u2028': '\\u2028',
+    '\u2029': '\\u2029',
+})
+_CSS_STRING_ESCAPES = str.maketrans({'\\': '\\\\', "'": "\\'", '\n': '\\a '})
+
+
+def js_string(value: Any) -> str:
+    """Render ``value`` as a JavaScript string literal.
+
+    Single quotes are used unless the value contains a single quote and no double quote,
+    in which case double quotes avoid escaping (matching ESLint's ``quotes: avoidEscape``).
+    """
+    text = str(value)
+    if "'" in text and '"' not in text:
+        return '"' + text.translate(_JS_DOUBLE_QUOTED_ESCAPES) + '"'
+    return "'" + text.translate(_JS_STRING_ESCAPES) + "'"
+
+
+def css_string(value: Any) -> str:
+    """Render ``value`` as a single-quoted CSS string, e.g. for ``[name=...]`` selectors."""
+    return "'" + str(value).translate(_CSS_STRING_ESCAPES) + "'"
+
+
+def js_comment(value: Any) -> str:
+    """Collapse ``value`` onto one line so it is safe inside a ``//`` comment."""
+    return re.sub(r'\s+', ' ', str(value)).strip()
+
+
+def js_identifier(value: Any) -> str:
+    """Turn arbitrary text (e.g. a page title) into a valid JavaScript identifier."""
+    identifier = re.sub(r'[^A-Za-z0-9_$]', '', str(value))
+    if not identifier or identifier[0].isdigit():
+        identifier = f"_{identifier}"
+    return identifier
+
+
+def page_class_name(page_title: str) -> str:
+    """Class (and file) name of the page object generated for ``page_title``."""
+    return f"{js_identifier(page_title.replace(' ', ''))}Page"
+
+
+def _build_environment() -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=True,
+        undefined=StrictUndefined,
+        auto_reload=False,
+        cache_size=-1
+    )
+    env.filters['js'] = js_string
+    env.filters['comment'] = js_comment
+    return env
+
+
+_environment = _build_environment()
+_templates = {
+    name: _environment.get_template(name)
+    for name in ['spec.js.j2', 'page_object.js.j2', 'component.js.j2', 'network_stubs.js.j2'] + [t['template'] for t in TEST_TYPES]
+}
+
+
+def _templates_digest() -> str:
+    digest = hashlib.sha256()
+    for name in sorted(_templates):
+        digest.update(name.encode('utf-8'))
+        digest.update(_environment.loader.get_source(_environment, name)[0].encode('utf-8'))
+    return digest.hexdigest()
+
+
+# Changes whenever a template changes, so output cached under an older version is not reused.
+TEMPLATES_DIGEST = _templates_digest()
+
+
+def render(template_name: str, context: Dict[str, Any], out: Optional[TextIO] = None) -> Optional[str]:
+    """Render a precompiled template.
+
+    With ``out`` the output is streamed into the writer chunk by chunk and None is
+    returned; otherwise the chunks are joined into a string once.
+    """
+    chunks = _templates[template_name].generate(**context)
+    if out is None:
+        return ''.join(chunks)
+    for chunk in chunks:
+        out.write(chunk)
+    return None
+
+
+def render_fragments(context: Dict[str, Any],
+                     previous: Optional[Dict[str, Dict[str, str]]] = None) -> Dict[str, Dict[str, str]]:
+    """Render the fragment of each selected test type, reusing ``previous`` ones whose inputs are unchanged.
+
+    Returns ``{test_type_id: {'digest': ..., 'text': ...}}``; the digest covers exactly the
+    context keys listed in the test type's ``inputs`` plus its profile.
+    """
+    previous = previous or {}
+    fragments = {}
+    for test_type in context['test_types']:
+        profile = test_type.get('profile', DEFAULT_PROFILE)
+        inputs = {key: context[key] for key in test_type['inputs']}
+        inputs['profile'] = profile
+        digest = hashlib.sha1(json.dumps(inputs, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        cached = previous.get(test_type['id'])
+        if cached and cached['digest'] == digest:
+            fragments[test_type['id']] = cached
+        else:
+            text = render(test_type['template'], dict(context, profile=profile))
+            fragments[test_type['id']] = {'digest': digest, 'text': text}
+    return fragments
+
+
+def render_spec(context: Dict[str, Any], previous_fragments: Optional[Dict[str, Dict[str, str]]] = None,
+                out: Optional[TextIO] = None) -> Tuple[Optional[str], Dict[str, Dict[str, str]]]:
+    """Render a full spec by splicing per-test-type fragments into the spec skeleton.
+
+    Returns the spec text (None when streamed into ``out``) and the fragments, which can be
+    passed back as ``previous_fragments`` on the next generation.
+    """
+    fragments = render_fragments(context, previous_fragments)
+    spec_context = dict(context, fragments={key: value['text'] for key, value in fragments.items()})
+    return render('spec.js.j2', spec_context, out), fragments
+
+
+def select_test_types(requested: Optional[List[str]] = None,
+                      profiles: Optional[Dict[str, str]] = None) -> List[Dict[str, Any]]:
+    """Return the test type definitions for ``requested`` ids (all of them by default), in registry order.
+
+    Each definition gets a ``profile`` key: the one named for it in ``profiles``, or the default.
+    """
+    profiles = profiles or {}
+    unknown = (set(requested or []) | set(profiles)) - set(TEST_TYPE_IDS)
+    if unknown:
+        raise ValueError(f"Unknown test types: {', '.join(sorted(unknown))}")
+    selected = [t for t in TEST_TYPES if not requested or t['id'] in requested]
+    for test_type in selected:
+        profile = profiles.get(test_type['id'], DEFAULT_PROFILE)
+        if profile not in test_type['profiles']:
+            raise ValueError(f"Test type '{test_type['id']}' has no '{profile}' profile "
+                             f"(available: {', '.join(test_type['profiles'])})")
+    return [dict(t, profile=profiles.get(t['id'], DEFAULT_PROFILE)) for t in selected]
+
+
+def test_type_keys(selected: List[Dict[str, Any]]) -> List[str]:
+    """``id:profile`` for each selected test type; identifies what a generated spec contains."""
+    return [f"{t['id']}:{t['profile']}" for t in selected]
@@ -0,0 +1,191 @@
+"""Runs generated specs in headless Cypress to verify them before they reach CI.
+
+A project exported from stored jobs is written to a scratch directory inside a
+workspace that has Cypress installed, and each spec is run by its own ``cypress run``
+process with the JUnit reporter, several at a time. Specs of jobs recorded with
+``record_network`` replay the recorded traffic unless the run is live. Selectors that
+failed are kept in a ``SelectorFeedback`` file so the next generation of the page
+picks different ones.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from project_export import PROJECT_ROOT, generate_package_json
+from sharding import parse_timing_report
+
+SPEC_TIMEOUT = 600
+INSTALL_TIMEOUT = 900
+OUTPUT_TAIL = 2000
+# Cypress error messages that name the selector a command could not resolve.
+SELECTOR_PATTERNS = [
+    re.compile(r"Expected to find element: `(.+?)`, but never found it"),
+    re.compile(r"within the selector: '(.+?)' but never did"),
+]
+
+
+def default_concurrency() -> int:
+    """Cypress workers to run at once: one per two CPUs, since each runs Node and a browser."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def failing_selectors(results: List[Dict[str, Any]]) -> Set[str]:
+    """Selectors named in the error messages of failed tests."""
+    selectors = set()
+    for result in results:
+        for pattern in SELECTOR_PATTERNS:
+            selectors.update(pattern.findall(result.get('message') or ''))
+    return selectors
+
+
+class SelectorFeedback:
+    """Selectors that failed verification, per page URL, persisted as JSON.
+
+    ``avoid(url)`` is what selector resolution skips when the page is generated again.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.failures: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.failures = json.load(f)
+
+    def avoid(self, url: str) -> Set[str]:
+        return set(self.failures.get(url, {}))
+
+    def record(self, url: str, selectors: Set[str]) -> None:
+        if not selectors:
+            return
+        with self._lock:
+            counts = self.failures.setdefault(url, {})
+            for selector in selectors:
+                counts[selector] = counts.get(selector, 0) + 1
+            self._save()
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.selectors-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.failures, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class VerificationRunner:
+    """Runs specs with a Cypress installed once into ``workspace``.
+
+    Cypress is installed with npm on first use. ``available()`` is False when Node or
+    npm is missing, so callers can report verification as unavailable.
+    """
+
+    def __init__(self, workspace: str, concurrency: Optional[int] = None,
+                 timeout: float = SPEC_TIMEOUT, browser: str = 'electron'):
+        self.workspace = workspace
+        self.concurrency = concurrency or default_concurrency()
+        self.timeout = timeout
+        self.browser = browser
+        self._install_lock = threading.Lock()
+
+    def available(self) -> bool:
+        return shutil.which('node') is not None and shutil.which('npm') is not None
+
+    @property
+    def cypress_binary(self) -> str:
+        return os.path.join(self.workspace, 'node_modules', '.bin', 'cypress')
+
+    def ensure_cypress(self) -> None:
+        """Install Cypress into the workspace unless it is there; raises RuntimeError on failure."""
+        with self._install_lock:
+            if os.path.exists(self.cypress_binary):
+                return
+            os.makedirs(self.workspace, exist_ok=True)
+            with open(os.path.join(self.workspace, 'package.json'), 'w', encoding='utf-8') as f:
+                f.write(generate_package_json())
+            try:
+                completed = subprocess.run(['npm', 'install', '--no-audit', '--no-fund'], cwd=self.workspace,
+                                           capture_output=True, text=True, timeout=INSTALL_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                raise RuntimeError('Installing Cypress timed out')
+            if completed.returncode != 0 or not os.path.exists(self.cypress_binary):
+                raise RuntimeError(f"Installing Cypress failed: {completed.stderr[-OUTPUT_TAIL:]}")
+
+    def run(self, entries: List[Any], specs: List[str], live: bool = False,
+            concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Write the project ``entries`` (from ``project_entries``) and run each of ``specs``.
+
+        ``specs`` are paths relative to the project root. With ``live`` recorded network
+        stubs are bypassed and specs run against the target site. Returns, per spec,
+        ``{'spec', 'status', 'tests', 'duration_ms', 'error'}`` where status is
+        ``passed``, ``failed`` (a test failed) or ``error`` (Cypress did not report).
+        """
+        self.ensure_cypress()
+        run_dir = os.path.join(self.workspace, 'runs', uuid.uuid4().hex)
+        try:
+            self._write_project(entries, run_dir)
+            workers = max(1, min(concurrency or self.concurrency, len(specs)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(lambda item: self._run_spec(run_dir, item[1], item[0], live),
+                                     enumerate(specs)))
+        finally:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    @staticmethod
+    def _write_project(entries: List[Any], run_dir: str) -> None:
+        prefix = PROJECT_ROOT + '/'
+        for arcname, source in entries:
+            path = os.path.join(run_dir, arcname[len(prefix):] if arcname.startswith(prefix) else arcname)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if isinstance(source, bytes):
+                with open(path, 'wb') as f:
+                    f.write(source)
+            else:
+                shutil.copyfile(source, path)
+
+    def _run_spec(self, run_dir: str, spec: str, index: int, live: bool) -> Dict[str, Any]:
+        report_path = os.path.join(run_dir, 'results', f'spec-{index}.xml')
+        command = [
+            self.cypress_binary, 'run',
+            '--project', run_dir,
+            '--spec', os.path.join(run_dir, spec),
+            '--browser', self.browser,
+            '--reporter', 'junit',
+            '--reporter-options', f'mochaFile={report_path}',
+            '--config', 'video=false,screenshotOnRunFailure=false',
+        ]
+        if live:
+            command += ['--env', 'liveNetwork=true']
+        started = time.time()
+        result = {'spec': spec, 'status': 'error', 'tests': [], 'duration_ms': 0, 'error': None}
+        try:
+            completed = subprocess.run(command, cwd=run_dir, capture_output=True, text=True, timeout=self.timeout)
+            output = completed.stdout + completed.stderr
+        except subprocess.TimeoutExpired:
+            completed, output = None, f"Timed out after {self.timeout:.0f}s"
+        result['duration_ms'] = round((time.time() - started) * 1000)
+
+        if os.path.exists(report_path):
+            with open(report_path, encoding='utf-8') as f:
+                tests = parse_timing_report(f.read())
+            for test in tests:
+                test['file'] = spec
+            result['tests'] = tests
+        if result['tests'] and not all(t['passed'] for t in result['tests']):
+            result['status'] = 'failed'
+        elif result['tests'] and completed is not None and completed.returncode == 0:
+            result['status'] = 'passed'
+        else:
+            result['error'] = output[-OUTPUT_TAIL:]
+        return result
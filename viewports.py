@@ -0,0 +1,173 @@
+"""Viewport matrix for crawling one page at several screen sizes.
+
+Each viewport is crawled in its own browser context. The element set of the first
+(primary) viewport is merged with the others: every element records whether it was
+visible at each viewport, and elements that only exist in another viewport's DOM (e.g.
+a mobile menu rendered by JavaScript) are added. The differences drive the
+``cy.viewport`` tests of the ``responsive`` test type.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+DESKTOP_USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                      'Chrome/91.0.4472.124 Safari/537.36')
+# Named viewports; strings refer to Playwright device descriptors.
+PRESETS: Dict[str, Any] = {
+    'desktop': {'viewport': {'width': 1920, 'height': 1080}, 'user_agent': DESKTOP_USER_AGENT},
+    'laptop': {'viewport': {'width': 1366, 'height': 768}, 'user_agent': DESKTOP_USER_AGENT},
+    'tablet': 'iPad (gen 7)',
+    'mobile': 'iPhone 13',
+}
+DEFAULT_VIEWPORT = 'desktop'
+MAX_VIEWPORTS = 6
+# Elements asserted per viewport by the responsive tests.
+MAX_ASSERTIONS = 8
+CONTEXT_OPTIONS = ('viewport', 'user_agent', 'device_scale_factor', 'is_mobile', 'has_touch')
+
+# Returns {xpath: visible} for the elements matching the selector. XPaths are built like
+# the crawler's get_xpath: same-tag sibling positions below <html>, without <html> itself.
+VISIBILITY_SCRIPT = """
+(selector) => {
+    const xpath = (el) => {
+        const parts = [];
+        let node = el;
+        while (node.parentElement && node.parentElement.tagName !== 'HTML') {
+            const same = Array.from(node.parentElement.children).filter((c) => c.tagName === node.tagName);
+            const tag = node.tagName.toLowerCase();
+            parts.unshift(same.length > 1 ? `${tag}[${same.indexOf(node) + 1}]` : tag);
+            node = node.parentElement;
+        }
+        return '//' + (parts.length ? parts.join('/') : el.tagName.toLowerCase());
+    };
+    const visible = (el) => {
+        if (el.checkVisibility && !el.checkVisibility({ checkOpacity: true, checkVisibilityCSS: true })) {
+            return false;
+        }
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    const result = {};
+    for (const el of document.querySelectorAll(selector)) {
+        result[xpath(el)] = visible(el);
+    }
+    return result;
+}
+"""
+
+
+def validate_viewports(requested: Any) -> None:
+    """Raise ValueError unless ``requested`` is a usable viewport matrix.
+
+    Entries are preset names, Playwright device names or ``{'name', 'width', 'height'}``.
+    Device names are checked when the crawl resolves them.
+    """
+    if not isinstance(requested, list) or not requested:
+        raise ValueError('viewports must be a non-empty list')
+    if len(requested) > MAX_VIEWPORTS:
+        raise ValueError(f'At most {MAX_VIEWPORTS} viewports can be crawled at once')
+    for entry in requested:
+        if isinstance(entry, str) and entry:
+            continue
+        if isinstance(entry, dict) and entry.get('name') and all(
+                isinstance(entry.get(key), int) and entry[key] > 0 for key in ('width', 'height')):
+            continue
+        raise ValueError('Each viewport must be a preset or device name, or {"name", "width", "height"}')
+    names = [viewport_name(entry) for entry in requested]
+    if len(set(names)) != len(names):
+        raise ValueError('Viewport names must be unique')
+
+
+def viewport_name(entry: Any) -> str:
+    return entry if isinstance(entry, str) else entry['name']
+
+
+def resolve_viewports(requested: Optional[List[Any]], devices: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """``{'name', 'width', 'height', 'options'}`` per viewport; ``options`` are ``new_context`` arguments.
+
+    Without ``requested`` only the desktop viewport is crawled.
+    """
+    resolved = []
+    for entry in requested or [DEFAULT_VIEWPORT]:
+        if isinstance(entry, dict):
+            descriptor = {'viewport': {'width': entry['width'], 'height': entry['height']},
+                          'user_agent': DESKTOP_USER_AGENT}
+        else:
+            descriptor = PRESETS.get(entry, entry)
+            if isinstance(descriptor, str):
+                if descriptor not in devices:
+                    raise ValueError(f"Unknown viewport or device: {entry}")
+                descriptor = devices[descriptor]
+        options = {key: descriptor[key] for key in CONTEXT_OPTIONS if key in descriptor}
+        resolved.append({
+            'name': viewport_name(entry),
+            'width': options['viewport']['width'],
+            'height': options['viewport']['height'],
+            'options': options
+        })
+    return resolved
+
+
+def merge_viewports(url_data: Dict[str, Any], viewports: List[Dict[str, Any]],
+                    visibility: List[Dict[str, bool]], others: List[Optional[Dict[str, Any]]]) -> None:
+    """Merge per-viewport crawls into the primary ``url_data`` in place.
+
+    ``visibility[i]`` is the ``VISIBILITY_SCRIPT`` result at ``viewports[i]`` and
+    ``others[i]`` the parsed page of that viewport (None for the primary one). Each
+    element gets ``viewports: {name: True/False/None}``, None meaning absent from that
+    viewport's DOM, and ``visible`` becomes its visibility at the primary viewport.
+    """
+    names = [v['name'] for v in viewports]
+    keyed = {}
+    for element in url_data['elements']:
+        keyed[element['_key']] = element
+        element['viewports'] = {name: None for name in names}
+    for index, name in enumerate(names):
+        page = others[index]
+        for element in list(page['elements'] if page else url_data['elements']):
+            target = keyed.get(element['_key'])
+            if target is None:
+                target = keyed[element['_key']] = element
+                element['viewports'] = {n: None for n in names}
+                url_data['elements'].append(element)
+            # Visibility is looked up by the element's XPath in the DOM it was found in
+            target['viewports'][name] = visibility[index].get(element['xpath'], False)
+    for element in url_data['elements']:
+        element['visible'] = bool(element['viewports'][names[0]])
+    url_data['viewports'] = [{k: v for k, v in viewport.items() if k != 'options'} for viewport in viewports]
+
+
+def responsive_context(url_data: Dict[str, Any], resolve: Callable[[Dict[str, Any]], str],
+                       limit: int = MAX_ASSERTIONS) -> Optional[Dict[str, Any]]:
+    """Template context for the responsive tests, or None with fewer than two viewports.
+
+    Elements whose visibility differs between viewports come first; elements visible
+    everywhere fill the remaining assertions. XPath-only elements are skipped, since
+    ``cy.get`` cannot use them.
+    """
+    viewports = url_data.get('viewports') or []
+    if len(viewports) < 2:
+        return None
+    elements = [e for e in url_data['elements'] if e['tag'] != 'form' and 'viewports' in e]
+    differing = [e for e in elements if len(set(e['viewports'].values())) > 1]
+    everywhere = [e for e in elements if all(e['viewports'].values()) and e not in differing]
+    chosen = []
+    for element in differing + everywhere:
+        selector = resolve(element)
+        if selector.startswith('//'):
+            continue
+        # Hidden elements must still be found, so the :visible filter is dropped
+        chosen.append((element, selector.replace(':visible', '')))
+        if len(chosen) == limit:
+            break
+    return {
+        'viewports': [
+            {
+                'name': viewport['name'],
+                'width': viewport['width'],
+                'height': viewport['height'],
+                'visible': [s for e, s in chosen if e['viewports'][viewport['name']]],
+                'hidden': [s for e, s in chosen if e['viewports'][viewport['name']] is False],
+                'absent': [s for e, s in chosen if e['viewports'][viewport['name']] is None]
+            } for viewport in viewports
+        ]
+    }